@@ -0,0 +1,180 @@
+import os
+import math
+import shutil
+from distutils.util import strtobool
+from logging import getLogger
+from multiprocessing import Process
+import psycopg2
+import optuna
+from pgopttune.sampler.sampler import get_sampler
+from pgopttune.pruner.pruner import get_pruner
+from pgopttune.objective.objective import get_objective_directions, is_pruning_supported
+from pgopttune.objective.objective_factory import get_objective
+from pgopttune.parameter.reset import reset_postgres_param
+from pgopttune.workload.replay_scheduler import ReplayLagError
+from pgopttune.parameter.pg_tune_parameter import PostgresTuneParameter
+from pgopttune.resource.hardware import HardwareResource
+from pgopttune.utils.command import run_command
+from pgopttune.utils.pg_connect import get_pg_connection
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+from pgopttune.config.tune_config import TuneConfig
+from pgopttune.config.parallel_tune_config import ParallelTuneConfig
+
+logger = getLogger(__name__)
+
+
+class ClusterPool:
+    """
+    Run trials of one study in parallel on several local PostgreSQL clusters.
+    The first cluster is the one in the [PostgreSQL] section, the others are cloned from it.
+    The postmaster of each cluster(and the backends it forks) is pinned to its own cpus with taskset,
+    and its tuning ranges are computed from its memory slice. The benchmark clients are not pinned and
+    the memory slice is not enforced, so the clusters still share the remaining cpus, the memory and the disks.
+    The page cache is not dropped before the trials when several clusters run in parallel
+    because it would drop the cache of the benchmarks running on the other clusters.
+    """
+
+    def __init__(self,
+                 postgres_server_config: PostgresServerConfig,
+                 tune_config: TuneConfig,
+                 parallel_tune_config: ParallelTuneConfig):
+        if not (postgres_server_config.host == '127.0.0.1' or postgres_server_config.host == 'localhost'):
+            raise ValueError('Parallel tuning is only supported for local PostgreSQL. pghost = {}'
+                             .format(postgres_server_config.host))
+        self.postgres_server_config = postgres_server_config
+        self.tune_config = tune_config
+        self.parallel_tune_config = parallel_tune_config
+        self.hardware_slices = HardwareResource(host=postgres_server_config.host) \
+            .split(parallel_tune_config.cluster_num)
+        self.cluster_configs = []
+        self.cluster_tune_configs = []
+        self.workers = []
+        for index, hardware_slice in enumerate(self.hardware_slices):
+            if index == 0:
+                cluster_config = postgres_server_config.copy_with(cpu_set=hardware_slice.cpu_set)
+            else:
+                cluster_config = postgres_server_config.copy_with(
+                    pgdata=os.path.join(parallel_tune_config.clone_pgdata_dir, 'cluster-{}'.format(index)),
+                    pgport=str(parallel_tune_config.clone_base_port + index - 1),
+                    cpu_set=hardware_slice.cpu_set)
+            self.cluster_configs.append(cluster_config)
+            self.cluster_tune_configs.append(tune_config.copy_with(
+                parameter_json_dir=os.path.join(tune_config.parameter_json_dir, 'cluster-{}'.format(index))))
+
+    def prepare_clusters(self, estimate_max_wal_size=None, estimate_checkpoint_timeout=None):
+        """
+        clone and start the clusters, and create the tune parameter json of each cluster
+        """
+        for index, cluster_config in enumerate(self.cluster_configs):
+            if index != 0 and not os.path.exists(cluster_config.pgdata):
+                self._clone_cluster(self.postgres_server_config, cluster_config)
+            if not self._is_running(cluster_config):
+                self._start_cluster(cluster_config)
+            # path : ./conf/cluster-<index>/version-<major-version>.json
+            cluster_params_json_dir = self.cluster_tune_configs[index].parameter_json_dir
+            os.makedirs(cluster_params_json_dir, exist_ok=True)
+            shutil.copyfile('{}/version-{}.json'.format(self.tune_config.parameter_json_dir,
+                                                        self.postgres_server_config.major_version),
+                            '{}/version-{}.json'.format(cluster_params_json_dir,
+                                                        self.postgres_server_config.major_version))
+            PostgresTuneParameter.create_tune_parameter_json(cluster_config.host,
+                                                             cluster_config.major_version,
+                                                             params_json_dir=cluster_params_json_dir,
+                                                             estimate_max_wal_size=estimate_max_wal_size,
+                                                             estimate_checkpoint_timeout=estimate_checkpoint_timeout,
+                                                             hardware=self.hardware_slices[index])
+            logger.info('cluster-{} : pgdata = {}, port = {}, cpu set = {}'.format(
+                index, cluster_config.pgdata, cluster_config.port, cluster_config.cpu_set))
+
+    def optimize(self, study, n_trials):
+        """
+        run the trials of the study in parallel(one worker process per cluster)
+        """
+        if not strtobool(self.tune_config.save_study_history):
+            raise ValueError('Parallel tuning requires the study history database. '
+                             'Please set save_study_history = True in postgres_opttune.conf')
+        n_trials_per_cluster = math.ceil(n_trials / len(self.cluster_configs))
+        for index, cluster_config in enumerate(self.cluster_configs):
+            n_worker_trials = min(n_trials_per_cluster, n_trials - n_trials_per_cluster * index)
+            if n_worker_trials <= 0:
+                break
+            worker = Process(target=self._optimize_worker,
+                             args=(index, cluster_config, self.cluster_tune_configs[index], n_worker_trials,
+                                   len(self.cluster_configs) == 1))
+            worker.start()
+            self.workers.append(worker)
+        failed_indexes = self.join()
+        if failed_indexes:
+            raise ValueError('The trials of the clusters {} failed. The parameters of the clusters were reset. '
+                             'See the log of each cluster for the error.'
+                             .format(', '.join('cluster-{}'.format(index) for index in failed_indexes)))
+
+    def join(self):
+        """
+        wait for the workers and reset the parameters of the clusters whose worker failed
+        Returns the indexes of the failed clusters
+        """
+        failed_indexes = []
+        for index, worker in enumerate(self.workers):  # the workers are started in the order of the clusters
+            worker.join()
+            if worker.exitcode == 0:
+                continue
+            failed_indexes.append(index)
+            logger.error('cluster-{} : the worker failed. exit code : {}'.format(index, worker.exitcode))
+            # the worker did not reset the parameter values left by the last trial
+            reset_postgres_param(self.cluster_configs[index])
+            logger.info('cluster-{} : Resetting PostgreSQL parameters, PostgreSQL restart completed.'.format(index))
+        return failed_indexes
+
+    @staticmethod
+    def _optimize_worker(index, cluster_config: PostgresServerConfig, cluster_tune_config: TuneConfig, n_trials,
+                         free_cache=False):
+        logger.info('cluster-{} : start {} trials.'.format(index, n_trials))
+        try:
+            objective = get_objective(cluster_config, cluster_tune_config, cluster_config.conf_path)
+            objective.free_cache = free_cache  # the page cache is shared by the clusters
+            multi_objective = len(get_objective_directions(cluster_tune_config.benchmark,
+                                                           cluster_tune_config.objectives)) > 1
+            study = optuna.load_study(study_name=cluster_tune_config.study_name,
+                                      sampler=get_sampler(cluster_tune_config.sample_mode,
+                                                          multi_objective=multi_objective),
+                                      storage=cluster_tune_config.history_database_url,
+                                      pruner=get_pruner(cluster_tune_config.pruning_mode,
+                                                        percentile=cluster_tune_config.pruning_percentile,
+                                                        pruning_supported=is_pruning_supported(
+                                                            cluster_tune_config.objectives)))
+            study.optimize(objective, n_trials=n_trials, catch=(ReplayLagError,))
+            objective.reset_param()  # reset the parameter values left by the last trial
+        except KeyboardInterrupt:
+            # Resetting parameters and restart
+            reset_postgres_param(cluster_config)
+            logger.info('cluster-{} : Resetting PostgreSQL parameters, PostgreSQL restart completed.'
+                        .format(index))
+        logger.info('cluster-{} : finished.'.format(index))
+
+    @staticmethod
+    def _clone_cluster(source_config: PostgresServerConfig, cluster_config: PostgresServerConfig):
+        # base backup of the cluster in the [PostgreSQL] section
+        clone_cluster_cmd = 'sudo -i -u {} {}/pg_basebackup -d {} -D {} -X stream -c fast'.format(
+            cluster_config.os_user, cluster_config.pgbin, source_config.dsn, cluster_config.pgdata)
+        logger.info('Clone the database cluster. pgdata : {}'.format(cluster_config.pgdata))
+        run_command(clone_cluster_cmd)
+        # the port is set in postgresql.conf because postgresql.auto.conf is reset in every trial
+        set_port_cmd = 'sudo -i -u {} bash -c "echo \'port = {}\' >> {}"'.format(
+            cluster_config.os_user, cluster_config.port, os.path.join(cluster_config.pgdata, 'postgresql.conf'))
+        run_command(set_port_cmd)
+
+    @staticmethod
+    def _start_cluster(cluster_config: PostgresServerConfig):
+        start_cluster_cmd = 'sudo -i -u {} taskset -c {} {}/pg_ctl -D {} -w -t 600 start'.format(
+            cluster_config.os_user, cluster_config.cpu_set, cluster_config.pgbin, cluster_config.pgdata)
+        logger.debug('Start PostgreSQL. pgdata : {}'.format(cluster_config.pgdata))
+        run_command(start_cluster_cmd, stdout_devnull=True)
+
+    @staticmethod
+    def _is_running(cluster_config: PostgresServerConfig):
+        try:
+            with get_pg_connection(dsn=cluster_config.dsn):
+                return True
+        except psycopg2.OperationalError:
+            return False
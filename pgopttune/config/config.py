@@ -1,4 +1,5 @@
 import os
+import copy
 import errno
 import configparser
 
@@ -15,5 +16,13 @@ class Config:
         self.config = config
         self.config_dict = dict(config.items('DEFAULT'))
 
-    def get_parameter_value(self, parameter_name):
-        return self.config_dict.get(parameter_name)
\ No newline at end of file
+    def get_parameter_value(self, parameter_name, default=None):
+        return self.config_dict.get(parameter_name, default)
+
+    def copy_with(self, **parameters):
+        """
+        copy the config and overwrite the values of the specified parameters
+        """
+        config = copy.copy(self)
+        config.config_dict = dict(self.config_dict, **parameters)
+        return config
@@ -21,3 +21,24 @@ class MyWorkloadConfig(Config):
     @property
     def run_workload_command(self):
         return self.get_parameter_value('run_workload_command')
+
+    @property
+    def report_interval_second(self):
+        return int(self.get_parameter_value('report_interval_second', default=10))
+
+    @property
+    def steady_state_detection(self):
+        return self.get_parameter_value('steady_state_detection', default='False')
+
+    @property
+    def steady_state_warm_up_second(self):
+        return int(self.get_parameter_value('steady_state_warm_up_second', default=60))
+
+    @property
+    def steady_state_tolerance(self):
+        return float(self.get_parameter_value('steady_state_tolerance', default=0.02))
+
+    @property
+    def max_measurement_second(self):
+        max_measurement_second = int(self.get_parameter_value('max_measurement_second', default=0))
+        return max_measurement_second if max_measurement_second > 0 else None
@@ -0,0 +1,20 @@
+from pgopttune.config.config import Config
+
+
+class ParallelTuneConfig(Config):
+    def __init__(self, conf_path, section='parallel-tuning'):
+        super().__init__(conf_path)
+        # this section is optional(trials are run on a single cluster)
+        self.config_dict = dict(self.config.items(section)) if self.config.has_section(section) else {}
+
+    @property
+    def cluster_num(self):
+        return int(self.get_parameter_value('cluster_num', default=1))
+
+    @property
+    def clone_pgdata_dir(self):
+        return self.get_parameter_value('clone_pgdata_dir')
+
+    @property
+    def clone_base_port(self):
+        return int(self.get_parameter_value('clone_base_port', default=5433))
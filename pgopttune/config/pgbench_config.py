@@ -0,0 +1,47 @@
+from pgopttune.config.config import Config
+
+
+class PgbenchConfig(Config):
+    def __init__(self, conf_path, section='pgbench'):
+        super().__init__(conf_path)
+        self.config_dict = dict(self.config.items(section))
+
+    @property
+    def scale_factor(self):
+        return int(self.get_parameter_value('scale_factor', default=10))
+
+    @property
+    def clients(self):
+        return int(self.get_parameter_value('clients', default=10))
+
+    @property
+    def jobs(self):
+        return int(self.get_parameter_value('jobs', default=1))
+
+    @property
+    def evaluation_time_second(self):
+        return int(self.get_parameter_value('evaluation_time_second', default=300))
+
+    @property
+    def warm_up_time_second(self):
+        return int(self.get_parameter_value('warm_up_time_second', default=0))
+
+    @property
+    def script(self):
+        return self.get_parameter_value('script', default='tpcb-like')
+
+    @property
+    def progress_interval_second(self):
+        return int(self.get_parameter_value('progress_interval_second', default=1))
+
+    @property
+    def latency_log(self):
+        return self.get_parameter_value('latency_log', default='transaction')
+
+    @property
+    def log_sampling_rate(self):
+        return float(self.get_parameter_value('log_sampling_rate', default=1.0))
+
+    @property
+    def extra_options(self):
+        return self.get_parameter_value('extra_options', default='')
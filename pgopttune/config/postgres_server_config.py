@@ -55,3 +55,40 @@ class PostgresServerConfig(Config):
     @property
     def ssh_password(self):
         return self.get_parameter_value('ssh_password')
+
+    @property
+    def cpu_set(self):
+        return self.get_parameter_value('cpu_set')
+
+    @property
+    def backup_disk_budget_bytes(self):
+        backup_disk_budget_gb = float(self.get_parameter_value('backup_disk_budget_gb', default=0))
+        return int(backup_disk_budget_gb * 1024 ** 3) if backup_disk_budget_gb > 0 else None
+
+    @property
+    def reset_method(self):
+        return self.get_parameter_value('reset_method', default='template')
+
+    @property
+    def snapshot_method(self):
+        return self.get_parameter_value('snapshot_method', default='auto')
+
+    @property
+    def snapshot_dir(self):
+        return self.get_parameter_value('snapshot_dir')
+
+    @property
+    def dump_dir(self):
+        return self.get_parameter_value('dump_dir', default='./workload_data/dump/')
+
+    @property
+    def restore_jobs(self):
+        return int(self.get_parameter_value('restore_jobs', default=4))
+
+    @property
+    def vacuum_jobs(self):
+        return int(self.get_parameter_value('vacuum_jobs', default=1))
+
+    @property
+    def vacuum_parallel_workers(self):
+        return int(self.get_parameter_value('vacuum_parallel_workers', default=0))
@@ -18,3 +18,33 @@ class SampledWorkloadConfig(Config):
     @property
     def my_workload_save_file(self):
         return self.get_parameter_value('sampled_workload_save_file')
+
+    @property
+    def replay_engine(self):
+        return self.get_parameter_value('replay_engine', default='multiprocessing')
+
+    @property
+    def replay_process_num(self):
+        return int(self.get_parameter_value('replay_process_num', default=1))
+
+    @property
+    def max_dispatch_lag_second(self):
+        max_dispatch_lag_ms = float(self.get_parameter_value('max_dispatch_lag_ms', default=0))
+        return max_dispatch_lag_ms / 1000 if max_dispatch_lag_ms > 0 else None
+
+    @property
+    def use_prepared_statements(self):
+        return self.get_parameter_value('use_prepared_statements', default='False')
+
+    @property
+    def scale_up_sampled_sessions(self):
+        return self.get_parameter_value('scale_up_sampled_sessions', default='False')
+
+    @property
+    def objective(self):
+        return self.get_parameter_value('objective', default='total_time')
+
+    @property
+    def objective_template_pattern(self):
+        objective_template_pattern = self.get_parameter_value('objective_template_pattern', default='')
+        return objective_template_pattern if objective_template_pattern else None
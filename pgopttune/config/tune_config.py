@@ -53,3 +53,28 @@ class TuneConfig(Config):
     @property
     def history_database_url(self):
         return self.get_parameter_value('history_database_url')
+
+    @property
+    def reload_only_fast_path(self):
+        return self.get_parameter_value('reload_only_fast_path', default='False')
+
+    @property
+    def objectives(self):
+        objectives = self.get_parameter_value('objectives', default='')
+        return [objective.strip() for objective in objectives.split(',') if objective.strip()]
+
+    @property
+    def collect_metrics(self):
+        return self.get_parameter_value('collect_metrics', default='False')
+
+    @property
+    def metrics_interval_second(self):
+        return float(self.get_parameter_value('metrics_interval_second', default=1))
+
+    @property
+    def pruning_mode(self):
+        return self.get_parameter_value('pruning_mode', default='NopPruner')
+
+    @property
+    def pruning_percentile(self):
+        return float(self.get_parameter_value('pruning_percentile', default=25.0))
@@ -15,6 +15,50 @@ class WorkloadSamplingConfig(Config):
     def my_workload_save_dir(self):
         return self.get_parameter_value('my_workload_save_dir')
 
+    @property
+    def capture_backend(self):
+        return self.get_parameter_value('capture_backend', default='csvlog')
+
+    @property
+    def proxy_listen_host(self):
+        return self.get_parameter_value('proxy_listen_host', default='127.0.0.1')
+
+    @property
+    def proxy_listen_port(self):
+        return int(self.get_parameter_value('proxy_listen_port', default=6432))
+
+    @property
+    def capture_mode(self):
+        return self.get_parameter_value('capture_mode', default='full')
+
+    @property
+    def transaction_sample_rate(self):
+        return float(self.get_parameter_value('transaction_sample_rate', default=1.0))
+
+    @property
+    def save_format(self):
+        return self.get_parameter_value('save_format', default='pickle')
+
+    @property
+    def compression(self):
+        return self.get_parameter_value('compression', default='none')
+
+    @property
+    def normalize_statements(self):
+        return self.get_parameter_value('normalize_statements', default='False')
+
+    @property
+    def csv_log_parser(self):
+        return self.get_parameter_value('csv_log_parser', default='database')
+
+    @property
+    def csv_log_transfer(self):
+        return self.get_parameter_value('csv_log_transfer', default='copy')
+
+    @property
+    def extract_fetch_size(self):
+        return int(self.get_parameter_value('extract_fetch_size', default=10000))
+
     @property
     def dsn(self):
         return get_pg_dsn(pghost=self.get_parameter_value('pghost'),
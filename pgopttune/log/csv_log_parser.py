@@ -0,0 +1,79 @@
+import re
+import datetime
+from logging import getLogger
+import pandas as pd
+
+logger = getLogger(__name__)
+
+# column positions in the csvlog(the same for PostgreSQL 10 or later, newer versions only append columns)
+LOG_TIME_COLUMN = 0
+DATABASE_NAME_COLUMN = 2
+SESSION_ID_COLUMN = 5
+SESSION_LINE_NUM_COLUMN = 6
+MESSAGE_COLUMN = 13
+DETAIL_COLUMN = 14
+
+# message of a statement logged by log_min_duration_statement
+#   simple query protocol : "duration: 0.100 ms  statement: <query>"
+#   extended query protocol : "duration: 0.100 ms  execute <statement name>: <query>"(parameters in detail)
+#   (parse, bind and "execute fetch from" of the extended query protocol are not matched)
+DURATION_STATEMENT_PATTERN = re.compile(
+    r'^duration: (?P<duration>[0-9.]+) ms  (?:statement|execute [^: ]+): (?P<statement>.*)$', re.DOTALL)
+
+# detail of the execute message : "parameters: $1 = '10', $2 = NULL"
+PARAMETER_PATTERN = re.compile(r"\$(?P<number>[0-9]+) = (?P<value>'(?:[^']|'')*'|NULL)", re.DOTALL)
+
+
+def parse_parameters_detail(detail):
+    """
+    Returns the parameters in the detail of the execute message as SQL literals(ordered by the parameter number)
+    """
+    if not detail or not detail.startswith('parameters: '):
+        return []
+    parameters = {int(match.group('number')): match.group('value') for match in PARAMETER_PATTERN.finditer(detail)}
+    return [parameters.get(number, 'NULL') for number in range(1, max(parameters, default=0) + 1)]
+
+
+def read_csv_log_statements(csv_log_file_path, database, start_unix_time, end_unix_time, log_timezone='UTC',
+                            chunksize=100000):
+    """
+    Read the statements logged with their duration from the csvlog file without loading it into a database.
+    Yields (query_stat_time, session_id, statement, detail) ordered by session_id, session_line_num
+    (query_stat_time = log_time - duration - start_unix_time, the same as the csv_log table query).
+    log_timezone : the log_timezone setting of PostgreSQL(the time zone of log_time)
+    """
+    start_microseconds = round(start_unix_time * 1000000)
+    end_microseconds = round(end_unix_time * 1000000)
+    statements = []
+    read_row_num = 0
+    for chunk in pd.read_csv(csv_log_file_path, header=None, chunksize=chunksize, keep_default_na=False,
+                             usecols=[LOG_TIME_COLUMN, DATABASE_NAME_COLUMN, SESSION_ID_COLUMN,
+                                      SESSION_LINE_NUM_COLUMN, MESSAGE_COLUMN, DETAIL_COLUMN],
+                             dtype={LOG_TIME_COLUMN: str, DATABASE_NAME_COLUMN: str, SESSION_ID_COLUMN: str,
+                                    SESSION_LINE_NUM_COLUMN: 'int64', MESSAGE_COLUMN: str, DETAIL_COLUMN: str}):
+        read_row_num += len(chunk)
+        chunk = chunk[(chunk[DATABASE_NAME_COLUMN] == database) &
+                      chunk[MESSAGE_COLUMN].str.startswith('duration: ')]
+        if chunk.empty:
+            continue
+        message = chunk[MESSAGE_COLUMN].str.extract(DURATION_STATEMENT_PATTERN)
+        chunk = chunk.assign(duration=message['duration'], statement=message['statement'])
+        chunk = chunk[chunk['statement'].notna()]  # parse, bind, ... of the extended query protocol
+        # log_time : "2020-09-13 20:22:09.011 JST"(the time zone abbreviation is replaced with log_timezone)
+        log_time = pd.to_datetime(chunk[LOG_TIME_COLUMN].str.slice(0, 23), format='%Y-%m-%d %H:%M:%S.%f') \
+            .dt.tz_localize(log_timezone, ambiguous='NaT', nonexistent='NaT')
+        log_microseconds = (log_time - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(microseconds=1)
+        duration_microseconds = (chunk['duration'].astype(float) * 1000).round()
+        chunk = chunk.assign(query_stat_time=log_microseconds - duration_microseconds - start_microseconds)
+        chunk = chunk[(log_microseconds > start_microseconds) & (log_microseconds <= end_microseconds)]
+        statements.append(chunk[[SESSION_ID_COLUMN, SESSION_LINE_NUM_COLUMN, 'query_stat_time', 'statement',
+                                 DETAIL_COLUMN]])
+    logger.debug("Number of csv log rows : {}".format(read_row_num))
+    if not statements:
+        return
+    statements = pd.concat(statements).sort_values([SESSION_ID_COLUMN, SESSION_LINE_NUM_COLUMN], kind='stable')
+    logger.debug("Number of sampled statements : {}".format(len(statements)))
+    for query_stat_time, session_id, statement, detail in zip(statements['query_stat_time'],
+                                                              statements[SESSION_ID_COLUMN],
+                                                              statements['statement'], statements[DETAIL_COLUMN]):
+        yield datetime.timedelta(microseconds=int(query_stat_time)), session_id, statement, detail
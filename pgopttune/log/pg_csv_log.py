@@ -1,5 +1,8 @@
 import os
+import gzip
 import time
+import shlex
+from contextlib import contextmanager
 from logging import getLogger
 from psycopg2.extras import DictCursor
 from pgopttune.utils.pg_connect import get_pg_connection
@@ -11,14 +14,22 @@ logger = getLogger(__name__)
 
 
 class PostgresCsvLog:
-    def __init__(self, postgres_server_config: PostgresServerConfig):
+    def __init__(self, postgres_server_config: PostgresServerConfig, transaction_sample_rate=None):
+        """
+        transaction_sample_rate : fraction of transactions whose statements are logged(log_transaction_sample_rate)
+                                  if it is None, all statements are logged(log_min_duration_statement = 0)
+        """
         self._postgres_server_config = postgres_server_config
+        self.transaction_sample_rate = transaction_sample_rate
         self._postgres_parameter = PostgresParameter(postgres_server_config)
         self._csv_log_table_name = "csv_log"
         self.start_csv_log_unix_time = None  # The time when the csv log started to be output(epoch time)
         self.end_csv_log_unix_time = None  # The time when the csv log output was finished(epoch time)
         self._csv_log_file_path = None
         self.csv_log_local_file_path = None  # File path when the csv log file is copied to localhost
+        self._csv_log_start_position = None  # size of the csv log file when the csv log started to be output
+        self._csv_log_end_file_path = None  # csv log file when the csv log output was finished(differs if rotated)
+        self._csv_log_end_position = None  # size of the csv log file when the csv log output was finished
 
         # checking logging_collector on
         if self._get_logging_collector_setting() != 'on':
@@ -27,6 +38,13 @@ class PostgresCsvLog:
         # get current settings
         self._current_log_destination = self._get_log_destination()
         self._current_log_min_duration_statement = self._get_log_min_duration_statement()
+        if self.transaction_sample_rate is not None:
+            if int(postgres_server_config.major_version) < 12:
+                raise ValueError("Sampling transactions requires log_transaction_sample_rate(PostgreSQL 12 or later).\
+                                    major_version = {}".format(postgres_server_config.major_version))
+            self._current_log_transaction_sample_rate = self._postgres_parameter.get_parameter_value(
+                "log_transaction_sample_rate")
+        self.log_timezone = self._postgres_parameter.get_parameter_value("log_timezone")  # time zone of log_time
 
     def __del__(self):
         self.disable()
@@ -41,24 +59,88 @@ class PostgresCsvLog:
             self._postgres_parameter.set_parameter(param_name="log_destination", param_value=log_destination_value)
             logger.debug("Start outputting PostgreSQL log message to CSV file.\n"
                          "log_destination = '{}'".format(log_destination_value))
-        # set log_min_duration_statement = 0
-        self._postgres_parameter.set_parameter(param_name="log_min_duration_statement", param_value=0, pg_reload=True)
-        logger.debug("Changed setting to output all executed SQL to PostgreSQL log file.\n"
-                     "log_min_duration_statement = '0'")
+        if self.transaction_sample_rate is None:
+            # set log_min_duration_statement = 0
+            self._postgres_parameter.set_parameter(param_name="log_min_duration_statement", param_value=0,
+                                                   pg_reload=True)
+            logger.debug("Changed setting to output all executed SQL to PostgreSQL log file.\n"
+                         "log_min_duration_statement = '0'")
+        else:
+            # log all statements of the sampled transactions only
+            self._postgres_parameter.set_parameters({"log_min_duration_statement": -1,
+                                                     "log_transaction_sample_rate": self.transaction_sample_rate},
+                                                    pg_reload=True)
+            logger.debug("Changed setting to output the executed SQL of the sampled transactions to PostgreSQL "
+                         "log file.\n"
+                         "log_min_duration_statement = '-1', log_transaction_sample_rate = '{}'"
+                         .format(self.transaction_sample_rate))
         self.start_csv_log_unix_time = time.time()
         self._csv_log_file_path = self._get_csv_log_file_path()
+        self._csv_log_start_position = self._get_file_size(self._csv_log_file_path)
 
     def disable(self):
+        if self._csv_log_file_path is not None and self._csv_log_end_position is None:
+            self._csv_log_end_file_path = self._get_csv_log_file_path()
         # set log_destination = '[current_setting]'
         self._postgres_parameter.set_parameter(param_name="log_destination", param_value=self._current_log_destination)
         logger.debug("PostgreSQL log message output to CSV file is disabled.\n"
                      "log_destination = '{}'".format(self._current_log_min_duration_statement))
+        if self.transaction_sample_rate is not None:
+            self._postgres_parameter.set_parameter(param_name="log_transaction_sample_rate",
+                                                   param_value=self._current_log_transaction_sample_rate)
         # set log_min_duration_statement = current_setting
         self._postgres_parameter.set_parameter(param_name="log_min_duration_statement",
                                                param_value=self._current_log_min_duration_statement, pg_reload=True)
         logger.debug("The value of the log_min_duration_statement parameter has been restored to its original value.\n"
                      "log_min_duration_statement = '{}'".format(self._current_log_min_duration_statement))
         self.end_csv_log_unix_time = time.time()
+        if self._csv_log_end_file_path is not None and self._csv_log_end_position is None:
+            # the size after the csv log output is disabled(all messages of the sampling time are written)
+            self._csv_log_end_position = self._get_file_size(self._csv_log_end_file_path)
+
+    @contextmanager
+    def open_csv_log(self):
+        """
+        Returns the csv log to read.
+        the file path if the csv log file has been copied to localhost,
+        otherwise the part written while the csv log was enabled, streamed from the PostgreSQL host(gzip compressed)
+        """
+        if self.csv_log_local_file_path is not None:
+            yield self.csv_log_local_file_path
+            return
+        stream_command = self._get_stream_csv_log_command()
+        logger.debug("Stream the csv log. command : {}".format(stream_command))
+        ssh = SSHCommandExecutor(user=self._postgres_server_config.os_user,
+                                 password=self._postgres_server_config.ssh_password,
+                                 hostname=self._postgres_server_config.host,
+                                 port=self._postgres_server_config.ssh_port)
+        stdout = ssh.open_stdout(stream_command)
+        with gzip.GzipFile(fileobj=stdout, mode='rb') as f:
+            yield f
+        if stdout.channel.recv_exit_status() != 0:
+            raise ValueError('Streaming the csv log failed.\n'
+                             'Stream command : {}'.format(stream_command))
+
+    def _get_stream_csv_log_command(self):
+        # (file path, start position, end position) of the parts written while the csv log was enabled
+        if self._csv_log_end_file_path == self._csv_log_file_path:
+            parts = [(self._csv_log_file_path, self._csv_log_start_position, self._csv_log_end_position)]
+        else:
+            logger.warning("The csv log file was rotated while sampling. {} -> {}\n"
+                           "Files rotated in between are not read.".format(self._csv_log_file_path,
+                                                                          self._csv_log_end_file_path))
+            parts = [(self._csv_log_file_path, self._csv_log_start_position, None),
+                     (self._csv_log_end_file_path, 0, self._csv_log_end_position)]
+        part_commands = []
+        for file_path, start_position, end_position in parts:
+            # dd(GNU coreutils) reads only the byte range of the part
+            part_command = 'dd if={} bs=1M iflag=skip_bytes,count_bytes skip={} status=none'.format(
+                shlex.quote(file_path), start_position)
+            if end_position is not None:
+                part_command += ' count={}'.format(end_position - start_position)
+            part_commands.append(part_command)
+        stream_command = 'set -o pipefail; {{ {}; }} | gzip -1 -c'.format(' && '.join(part_commands))
+        return 'bash -c {}'.format(shlex.quote(stream_command))
 
     def load_csv_to_database(self, copy_dir="/tmp", dsn=None):
         self._copy_csv_logfile_to_local(copy_dir)  # copy logfile to directory(localhost)
@@ -71,6 +153,13 @@ class PostgresCsvLog:
                     # cur.copy_from(f, self.csv_log_table_name, sep=',')
                     cur.copy_expert("copy {} from stdin (format csv)".format(self._csv_log_table_name), f)
 
+    def copy_csv_log_to_local(self, copy_dir="/tmp"):
+        """
+        copy the csv log file to copy_dir(localhost) and return the copied file path
+        """
+        self._copy_csv_logfile_to_local(copy_dir)
+        return self.csv_log_local_file_path
+
     def _copy_csv_logfile_to_local(self, copy_dir="/tmp"):
         file_name = os.path.basename(self._csv_log_file_path)
         self.csv_log_local_file_path = os.path.join(copy_dir, file_name)
@@ -105,6 +194,15 @@ class PostgresCsvLog:
             csv_file_path = os.path.join(self._postgres_server_config.pgdata, csv_file_path)
         return csv_file_path
 
+    def _get_file_size(self, file_path):
+        get_file_size_sql = "SELECT size FROM pg_stat_file(%s);"
+        # use psycopg2
+        with get_pg_connection(dsn=self._postgres_server_config.dsn) as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cur:
+                cur.execute(get_file_size_sql, (file_path,))
+                row = cur.fetchone()
+        return row['size']
+
     def _create_csv_log_table(self, dsn):
         create_table_sql = "CREATE TABLE IF NOT EXISTS {} (" \
                            "log_time timestamp(3) with time zone," \
@@ -0,0 +1,206 @@
+import struct
+import uuid
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# PostgreSQL frontend/backend protocol(version 3.0)
+# https://www.postgresql.org/docs/current/protocol-message-formats.html
+PROTOCOL_VERSION = 196608  # 3.0
+SSL_REQUEST_CODE = 80877103
+GSSENC_REQUEST_CODE = 80877104
+CANCEL_REQUEST_CODE = 80877102
+
+# binary format decoders of the parameter types(type oid -> function(bytes) -> SQL literal)
+BINARY_PARAMETER_DECODERS = {
+    16: lambda value: 'true' if value[0] else 'false',  # bool
+    17: lambda value: "'\\x{}'".format(value.hex()),  # bytea
+    19: lambda value: quote_literal(value.decode('utf-8')),  # name
+    20: lambda value: str(struct.unpack('!q', value)[0]),  # int8
+    21: lambda value: str(struct.unpack('!h', value)[0]),  # int2
+    23: lambda value: str(struct.unpack('!i', value)[0]),  # int4
+    25: lambda value: quote_literal(value.decode('utf-8')),  # text
+    700: lambda value: "'{}'".format(repr(struct.unpack('!f', value)[0])),  # float4
+    701: lambda value: "'{}'".format(repr(struct.unpack('!d', value)[0])),  # float8
+    1042: lambda value: quote_literal(value.decode('utf-8')),  # bpchar
+    1043: lambda value: quote_literal(value.decode('utf-8')),  # varchar
+    2950: lambda value: "'{}'".format(uuid.UUID(bytes=value)),  # uuid
+}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class MessageBuffer:
+    """
+    Split the byte stream of a connection into messages.
+    The first message of a frontend stream(startup message) has no type byte.
+    message_types : types of the messages to return(None : all), the other messages are skipped without copying
+    """
+
+    def __init__(self, startup=False, message_types=None):
+        self.startup = startup
+        self.message_types = message_types
+        self._buffer = bytearray()
+        self._skip_length = 0  # remaining length of the message being skipped
+
+    def feed(self, data):
+        """
+        add the received data and return the completed messages [(type, payload), ...]
+        the type of the startup message is None
+        """
+        if self._skip_length > 0:
+            skip_length = min(self._skip_length, len(data))
+            self._skip_length -= skip_length
+            data = data[skip_length:]
+        self._buffer.extend(data)
+        messages = []
+        while True:
+            header_length = 4 if self.startup else 5
+            if len(self._buffer) < header_length:
+                break
+            if self.startup:
+                message_type = None
+                length, = struct.unpack_from('!i', self._buffer, 0)
+                message_end = length
+            else:
+                message_type = chr(self._buffer[0])
+                length, = struct.unpack_from('!i', self._buffer, 1)
+                message_end = length + 1
+            if length < 4:
+                raise ProtocolError('Invalid message length : {}'.format(length))
+            if self.message_types is not None and message_type not in self.message_types:
+                if len(self._buffer) < message_end:
+                    self._skip_length = message_end - len(self._buffer)
+                    self._buffer.clear()
+                    break
+                del self._buffer[:message_end]
+                continue
+            if len(self._buffer) < message_end:
+                break
+            messages.append((message_type, bytes(self._buffer[header_length:message_end])))
+            del self._buffer[:message_end]
+            if self.startup:
+                code, = struct.unpack_from('!i', messages[-1][1], 0)
+                # the SSL/GSSAPI encryption request is followed by another startup message
+                self.startup = code in (SSL_REQUEST_CODE, GSSENC_REQUEST_CODE)
+        return messages
+
+
+def build_message(message_type, payload):
+    """
+    Returns the bytes of the message(the type of the startup message is None)
+    """
+    header = b'' if message_type is None else message_type.encode()
+    return header + struct.pack('!i', len(payload) + 4) + payload
+
+
+def _read_string(payload, position):
+    end = payload.index(b'\x00', position)
+    return payload[position:end].decode('utf-8'), end + 1
+
+
+def parse_startup_message(payload):
+    """
+    Returns the protocol code and the parameters(user, database, ...) of the startup message
+    """
+    code, = struct.unpack_from('!i', payload, 0)
+    parameters = {}
+    if code == PROTOCOL_VERSION:
+        position = 4
+        while position < len(payload) and payload[position] != 0:
+            name, position = _read_string(payload, position)
+            value, position = _read_string(payload, position)
+            parameters[name] = value
+    return code, parameters
+
+
+def parse_query(payload):
+    """
+    Query('Q') : query string
+    """
+    query, _ = _read_string(payload, 0)
+    return query
+
+
+def parse_parse(payload):
+    """
+    Parse('P') : statement name, query string, parameter type oids
+    """
+    statement_name, position = _read_string(payload, 0)
+    query, position = _read_string(payload, position)
+    parameter_num, = struct.unpack_from('!h', payload, position)
+    parameter_types = list(struct.unpack_from('!{}i'.format(parameter_num), payload, position + 2))
+    return statement_name, query, parameter_types
+
+
+def parse_bind(payload):
+    """
+    Bind('B') : portal name, statement name, parameter format codes, parameter values(bytes or None)
+    """
+    portal_name, position = _read_string(payload, 0)
+    statement_name, position = _read_string(payload, position)
+    format_num, = struct.unpack_from('!h', payload, position)
+    format_codes = list(struct.unpack_from('!{}h'.format(format_num), payload, position + 2))
+    position += 2 + 2 * format_num
+    parameter_num, = struct.unpack_from('!h', payload, position)
+    position += 2
+    parameter_values = []
+    for _ in range(parameter_num):
+        length, = struct.unpack_from('!i', payload, position)
+        position += 4
+        if length == -1:
+            parameter_values.append(None)
+        else:
+            parameter_values.append(payload[position:position + length])
+            position += length
+    # no format codes : all text, one format code : applied to all parameters
+    if format_num == 0:
+        format_codes = [0] * parameter_num
+    elif format_num == 1:
+        format_codes = format_codes * parameter_num
+    return portal_name, statement_name, format_codes, parameter_values
+
+
+def parse_execute(payload):
+    """
+    Execute('E') : portal name
+    """
+    portal_name, _ = _read_string(payload, 0)
+    return portal_name
+
+
+def parse_describe(payload):
+    """
+    Describe('D') : 'S'(statement) or 'P'(portal), name
+    """
+    name, _ = _read_string(payload, 1)
+    return chr(payload[0]), name
+
+
+def parse_parameter_description(payload):
+    """
+    ParameterDescription('t', backend) : parameter type oids
+    """
+    parameter_num, = struct.unpack_from('!h', payload, 0)
+    return list(struct.unpack_from('!{}i'.format(parameter_num), payload, 2))
+
+
+def quote_literal(value):
+    return "'{}'".format(value.replace("'", "''"))
+
+
+def to_sql_literal(value, format_code=0, type_oid=0):
+    """
+    Returns the bound parameter value as a SQL literal.
+    Binary values are decoded if the type is known, otherwise a ProtocolError is raised.
+    """
+    if value is None:
+        return 'NULL'
+    if format_code == 0:
+        return quote_literal(value.decode('utf-8'))
+    decoder = BINARY_PARAMETER_DECODERS.get(type_oid)
+    if decoder is None:
+        raise ProtocolError('The binary format of the parameter type {} is not supported.'.format(type_oid))
+    return decoder(value)
@@ -0,0 +1,278 @@
+import time
+import asyncio
+import datetime
+import statistics
+from logging import getLogger
+from pgopttune.log.pg_protocol import MessageBuffer, ProtocolError, build_message, parse_startup_message, \
+    parse_query, parse_parse, parse_bind, parse_execute, parse_describe, parse_parameter_description, \
+    to_sql_literal, SSL_REQUEST_CODE, GSSENC_REQUEST_CODE
+from pgopttune.workload.sampled_transaction import SampledTransaction
+from pgopttune.workload.sampled_workload_file import SampledWorkloadWriter
+from pgopttune.workload.statement_normalizer import normalize_statement
+
+logger = getLogger(__name__)
+
+READ_SIZE = 65536
+
+
+class ConnectionRecorder:
+    """
+    Record the statements sent by a client connection(simple and extended query protocol).
+    Simple query : the query string is recorded when the Query message is received.
+    Extended query : the statement of the portal is recorded with its bound parameters when Execute is received.
+    """
+
+    def __init__(self, session_id, start_time, normalize=False):
+        self.session_id = session_id
+        self.start_time = start_time  # time.perf_counter() of the recording start
+        self.normalize = normalize
+        self.database = None
+        self.query_start_time = []
+        self.statement = []
+        self.parameters = []
+        self.skipped_statement_num = 0  # statements whose parameters could not be decoded
+        self._statements = {}  # prepared statement name -> [query, parameter type oids]
+        self._portals = {}  # portal name -> (query, parameters)
+        self._pending_describes = []  # statements waiting for ParameterDescription
+
+    def frontend_message(self, message_type, payload, received_time):
+        if message_type is None:  # startup message
+            _, startup_parameters = parse_startup_message(payload)
+            if 'user' in startup_parameters:
+                self.database = startup_parameters.get('database', startup_parameters['user'])
+        elif message_type == 'Q':
+            self._record(received_time, parse_query(payload))
+        elif message_type == 'P':
+            statement_name, query, parameter_types = parse_parse(payload)
+            self._statements[statement_name] = [query, parameter_types]
+        elif message_type == 'D':
+            describe_type, name = parse_describe(payload)
+            if describe_type == 'S':
+                self._pending_describes.append(name)
+        elif message_type == 'B':
+            self._bind(payload)
+        elif message_type == 'E':
+            portal_name = parse_execute(payload)
+            if portal_name in self._portals:
+                query, parameters = self._portals[portal_name]
+                self._record(received_time, query, parameters)
+        elif message_type == 'C':  # Close
+            close_type, name = parse_describe(payload)
+            (self._statements if close_type == 'S' else self._portals).pop(name, None)
+
+    def backend_message(self, message_type, payload):
+        if message_type == 't' and self._pending_describes:
+            # the parameter types inferred by the server(used to decode binary parameters)
+            statement_name = self._pending_describes.pop(0)
+            if statement_name in self._statements:
+                self._statements[statement_name][1] = parse_parameter_description(payload)
+        elif message_type == 'Z':  # ReadyForQuery : all describes before Sync have been answered(or skipped)
+            self._pending_describes.clear()
+
+    def _bind(self, payload):
+        portal_name, statement_name, format_codes, parameter_values = parse_bind(payload)
+        if statement_name not in self._statements:
+            return
+        query, parameter_types = self._statements[statement_name]
+        try:
+            parameters = [to_sql_literal(value, format_code,
+                                         parameter_types[index] if index < len(parameter_types) else 0)
+                          for index, (format_code, value) in enumerate(zip(format_codes, parameter_values))]
+        except (ProtocolError, ValueError) as e:
+            logger.debug('The statement is not recorded. {}'.format(e))
+            self._portals.pop(portal_name, None)
+            self.skipped_statement_num += 1
+            return
+        self._portals[portal_name] = (query, parameters)
+
+    def _record(self, received_time, query, parameters=None):
+        if not parameters and self.normalize:
+            query, parameters = normalize_statement(query)
+        self.query_start_time.append(datetime.timedelta(seconds=received_time - self.start_time))
+        self.statement.append(query)
+        self.parameters.append(parameters or [])
+
+    def get_transaction(self):
+        return SampledTransaction(self.session_id, self.query_start_time, self.statement, parameters=self.parameters)
+
+
+class PostgresWireProxy:
+    """
+    Recording proxy between the clients and PostgreSQL.
+    Clients connect to the proxy instead of PostgreSQL, and the statements of each connection are written
+    to the sampled workload(columnar format) when the connection is closed.
+    SSL and GSSAPI encryption requests are refused so that the messages can be read.
+    """
+
+    def __init__(self, listen_host, listen_port, server_host, server_port, save_file_path, database=None,
+                 normalize=False, compression='none'):
+        self.listen_host = listen_host
+        self.listen_port = listen_port
+        self.server_host = server_host
+        self.server_port = server_port
+        self.save_file_path = save_file_path
+        self.database = database  # record only the connections to this database(None : all)
+        self.normalize = normalize
+        self.compression = compression
+        self.start_unix_time = None
+        self.end_unix_time = None
+        self._start_time = None
+        self._server = None
+        self._writer = None
+        self._connection_count = 0
+        self._connection_tasks = set()
+
+    def record(self, recording_time_second):
+        """
+        record the connections for recording_time_second and return the save file path
+        """
+        return asyncio.run(self._record(recording_time_second))
+
+    async def _record(self, recording_time_second):
+        await self.start()
+        try:
+            await asyncio.sleep(recording_time_second)
+        finally:
+            await self.stop()
+        return self.save_file_path
+
+    async def start(self):
+        self._writer = SampledWorkloadWriter(self.save_file_path, compression=self.compression)
+        self._server = await asyncio.start_server(self._handle_client, self.listen_host, self.listen_port)
+        self.start_unix_time = time.time()
+        self._start_time = time.perf_counter()
+        logger.info("The recording proxy is listening on {}:{}(PostgreSQL : {}:{})".format(
+            self.listen_host, self.listen_port, self.server_host, self.server_port))
+
+    async def stop(self):
+        self._server.close()
+        self.end_unix_time = time.time()
+        # the connections still open are closed and their statements are saved
+        for task in list(self._connection_tasks):
+            task.cancel()
+        await asyncio.gather(*self._connection_tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        self._writer.close(self.start_unix_time, self.end_unix_time, database=self.database)
+        logger.info("The recording proxy has stopped. Sessions : {}, Statements : {}".format(
+            self._writer.session_num, self._writer.statement_num))
+
+    async def _handle_client(self, client_reader, client_writer):
+        self._connection_tasks.add(asyncio.current_task())
+        self._connection_count += 1
+        # session id in the same format as PostgreSQL(start time and connection number in hex)
+        recorder = ConnectionRecorder('{:x}.{:x}'.format(int(self.start_unix_time), self._connection_count),
+                                      self._start_time, normalize=self.normalize)
+        server_writer = None
+        try:
+            server_reader, server_writer = await asyncio.open_connection(self.server_host, self.server_port)
+            await asyncio.gather(self._forward_frontend(client_reader, client_writer, server_writer, recorder),
+                                 self._forward_backend(server_reader, client_writer, recorder))
+        except (ConnectionError, ProtocolError, asyncio.CancelledError) as e:
+            logger.debug("session {} : {}".format(recorder.session_id, repr(e)))
+        finally:
+            for writer in (client_writer, server_writer):
+                if writer is not None:
+                    writer.close()
+            self._save_session(recorder)
+            self._connection_tasks.discard(asyncio.current_task())
+
+    async def _forward_frontend(self, client_reader, client_writer, server_writer, recorder):
+        message_buffer = MessageBuffer(startup=True)
+        while True:
+            data = await client_reader.read(READ_SIZE)
+            received_time = time.perf_counter()
+            if not data:
+                break
+            if not message_buffer.startup:
+                server_writer.write(data)  # forward first, then parse
+                for message_type, payload in message_buffer.feed(data):
+                    recorder.frontend_message(message_type, payload, received_time)
+                await server_writer.drain()
+                continue
+            # startup phase
+            for message_type, payload in message_buffer.feed(data):
+                if message_type is None and parse_startup_message(payload)[0] in (SSL_REQUEST_CODE,
+                                                                                 GSSENC_REQUEST_CODE):
+                    client_writer.write(b'N')  # encryption is not supported by the proxy
+                    continue
+                server_writer.write(build_message(message_type, payload))
+                recorder.frontend_message(message_type, payload, received_time)
+            await server_writer.drain()
+        server_writer.close()
+
+    @staticmethod
+    async def _forward_backend(server_reader, client_writer, recorder):
+        # only ParameterDescription and ReadyForQuery are parsed, the other messages are skipped
+        message_buffer = MessageBuffer(message_types={'t', 'Z'})
+        while True:
+            data = await server_reader.read(READ_SIZE)
+            if not data:
+                break
+            client_writer.write(data)
+            for message_type, payload in message_buffer.feed(data):
+                recorder.backend_message(message_type, payload)
+            await client_writer.drain()
+        client_writer.close()
+
+    def _save_session(self, recorder: ConnectionRecorder):
+        if recorder.skipped_statement_num > 0:
+            logger.warning("session {} : {} statements with binary parameters of unsupported types are not recorded."
+                           .format(recorder.session_id, recorder.skipped_statement_num))
+        if not recorder.statement:
+            return
+        if self.database is not None and recorder.database != self.database:
+            return
+        self._writer.add_transaction(recorder.get_transaction())
+
+
+def benchmark_latency(direct_dsn, proxy_dsn, query='SELECT 1', count=1000):
+    """
+    Measure the latency of the query directly and through the proxy.
+    Returns the median and the 99th percentile latency(microseconds) of each and the latency added by the proxy.
+    (run this module to measure it : python -m pgopttune.log.pg_wire_proxy [conf path])
+    """
+    from pgopttune.utils.pg_connect import get_pg_connection
+
+    def measure(dsn):
+        latencies = []
+        with get_pg_connection(dsn=dsn) as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for _ in range(count):
+                    start_time = time.perf_counter()
+                    cur.execute(query)
+                    cur.fetchall()
+                    latencies.append((time.perf_counter() - start_time) * 1000000)
+        latencies.sort()
+        return {'median_us': statistics.median(latencies), 'p99_us': latencies[int(len(latencies) * 0.99) - 1]}
+
+    direct = measure(direct_dsn)
+    proxy = measure(proxy_dsn)
+    return {'direct': direct, 'proxy': proxy, 'added_median_us': proxy['median_us'] - direct['median_us'],
+            'added_p99_us': proxy['p99_us'] - direct['p99_us']}
+
+
+if __name__ == "__main__":
+    # benchmark of the latency added by the proxy(the statements of the benchmark are recorded in a temporary file)
+    import os
+    import sys
+    import tempfile
+    import threading
+    from logging import basicConfig, INFO
+    from pgopttune.config.postgres_server_config import PostgresServerConfig
+    from pgopttune.utils.pg_connect import get_pg_dsn
+
+    basicConfig(level=INFO)
+    conf_path = sys.argv[1] if len(sys.argv) > 1 else './conf/postgres_opttune.conf'
+    postgres_server_config_test = PostgresServerConfig(conf_path)  # PostgreSQL Server config
+    with tempfile.TemporaryDirectory() as save_dir:
+        proxy_test = PostgresWireProxy('127.0.0.1', 6432, postgres_server_config_test.host,
+                                       int(postgres_server_config_test.port),
+                                       os.path.join(save_dir, 'proxy_benchmark.sampled'))
+        threading.Thread(target=proxy_test.record, args=(120,), daemon=True).start()
+        time.sleep(1)
+        proxy_dsn_test = get_pg_dsn(pghost='127.0.0.1', pgport=6432, pgdatabase=postgres_server_config_test.database,
+                                    pguser=postgres_server_config_test.user,
+                                    pgpassword=postgres_server_config_test.password)
+        benchmark_latency(postgres_server_config_test.dsn, proxy_dsn_test, count=1000)  # warm up
+        logger.info(benchmark_latency(postgres_server_config_test.dsn, proxy_dsn_test, count=10000))
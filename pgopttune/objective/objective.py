@@ -1,10 +1,45 @@
+import os
 from logging import getLogger
+from distutils.util import strtobool
 from pgopttune.parameter.pg_tune_parameter import PostgresTuneParameter
+from pgopttune.utils.pg_connect import get_pg_connection
+from pgopttune.workload.metrics_collector import MetricsCollector
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 from pgopttune.config.tune_config import TuneConfig
 
 logger = getLogger(__name__)
 
+# objectives of the tuning and their directions
+# benchmark : value returned by the workload(TPS : maximize, sampled workload : minimize)
+# p95_latency, p99_latency : latency of the statements or transactions(milliseconds, sampled workload and pgbench)
+# memory_footprint : shared_buffers + max_connections * work_mem(MB)
+OBJECTIVE_DIRECTIONS = {
+    'benchmark': None,
+    'p95_latency': 'minimize',
+    'p99_latency': 'minimize',
+    'memory_footprint': 'minimize',
+}
+
+
+def get_objective_directions(benchmark, objectives):
+    """
+    Returns the optimization direction of each objective(objectives is empty : benchmark only)
+    """
+    benchmark_direction = 'minimize' if benchmark == 'sampled_workload' else 'maximize'
+    directions = []
+    for objective in objectives or ['benchmark']:
+        if objective not in OBJECTIVE_DIRECTIONS:
+            raise NotImplementedError('The specified objective {} is not supported.'.format(objective))
+        directions.append(OBJECTIVE_DIRECTIONS[objective] or benchmark_direction)
+    return directions
+
+
+def is_pruning_supported(objectives):
+    """
+    the intermediate values reported for pruning are the benchmark values(not supported by multi-objective studies)
+    """
+    return objectives in ([], ['benchmark'])
+
 
 class Objective:
     def __init__(self,
@@ -15,34 +50,132 @@ class Objective:
                                             params_json_dir=tune_config.parameter_json_dir)
         self.data_load_interval = tune_config.data_load_interval
         self.warm_up_interval = tune_config.warm_up_interval
+        self.reload_only_fast_path = strtobool(tune_config.reload_only_fast_path)
+        self.postgres_server_config = postgres_server_config
+        self.collect_metrics = strtobool(tune_config.collect_metrics)
+        self.metrics_interval_second = tune_config.metrics_interval_second
+        self.objectives = tune_config.objectives  # empty : benchmark only
+        get_objective_directions(tune_config.benchmark, self.objectives)  # check the objectives
         self.workload = None
+        # False : the page cache of the server is kept(shared with the other clusters in parallel tuning)
+        self.free_cache = True
+        self.trial_count = 0  # number of trials run by this objective(trial.number is shared in the study)
 
     def __call__(self, trial):
+        start_restart_count = self.params.restart_count
+        try:
+            # 1. set all trial values in postgresql.auto.conf(applied by the restart before the benchmark)
+            restart_required = self.change_tune_param(trial)  # change parameter value(trial values)
+            # 2. prepare the database, 3. restart(apply parameters and free cache), 4. benchmark
+            # Note: When a restart is required, the database is prepared and vacuumed with the settings of
+            #       the previous trial, because the trial values are applied only by the restart after them
+            #       (the restart also drops the shared buffers warmed by the preparation).
+            tps = self.run_workload(trial, restart_required=restart_required)  # run workload
+        finally:
+            # recorded also for the pruned and failed trials
+            trial.set_user_attr('restart_count', self.params.restart_count - start_restart_count)
+        # The trial values are kept until the next trial, which resets postgresql.auto.conf
+        # before setting its own values, so no restart is needed at the end of a trial.
+
+        if not self.objectives:
+            return tps
+        objective_values = [self.get_objective_value(objective, tps, trial) for objective in self.objectives]
+        logger.info('trail#{} objective values : {}'.format(trial.number, dict(zip(self.objectives,
+                                                                                   objective_values))))
+        return objective_values[0] if len(objective_values) == 1 else tuple(objective_values)
+
+    def check_objectives(self):
+        """
+        check that the workload measures the values of the objectives(before the first benchmark)
+        """
+        for objective in self.objectives:
+            if objective in ('p95_latency', 'p99_latency') and not self.workload.is_latency_measured():
+                raise ValueError('The objective {} is not supported by the workload {}. '
+                                 'The latency of the statements is not measured(pgbench : set latency_log = '
+                                 'transaction).'.format(objective, type(self.workload).__name__))
 
-        self.change_tune_param(trial)  # change parameter value(trial values)
-        tps = self.run_workload(trial)  # run workload
-        self.reset_param()  # reset parameter value
+    def get_objective_value(self, objective, benchmark_value, trial):
+        if objective == 'benchmark':
+            return benchmark_value
+        elif objective in ('p95_latency', 'p99_latency'):
+            return self.workload.get_latency_percentile(int(objective[1:3]))
+        elif objective == 'memory_footprint':
+            return self.get_memory_footprint_mb(trial)
+        raise NotImplementedError('The specified objective {} is not supported.'.format(objective))
 
-        return tps
+    def get_memory_footprint_mb(self, trial):
+        """
+        shared_buffers + max_connections * work_mem(MB) of the trial values
+        (the values of the parameters that are not tuned are read from PostgreSQL)
+        """
+        get_settings_sql = "SELECT pg_size_bytes(current_setting('shared_buffers')), " \
+                           "current_setting('max_connections')::bigint, " \
+                           "pg_size_bytes(current_setting('work_mem'))"
+        with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(get_settings_sql)
+                shared_buffers, max_connections, work_mem = cur.fetchone()
+        shared_buffers = trial.params.get('shared_buffers', shared_buffers)
+        max_connections = trial.params.get('max_connections', max_connections)
+        work_mem = trial.params.get('work_mem', work_mem)
+        return (shared_buffers + max_connections * work_mem) / 1024 ** 2
 
     def change_tune_param(self, trial):
         trial_array = self.get_tune_param(trial)  # parameter tuning
-        self.params.change_param_to_trial_values(trial_array)  # change parameters to trial values using ALTER SYSTEM
+        # change parameters to trial values using ALTER SYSTEM
+        restart_required = self.params.change_param_to_trial_values(trial_array,
+                                                                    reload_only=self.reload_only_fast_path)
+        if not restart_required:
+            logger.info('trail#{} parameters applied using pg_reload_conf(without restart)'.format(trial.number))
         trial_conf_path = self.params.save_trial_values_as_conf(study_name=trial.study.study_name,
                                                                 trial_number=trial.number,
                                                                 params_trial=trial_array, save_dir='./trial_conf/')
         # save trial param values as postgresql.conf
         logger.info('trail#{} conf saved : {}'.format(trial.number, trial_conf_path))
+        trial.set_user_attr('trial_conf_path', trial_conf_path)
+        return restart_required
 
-    def run_workload(self, trial):
-        self.params.reset_database(is_free_cache=False)
-        if (int(trial.number) == 0) or (int(trial.number) % self.data_load_interval == 0):
+    def run_workload(self, trial, restart_required=True):
+        trial_index = self.trial_count
+        self.trial_count += 1
+        server_restarted = False
+        if trial_index % self.data_load_interval == 0:
             self.workload.prepare_workload_database()
+            trial.set_user_attr('reset_phase_seconds', self.workload.reset_phase_seconds)
+            # e.g. the snapshot reset stops and starts PostgreSQL, which applies the trial values
+            server_restarted = self.workload.reset_engine.server_restarted
+            if server_restarted:
+                self.params.restart_count += 1
         self.workload.vacuum_database()  # vacuum analyze
-        self.params.reset_database()  # cache free and database restart
-        if (int(trial.number) == 0) or (int(trial.number) % self.warm_up_interval == 0):
+        if restart_required and not server_restarted:
+            # cache free and database restart(apply trial values)
+            self.params.reset_database(is_free_cache=self.free_cache)
+        elif self.free_cache:
+            # the trial values were applied by pg_reload_conf or by the restart of the reset,
+            # the page cache is freed like after the restart
+            # (with pg_reload_conf, the shared buffers are still warm, restart_count = 0 distinguishes these trials)
+            self.params.free_cache()
+        trial.set_user_attr('cache_freed', bool(self.free_cache))
+        if trial_index % self.warm_up_interval == 0:
             self.workload.warm_up()  # run warm_up_command
-        objective_value = self.workload.run()  # benchmark run
+        metrics_collector = None
+        if self.collect_metrics:
+            # database and OS metrics during the benchmark
+            # path : ./trial_metrics/<study_name>_#<trial_number>_metrics.jsonl.gz
+            metrics_file_path = os.path.join('./trial_metrics/', '{}_#{}_metrics.jsonl.gz'.format(
+                trial.study.study_name, trial.number))
+            metrics_collector = MetricsCollector(self.postgres_server_config, metrics_file_path,
+                                                 interval_second=self.metrics_interval_second)
+            metrics_collector.start()
+        try:
+            # the intermediate values are not reported when they are not the values of the objective
+            objective_value = self.workload.run(trial=trial if is_pruning_supported(self.objectives) else None)
+        finally:
+            if metrics_collector is not None:
+                metrics_collector.stop()
+                trial.set_user_attr('metrics_file_path', metrics_collector.save_file_path)
+        for key, value in self.workload.get_trial_user_attrs().items():
+            trial.set_user_attr(key, value)
         return objective_value
 
     def reset_param(self):
@@ -0,0 +1,30 @@
+from logging import getLogger
+from pgopttune.objective.objective_my_workload import ObjectiveMyWorkload
+from pgopttune.objective.objective_sampled_workload import ObjectiveSampledWorkload
+from pgopttune.objective.objective_pgbench import ObjectivePgbench
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+from pgopttune.config.tune_config import TuneConfig
+from pgopttune.config.my_workload_config import MyWorkloadConfig
+from pgopttune.config.sampled_workload_config import SampledWorkloadConfig
+from pgopttune.config.pgbench_config import PgbenchConfig
+
+logger = getLogger(__name__)
+
+
+def get_objective(postgres_server_config: PostgresServerConfig, tune_config: TuneConfig, conf_path):
+    # my workload
+    if tune_config.benchmark == 'my_workload':
+        my_workload_config = MyWorkloadConfig(conf_path)  # pgbench config
+        objective = ObjectiveMyWorkload(postgres_server_config, tune_config, my_workload_config)
+    # sampled workload (save using sampling_workload.py)
+    elif tune_config.benchmark == 'sampled_workload':
+        sampled_workload_config = SampledWorkloadConfig(conf_path)  # my workload sampled config
+        objective = ObjectiveSampledWorkload(postgres_server_config, tune_config, sampled_workload_config)
+    # pgbench
+    elif tune_config.benchmark == 'pgbench':
+        pgbench_config = PgbenchConfig(conf_path)
+        objective = ObjectivePgbench(postgres_server_config, tune_config, pgbench_config)
+    else:
+        raise NotImplementedError('This benchmark tool is not supported at this time.')
+    objective.check_objectives()  # the objectives are checked before the study starts
+    return objective
@@ -1,4 +1,5 @@
 from logging import getLogger
+from distutils.util import strtobool
 from pgopttune.workload.sampled_workload import SampledWorkload
 from pgopttune.objective.objective import Objective
 from pgopttune.config.postgres_server_config import PostgresServerConfig
@@ -15,5 +16,13 @@ class ObjectiveSampledWorkload(Objective):
                  tune_config: TuneConfig,
                  sampled_workload_config: SampledWorkloadConfig):
         super().__init__(postgres_server_config, tune_config)
-        self.workload = SampledWorkload.load_sampled_workload(sampled_workload_config.my_workload_save_file,
-                                                              postgres_server_config=postgres_server_config)
+        self.workload = SampledWorkload.load_sampled_workload(
+            sampled_workload_config.my_workload_save_file,
+            postgres_server_config=postgres_server_config,
+            replay_engine=sampled_workload_config.replay_engine,
+            replay_process_num=sampled_workload_config.replay_process_num,
+            max_dispatch_lag_second=sampled_workload_config.max_dispatch_lag_second,
+            use_prepared_statements=strtobool(sampled_workload_config.use_prepared_statements),
+            scale_up_sampled_sessions=strtobool(sampled_workload_config.scale_up_sampled_sessions),
+            objective=sampled_workload_config.objective,
+            objective_template_pattern=sampled_workload_config.objective_template_pattern)
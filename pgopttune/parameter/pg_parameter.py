@@ -13,6 +13,7 @@ logger = getLogger(__name__)
 class PostgresParameter:
     def __init__(self, postgres_server_config: PostgresServerConfig):
         self.postgres_server_config = postgres_server_config
+        self.restart_count = 0  # number of PostgreSQL restarts
 
     def get_parameter_value(self, param_name=None):
         if param_name is None:
@@ -25,6 +26,20 @@ class PostgresParameter:
                 row = cur.fetchone()
         return row['setting']
 
+    def get_parameter_contexts(self, param_names=None):
+        """
+        get the context of parameters(postmaster, sighup, superuser, user, ...)
+        """
+        if param_names is None:
+            raise ValueError('Parameter name is not specified.')
+        get_parameter_contexts_sql = "SELECT name, context FROM pg_catalog.pg_settings WHERE name = ANY(%s)"
+        # use psycopg2
+        with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cur:
+                cur.execute(get_parameter_contexts_sql, (list(param_names),))
+                rows = cur.fetchall()
+        return {row['name']: row['context'] for row in rows}
+
     def set_parameter(self, param_name=None, param_value=None, pg_reload=False):
         if param_name is None or param_value is None:
             raise ValueError('Parameter or Value is not specified.')
@@ -36,6 +51,23 @@ class PostgresParameter:
         if pg_reload:
             self._reload_conf()
 
+    def set_parameters(self, param_values=None, reset_all=False, pg_reload=False):
+        """
+        set multiple parameters using ALTER SYSTEM on a single connection
+        """
+        if param_values is None:
+            raise ValueError('Parameter values are not specified.')
+        # use psycopg2
+        with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
+            conn.set_session(autocommit=True)  # ALTER SYSTEM cannot run inside a transaction block
+            with conn.cursor() as cur:
+                if reset_all:
+                    cur.execute("ALTER SYSTEM RESET ALL")  # postgresql.auto.conf clear
+                for param_name, param_value in param_values.items():
+                    cur.execute("ALTER SYSTEM SET {} = '{}'".format(param_name, param_value))
+        if pg_reload:
+            self._reload_conf()
+
     def reset_param(self):
         """
         reset postgresql.auto.conf
@@ -56,26 +88,50 @@ class PostgresParameter:
         if is_free_cache:
             self._free_cache()
 
+    def free_cache(self):
+        """
+        free the page cache of the PostgreSQL server without restarting(the shared buffers are kept)
+        """
+        self._free_cache()
+
+    def stop_database(self):
+        logger.debug('Stop PostgreSQL.')
+        self._run_pg_ctl('stop -m fast')
+
+    def start_database(self):
+        logger.debug('Start PostgreSQL.')
+        self._run_pg_ctl('start')
+        self._wait_startup_database()
+
     def _restart_database(self):
-        restart_database_cmd = 'sudo -i -u {} {}/pg_ctl -D {} -w -t 600 restart'.format(
-            self.postgres_server_config.os_user, self.postgres_server_config.pgbin,
-            self.postgres_server_config.pgdata)
         logger.debug('Restart PostgreSQL.')
+        self.restart_count += 1
+        self._run_pg_ctl('restart')
+
+    def _run_pg_ctl(self, action):
+        pg_ctl_cmd = '{}/pg_ctl -D {} -w -t 600 {}'.format(self.postgres_server_config.pgbin,
+                                                            self.postgres_server_config.pgdata, action)
         # localhost PostgreSQL
         if self.postgres_server_config.host == '127.0.0.1' or self.postgres_server_config.host == 'localhost':
-            run_command(restart_database_cmd, stdout_devnull=True)
+            run_command('sudo -i -u {} {}{}'.format(self.postgres_server_config.os_user,
+                                                    self._get_cpu_affinity_cmd_prefix(), pg_ctl_cmd),
+                        stdout_devnull=True)
         # remote PostgreSQL
         else:
-            restart_database_cmd = '{}/pg_ctl -D {} -w -t 600 restart'.format(self.postgres_server_config.pgbin,
-                                                                              self.postgres_server_config.pgdata)
             ssh = SSHCommandExecutor(user=self.postgres_server_config.os_user,
                                      password=self.postgres_server_config.ssh_password,
                                      hostname=self.postgres_server_config.host,
                                      port=self.postgres_server_config.ssh_port)
-            ret = ssh.exec(restart_database_cmd)
+            ret = ssh.exec(pg_ctl_cmd)
             if not ret['retval'] == 0:
-                raise ValueError('PostgreSQL restart failed.\n'
-                                 'Restart command : {}'.format(restart_database_cmd))
+                raise ValueError('PostgreSQL {} failed.\n'
+                                 'Command : {}'.format(action.split()[0], pg_ctl_cmd))
+
+    def _get_cpu_affinity_cmd_prefix(self):
+        # pin PostgreSQL(postmaster and its child processes) to the cpu set of the cluster
+        if self.postgres_server_config.cpu_set is None:
+            return ''
+        return 'taskset -c {} '.format(self.postgres_server_config.cpu_set)
 
     def _wait_startup_database(self, max_retry=300, sleep_time=2):
         is_in_recovery_sql = 'SELECT pg_is_in_recovery()'
@@ -4,7 +4,6 @@ import shutil
 from logging import getLogger
 from pgopttune.resource.hardware import HardwareResource
 from pgopttune.utils.unit import get_param_raw, format_bytes_str, format_milliseconds_str
-from pgopttune.utils.pg_connect import get_pg_connection
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 from pgopttune.parameter.pg_parameter import PostgresParameter
 
@@ -24,6 +23,8 @@ class PostgresTuneParameter(PostgresParameter):
         if not os.path.exists(self.tune_parameters_json_path):
             raise ValueError("tune paramer file does not exist. path : {}".format(self.tune_parameters_json_path))
         self.tune_parameters = self.raw_size_parameters()
+        self.applied_values = None  # values currently set in postgresql.auto.conf(None : unknown)
+        self._parameter_contexts = None
 
     def raw_size_parameters(self):
         tune_parameters = self.load_json_parameters(self.tune_parameters_json_path)
@@ -40,21 +41,42 @@ class PostgresTuneParameter(PostgresParameter):
             raw_size_parameters.append(raw_size_parameter)
         return raw_size_parameters
 
-    def change_param_to_trial_values(self, params_trial=None):
+    def change_param_to_trial_values(self, params_trial=None, reload_only=False):
         """
         change postgresql.auto.conf to trial values using ALTER SYSTEM
+        If reload_only is True and no parameter that requires a restart has changed,
+        only the changed parameters are set and applied using pg_reload_conf().
+        Returns True if PostgreSQL needs to be restarted to apply the trial values.
         """
-        # clear postgresql.auto.conf
-        self.reset_param()
-        # setting trial values
-        for param_trial in params_trial:
-            param_name, param_trial_value = self._convert_trial_value_unit(param_trial)
-            alter_system_sql = "ALTER SYSTEM SET {} = '{}'".format(param_name, param_trial_value)
-            # use psycopg2
-            with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
-                conn.set_session(autocommit=True)
-                with conn.cursor() as cur:
-                    cur.execute(alter_system_sql)
+        trial_values = dict(self._convert_trial_value_unit(param_trial) for param_trial in params_trial)
+        if reload_only and self.applied_values is not None:
+            changed_values = {param_name: param_value for param_name, param_value in trial_values.items()
+                              if str(self.applied_values.get(param_name)) != str(param_value)}
+            if not self.check_restart_required(changed_values.keys()):
+                self.set_parameters(changed_values, pg_reload=True)
+                logger.debug('Changed parameters are applied using pg_reload_conf(). '
+                             'Changed parameters : {}'.format(list(changed_values.keys())))
+                self.applied_values = trial_values
+                return False
+        # clear postgresql.auto.conf and set trial values(applied at the next restart)
+        self.set_parameters(trial_values, reset_all=True)
+        self.applied_values = trial_values
+        return True
+
+    def reset_param(self):
+        super().reset_param()
+        self.applied_values = None
+
+    def check_restart_required(self, param_names):
+        """
+        check whether any of the parameters can only be changed at server start(context = postmaster)
+        """
+        if self._parameter_contexts is None:
+            self._parameter_contexts = self.get_parameter_contexts(
+                [tune_parameter['name'].strip() for tune_parameter in self.tune_parameters])
+        # parameters not found in pg_settings are treated as requiring a restart
+        return any(self._parameter_contexts.get(param_name.strip(), 'postmaster') == 'postmaster'
+                   for param_name in param_names)
 
     def change_conf_to_trial_values(self, params_trial=None):
         """
@@ -114,8 +136,9 @@ class PostgresTuneParameter(PostgresParameter):
 
     @staticmethod
     def create_tune_parameter_json(host, major_version, params_json_dir='./conf',
-                                   estimate_max_wal_size=None, estimate_checkpoint_timeout=None):
-        hardware = HardwareResource(host=host)
+                                   estimate_max_wal_size=None, estimate_checkpoint_timeout=None, hardware=None):
+        if hardware is None:
+            hardware = HardwareResource(host=host)
         tune_parameter_json_path = '{}/version-{}.json'.format(params_json_dir, major_version)
         tune_parameter_json_backup_path = '{}/version-{}.json.org'.format(params_json_dir, major_version)
         tune_parameters = PostgresTuneParameter.load_json_parameters(tune_parameter_json_path)
@@ -0,0 +1,25 @@
+import optuna
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+def get_pruner(pruning_mode, percentile=25.0, pruning_supported=True):
+    if not pruning_supported and pruning_mode != 'NopPruner':
+        # e.g. multi-objective study
+        logger.warning('Pruning is not supported with the specified objectives, {} is not used.'
+                       .format(pruning_mode))
+        pruning_mode = 'NopPruner'
+    if pruning_mode == 'NopPruner':
+        pruner = optuna.pruners.NopPruner()
+    elif pruning_mode == 'MedianPruner':
+        pruner = optuna.pruners.MedianPruner()
+    elif pruning_mode == 'PercentilePruner':
+        pruner = optuna.pruners.PercentilePruner(percentile)
+    elif pruning_mode == 'SuccessiveHalvingPruner':
+        pruner = optuna.pruners.SuccessiveHalvingPruner()
+    elif pruning_mode == 'HyperbandPruner':
+        pruner = optuna.pruners.HyperbandPruner()
+    else:
+        raise NotImplementedError('The specified pruning mode {} is not supported.'.format(pruning_mode))
+    return pruner
@@ -0,0 +1,146 @@
+import os
+import time
+import shlex
+import shutil
+from logging import getLogger
+from pgopttune.reset.reset_engine import ResetEngine
+from pgopttune.workload.backup_catalog import select_evicted_backups
+from pgopttune.utils.command import run_command
+from pgopttune.utils.pg_connect import get_pg_connection, get_pg_dsn
+
+logger = getLogger(__name__)
+
+MAINTENANCE_DATABASE = 'postgres'
+
+
+def get_pg_dump_command(pgbin, dump_path, database, jobs=1):
+    """
+    directory format dump of the database(the tables are dumped in parallel)
+    """
+    return '{} -Fd -j {} -f {} {}'.format(os.path.join(pgbin, 'pg_dump'), jobs, shlex.quote(dump_path),
+                                          shlex.quote(database))
+
+
+def get_pg_restore_commands(pgbin, dump_path, database, jobs=1):
+    """
+    Returns [(phase, command), ...] that restore the dump into the empty database
+    pre-data : tables and other definitions, data : rows of the tables in parallel,
+    post-data : indexes and constraints built in parallel
+    """
+    pg_restore = os.path.join(pgbin, 'pg_restore')
+    commands = []
+    for section in ('pre-data', 'data', 'post-data'):
+        jobs_option = '-j {} '.format(jobs) if section != 'pre-data' else ''
+        commands.append((section.replace('-', '_'), '{} --section={} {}-d {} {}'.format(
+            pg_restore, section, jobs_option, shlex.quote(database), shlex.quote(dump_path))))
+    return commands
+
+
+def get_drop_database_sqls(database, server_version_num):
+    """
+    Returns the SQLs that drop the database even if other sessions are connected to it
+    """
+    if server_version_num >= 130000:  # DROP DATABASE ... WITH (FORCE) is available in PostgreSQL 13 or later
+        return ['DROP DATABASE IF EXISTS "{}" WITH (FORCE)'.format(database)]
+    terminate_sql = "SELECT pg_terminate_backend(pid) FROM pg_stat_activity " \
+                    "WHERE datname = '{}' AND pid <> pg_backend_pid()".format(database)
+    return [terminate_sql, 'DROP DATABASE IF EXISTS "{}"'.format(database)]
+
+
+def get_dump_usages(dump_cluster_dir):
+    """
+    Returns [(dump name, size(bytes), last used time(modification time of the dump directory)), ...]
+    """
+    dumps = []
+    for dump_name in os.listdir(dump_cluster_dir):
+        dump_path = os.path.join(dump_cluster_dir, dump_name)
+        if not os.path.isfile(os.path.join(dump_path, 'toc.dat')):
+            continue
+        size = sum(os.path.getsize(os.path.join(dir_path, file_name))
+                   for dir_path, _, file_names in os.walk(dump_path) for file_name in file_names)
+        dumps.append((dump_name, size, os.path.getmtime(dump_path)))
+    return dumps
+
+
+class DumpReset(ResetEngine):
+    """
+    Keep a directory format dump(pg_dump -Fd) of the loaded data on this host,
+    and recreate the workload database with the parallel restore(pg_restore -j).
+    The template database is not used, so the reset does not fail when a session is connected to it.
+    The least recently used dumps of the cluster are deleted when they exceed backup_disk_budget_gb.
+    """
+    name = 'dump'
+
+    def __init__(self, workload):
+        super().__init__(workload)
+        self.pgbin = self.postgres_server_config.pgbin
+        self.jobs = self.postgres_server_config.restore_jobs
+        # the dump of each cluster and each loaded data
+        self.dump_cluster_dir = os.path.join(self.postgres_server_config.dump_dir, '{}_{}'.format(
+            self.postgres_server_config.host, self.postgres_server_config.port))
+        self.dump_path = os.path.join(self.dump_cluster_dir, workload._get_backup_database_name())
+        self.maintenance_dsn = get_pg_dsn(pghost=self.postgres_server_config.host,
+                                          pgport=self.postgres_server_config.port,
+                                          pguser=self.postgres_server_config.user,
+                                          pgpassword=self.postgres_server_config.password,
+                                          pgdatabase=MAINTENANCE_DATABASE)
+        os.environ['PGHOST'] = self.postgres_server_config.host
+        os.environ['PGPORT'] = self.postgres_server_config.port
+        os.environ['PGUSER'] = self.postgres_server_config.user
+        os.environ['PGPASSWORD'] = self.postgres_server_config.password
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.dump_path, 'toc.dat'))
+
+    def save(self):
+        self.phase_seconds = {}
+        start_time = time.time()
+        os.makedirs(self.dump_cluster_dir, exist_ok=True)
+        dump_cmd = get_pg_dump_command(self.pgbin, self.dump_path, self.postgres_server_config.database,
+                                       jobs=self.jobs)
+        logger.debug('Run pg_dump : {}'.format(dump_cmd))
+        with self.measure_phase('dump'):
+            run_command(dump_cmd)
+        logger.debug('The dump is saved. ({:.1f}s) Dump : {}'.format(time.time() - start_time, self.dump_path))
+        with self.measure_phase('evict'):
+            self._evict()
+
+    def restore(self):
+        self.phase_seconds = {}
+        database = self.postgres_server_config.database
+        with self.measure_phase('recreate_database'):
+            with get_pg_connection(dsn=self.maintenance_dsn) as conn:
+                conn.set_session(autocommit=True)
+                with conn.cursor() as cur:
+                    for sql in get_drop_database_sqls(database, self.workload._get_server_version_num()):
+                        cur.execute(sql)
+                    cur.execute('CREATE DATABASE "{}" TEMPLATE template0'.format(database))
+        for phase, restore_cmd in get_pg_restore_commands(self.pgbin, self.dump_path, database, jobs=self.jobs):
+            logger.debug('Run pg_restore : {}'.format(restore_cmd))
+            with self.measure_phase(phase):
+                run_command(restore_cmd)
+        # the dump does not have the planner statistics and the visibility map, and the activity statistics of
+        # the restored tables may not be reported yet, so the whole database is vacuumed here
+        with self.measure_phase('analyze'):
+            self.workload.vacuum_analyze_database()
+        self.statistics_restored = True
+        with self.measure_phase('evict'):
+            os.utime(self.dump_path)  # the last used time of the dump
+            self._evict()
+        logger.debug('The database is restored from the dump. Elapsed time of each phase(s) : {}'
+                     .format(self.phase_seconds))
+
+    def _evict(self):
+        """
+        delete the least recently used dumps(except the dump of this workload)
+        until the dumps of the cluster fit within the disk budget
+        """
+        disk_budget_bytes = self.postgres_server_config.backup_disk_budget_bytes
+        if disk_budget_bytes is None:
+            return []
+        evicted_dumps = select_evicted_backups(get_dump_usages(self.dump_cluster_dir), disk_budget_bytes,
+                                               keep_backup_database=os.path.basename(self.dump_path))
+        for dump_name in evicted_dumps:
+            shutil.rmtree(os.path.join(self.dump_cluster_dir, dump_name))
+            logger.info('The least recently used dump is deleted. Dump : {}'.format(dump_name))
+        return evicted_dumps
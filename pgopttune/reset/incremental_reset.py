@@ -0,0 +1,129 @@
+import time
+import tempfile
+from logging import getLogger
+import psycopg2
+from pgopttune.reset.template_reset import TemplateReset
+from pgopttune.utils.pg_connect import get_pg_connection
+
+logger = getLogger(__name__)
+
+GET_TABLE_STATS_SQL = """
+SELECT
+     quote_ident(schemaname) || '.' || quote_ident(relname),
+     n_tup_ins + n_tup_upd + n_tup_del,
+     pg_relation_filenode(relid)
+FROM
+     pg_stat_user_tables
+"""
+GET_STATS_RESET_SQL = "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+GET_SEQUENCES_SQL = """
+SELECT
+     quote_ident(schemaname) || '.' || quote_ident(sequencename),
+     coalesce(last_value, start_value),
+     last_value IS NOT NULL
+FROM
+     pg_sequences
+"""
+STATS_FLUSH_WAIT_SECOND = 1  # wait until the statistics of the finished sessions are reported(PGSTAT_STAT_INTERVAL)
+
+
+def get_changed_tables(baseline_stats, current_stats):
+    """
+    stats : {'tables': {table: (number of inserted, updated and deleted rows, relation filenode)},
+             'stats_reset': time of the stats reset}
+    Returns the tables modified after the baseline(None if they cannot be determined from the statistics)
+    TRUNCATE(and VACUUM FULL, CLUSTER) is detected by the new filenode because it does not count the deleted rows.
+    """
+    if baseline_stats is None or baseline_stats['stats_reset'] != current_stats['stats_reset']:
+        return None  # the statistics were reset(e.g. crash recovery)
+    if set(baseline_stats['tables']) != set(current_stats['tables']):
+        return None  # tables were created or dropped
+    changed_tables = []
+    for table, (modified_rows, filenode) in current_stats['tables'].items():
+        baseline_modified_rows, baseline_filenode = baseline_stats['tables'][table]
+        if modified_rows < baseline_modified_rows:
+            return None
+        if modified_rows > baseline_modified_rows or filenode != baseline_filenode:
+            changed_tables.append(table)
+    return sorted(changed_tables)
+
+
+class IncrementalReset(TemplateReset):
+    """
+    Restore only the tables modified after the last reset(pg_stat_user_tables) from the backup database
+    using TRUNCATE and COPY, and reset the sequences to the values of the backup database.
+    The reset is skipped if no table was modified(read-only workload).
+    The whole database is recreated from the backup database(TemplateReset)
+    when the modified tables cannot be determined or cannot be truncated.
+    """
+    name = 'incremental'
+
+    def __init__(self, workload):
+        super().__init__(workload)
+        self.baseline_stats = None  # statistics just after the last reset
+
+    def save(self):
+        super().save()
+        with self.measure_phase('table_stats'):
+            self.baseline_stats = self._get_table_stats()
+
+    def restore(self):
+        self.phase_seconds = {}
+        with self.measure_phase('table_stats'):
+            changed_tables = get_changed_tables(self.baseline_stats, self._get_table_stats())
+        phase_seconds = self.phase_seconds
+        if changed_tables is None:
+            logger.debug('The modified tables are unknown. The whole database is restored.')
+            super().restore()
+        elif not changed_tables:
+            logger.debug('No table was modified. The reset is skipped.')
+            self.statistics_restored = True
+            return
+        else:
+            try:
+                with self.measure_phase('restore_tables'):
+                    self._restore_tables(changed_tables)
+                self.statistics_restored = False  # the restored tables are vacuumed
+            except psycopg2.Error as e:
+                # e.g. a table that was not modified refers to a modified table with a foreign key
+                logger.warning('The modified tables could not be restored. The whole database is restored. {}'
+                               .format(e))
+                super().restore()
+        # the phases of the whole database restore are added to the phases of the incremental reset
+        self.phase_seconds = dict(phase_seconds, **self.phase_seconds)
+        with self.measure_phase('baseline_table_stats'):
+            self.baseline_stats = self._get_table_stats()
+
+    def _restore_tables(self, tables):
+        start_time = time.time()
+        backup_conn = get_pg_connection(dsn=self.workload._get_backup_database_dsn())
+        conn = get_pg_connection(dsn=self.postgres_server_config.dsn)
+        try:
+            with backup_conn.cursor() as backup_cur, conn.cursor() as cur:
+                # the foreign keys are not checked while the tables are loaded
+                cur.execute('SET session_replication_role = replica')
+                cur.execute('TRUNCATE {}'.format(', '.join(tables)))
+                for table in tables:
+                    with tempfile.TemporaryFile() as f:
+                        backup_cur.copy_expert('COPY {} TO STDOUT (FORMAT binary)'.format(table), f)
+                        f.seek(0)
+                        cur.copy_expert('COPY {} FROM STDIN (FORMAT binary)'.format(table), f)
+                backup_cur.execute(GET_SEQUENCES_SQL)
+                for sequence, value, is_called in backup_cur.fetchall():
+                    cur.execute('SELECT setval(%s, %s, %s)', (sequence, value, is_called))
+            conn.commit()
+        finally:
+            backup_conn.close()
+            conn.close()  # the session reports the statistics of the loaded rows when it ends
+        logger.debug('{} modified tables are restored. ({:.1f}s) Tables : {}'
+                     .format(len(tables), time.time() - start_time, ', '.join(tables)))
+
+    def _get_table_stats(self):
+        time.sleep(STATS_FLUSH_WAIT_SECOND)
+        with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
+            with conn.cursor() as cur:
+                cur.execute(GET_TABLE_STATS_SQL)
+                tables = {table: (modified_rows, filenode) for table, modified_rows, filenode in cur.fetchall()}
+                cur.execute(GET_STATS_RESET_SQL)
+                stats_reset = cur.fetchone()[0]
+        return {'tables': tables, 'stats_reset': stats_reset}
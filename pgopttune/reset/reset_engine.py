@@ -0,0 +1,50 @@
+import time
+from logging import getLogger
+from contextlib import contextmanager
+
+logger = getLogger(__name__)
+
+
+class ResetEngine:
+    """
+    Restore the workload database to the state just after the data load.
+    """
+    name = None
+
+    def __init__(self, workload):
+        self.workload = workload
+        self.postgres_server_config = workload.postgres_server_config
+        self.phase_seconds = {}  # elapsed time of each phase of the last save or restore
+        # the last restore also restored the statistics and the visibility map(vacuum analyze is not required)
+        self.statistics_restored = False
+        # the last save or restore restarted PostgreSQL(the values of postgresql.auto.conf were applied)
+        self.server_restarted = False
+
+    def exists(self):
+        """
+        Returns True if the data just after the data load has been saved
+        """
+        raise NotImplementedError("subclasses of ResetEngine must provide an exists() method.")
+
+    def save(self):
+        """
+        save the data just after the data load
+        """
+        raise NotImplementedError("subclasses of ResetEngine must provide a save() method.")
+
+    def restore(self):
+        """
+        restore the saved data
+        """
+        raise NotImplementedError("subclasses of ResetEngine must provide a restore() method.")
+
+    @contextmanager
+    def measure_phase(self, phase):
+        """
+        record the elapsed time of the phase in phase_seconds
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.phase_seconds[phase] = round(time.time() - start_time, 3)
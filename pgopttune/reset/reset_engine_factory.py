@@ -0,0 +1,31 @@
+from logging import getLogger
+from pgopttune.reset.template_reset import TemplateReset
+from pgopttune.reset.snapshot_reset import SnapshotReset
+from pgopttune.reset.incremental_reset import IncrementalReset
+from pgopttune.reset.dump_reset import DumpReset
+
+logger = getLogger(__name__)
+
+
+def get_reset_engine(workload):
+    reset_method = workload.postgres_server_config.reset_method
+    # CREATE DATABASE ... TEMPLATE
+    if reset_method == 'template':
+        reset_engine = TemplateReset(workload)
+    # restore only the modified tables
+    elif reset_method == 'incremental':
+        reset_engine = IncrementalReset(workload)
+    # pg_dump and parallel pg_restore
+    elif reset_method == 'dump':
+        reset_engine = DumpReset(workload)
+    # filesystem snapshot of PGDATA
+    elif reset_method == 'snapshot':
+        reset_engine = SnapshotReset(workload, snapshot_method=workload.postgres_server_config.snapshot_method)
+        if reset_engine.snapshot_method is None:
+            logger.warning('No snapshot method is available. The database is reset using the template database.')
+            reset_engine = TemplateReset(workload)
+    else:
+        raise NotImplementedError('The specified reset method {} is not supported.'.format(reset_method))
+    logger.info('Reset method : {}'.format(reset_engine.name if reset_engine.name != 'snapshot'
+                                           else 'snapshot({})'.format(reset_engine.snapshot_method)))
+    return reset_engine
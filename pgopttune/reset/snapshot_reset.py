@@ -0,0 +1,305 @@
+import os
+import shlex
+import subprocess
+from logging import getLogger
+from urllib.parse import urlparse
+from pgopttune.reset.reset_engine import ResetEngine
+from pgopttune.workload.backup_catalog import select_evicted_backups
+from pgopttune.parameter.pg_parameter import PostgresParameter
+from pgopttune.utils.remote_command import SSHCommandExecutor
+
+logger = getLogger(__name__)
+
+# snapshot methods in the order of the automatic selection
+SNAPSHOT_METHODS = ('zfs', 'btrfs', 'reflink', 'rsync')
+# the trial values and the cluster settings are kept when PGDATA is restored
+PRESERVED_FILES = ('postgresql.conf', 'postgresql.auto.conf')
+BTRFS_SUBVOLUME_INODE = 256  # inode number of the root directory of a btrfs subvolume
+LAST_USED_DIR = 'last_used'  # files touched when the snapshots are saved or restored(LRU eviction)
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+
+def get_save_snapshot_command(snapshot_method, pgdata, snapshot_path, zfs_dataset=None):
+    """
+    command that saves PGDATA(the cluster is stopped) as the snapshot
+    """
+    if snapshot_method == 'zfs':
+        return 'zfs snapshot {}'.format(shlex.quote('{}@{}'.format(zfs_dataset, os.path.basename(snapshot_path))))
+    pgdata, snapshot_path = shlex.quote(pgdata), shlex.quote(snapshot_path)
+    if snapshot_method == 'btrfs':
+        return 'mkdir -p $(dirname {1}) && btrfs subvolume snapshot -r {0} {1}'.format(pgdata, snapshot_path)
+    elif snapshot_method == 'reflink':
+        # the copied files share the blocks of PGDATA until they are modified
+        return 'mkdir -p {1} && cp -a --reflink=always {0}/. {1}/'.format(pgdata, snapshot_path)
+    elif snapshot_method == 'rsync':
+        return 'mkdir -p {1} && rsync -a --delete {0}/ {1}/'.format(pgdata, snapshot_path)
+    raise NotImplementedError('The specified snapshot method {} is not supported.'.format(snapshot_method))
+
+
+def get_restore_snapshot_command(snapshot_method, pgdata, snapshot_path, zfs_dataset=None, zfs_latest=True):
+    """
+    command that restores PGDATA(the cluster is stopped) from the snapshot
+    zfs_latest : the ZFS snapshot is the latest snapshot of the dataset
+    """
+    if snapshot_method == 'zfs':
+        snapshot_name = os.path.basename(snapshot_path)
+        if zfs_latest:
+            return 'zfs rollback {}'.format(shlex.quote('{}@{}'.format(zfs_dataset, snapshot_name)))
+        # the rollback to an older snapshot would destroy the newer snapshots(of the other workloads),
+        # so the files are copied from the read-only snapshot directory of the dataset instead
+        return 'rsync -a --delete --exclude=/.zfs {1}/ {0}/'.format(
+            shlex.quote(pgdata), shlex.quote(os.path.join(pgdata, '.zfs', 'snapshot', snapshot_name)))
+    pgdata, snapshot_path = shlex.quote(pgdata), shlex.quote(snapshot_path)
+    if snapshot_method == 'btrfs':
+        return 'btrfs subvolume delete {0} && btrfs subvolume snapshot {1} {0}'.format(pgdata, snapshot_path)
+    elif snapshot_method == 'reflink':
+        # PGDATA itself is kept(it may be a mount point)
+        return 'find {0} -mindepth 1 -delete && cp -a --reflink=always {1}/. {0}/'.format(pgdata, snapshot_path)
+    elif snapshot_method == 'rsync':
+        # only the files modified after the snapshot(size or modification time) are copied.
+        # The files are not hard-linked because PostgreSQL updates the relation files in place.
+        return 'rsync -a --delete {1}/ {0}/'.format(pgdata, snapshot_path)
+    raise NotImplementedError('The specified snapshot method {} is not supported.'.format(snapshot_method))
+
+
+def get_delete_snapshot_command(snapshot_method, snapshot_path, zfs_dataset=None):
+    """
+    command that deletes the snapshot
+    """
+    if snapshot_method == 'zfs':
+        return 'zfs destroy {}'.format(shlex.quote('{}@{}'.format(zfs_dataset, os.path.basename(snapshot_path))))
+    elif snapshot_method == 'btrfs':
+        return 'btrfs subvolume delete {}'.format(shlex.quote(snapshot_path))
+    elif snapshot_method in ('reflink', 'rsync'):
+        return 'rm -rf {}'.format(shlex.quote(snapshot_path))
+    raise NotImplementedError('The specified snapshot method {} is not supported.'.format(snapshot_method))
+
+
+def get_list_snapshots_command(snapshot_method, snapshot_dir, zfs_dataset=None):
+    """
+    command that prints the name, the last used time(epoch) and the size(bytes) of each snapshot in snapshot_dir
+    """
+    if snapshot_method == 'zfs':
+        size_command = 'zfs list -Hp -o used {}@"$name"'.format(shlex.quote(zfs_dataset))
+    else:
+        # the blocks shared with PGDATA(reflink copy and btrfs snapshot) are also counted
+        size_command = 'du -sb {}/"$name" | cut -f1'.format(shlex.quote(snapshot_dir))
+    return 'cd {} || exit 0; for name in *; do [ -f "$name" ] && echo "$name $(stat -c %Y "$name") $({})"; done; ' \
+           'exit 0'.format(shlex.quote(os.path.join(snapshot_dir, LAST_USED_DIR)), size_command)
+
+
+def parse_snapshot_list(list_snapshots_output):
+    """
+    Returns [(snapshot name, size(bytes), last used time(epoch)), ...](output of get_list_snapshots_command)
+    """
+    snapshots = []
+    for line in list_snapshots_output.splitlines():
+        fields = line.split()
+        if len(fields) != 3 or not fields[1].isdigit() or not fields[2].isdigit():
+            continue  # e.g. the snapshot was deleted by hand
+        snapshots.append((fields[0], int(fields[2]), int(fields[1])))
+    return snapshots
+
+
+def is_database_url_on_cluster(database_url, host, port):
+    """
+    Returns True if the database of the URL(e.g. history_database_url) is on the PostgreSQL cluster host:port
+    """
+    url = urlparse(database_url)
+    if not url.scheme.startswith('postgresql'):
+        return False  # e.g. sqlite
+    url_host = url.hostname or 'localhost'  # no host : unix domain socket
+    if url_host != host and not (url_host in LOCAL_HOSTS and host in LOCAL_HOSTS):
+        return False
+    return str(url.port or 5432) == str(port)
+
+
+def is_latest_zfs_snapshot(zfs_list_output, zfs_dataset, snapshot_name):
+    """
+    Returns True if the snapshot is the latest snapshot of the dataset
+    (output of zfs list -H -t snapshot -o name -s creation -d 1 dataset)
+    """
+    snapshots = zfs_list_output.split()
+    return bool(snapshots) and snapshots[-1] == '{}@{}'.format(zfs_dataset, snapshot_name)
+
+
+def parse_zfs_dataset(zfs_list_output, pgdata):
+    """
+    Returns the ZFS dataset mounted on PGDATA(output of zfs list -H -o name,mountpoint PGDATA)
+    (None if PGDATA is not the mount point of a dataset, the rollback would also restore the other files)
+    """
+    for line in zfs_list_output.splitlines():
+        fields = line.split('\t')
+        if len(fields) == 2 and os.path.normpath(fields[1]) == os.path.normpath(pgdata):
+            return fields[0]
+    return None
+
+
+class SnapshotReset(ResetEngine):
+    """
+    Stop the cluster and restore PGDATA from a filesystem snapshot(ZFS, btrfs, reflink copy or rsync).
+    The reset time depends on the size of the modified data instead of the size of the database.
+    snapshot_method = 'auto' selects the first method of SNAPSHOT_METHODS available for PGDATA.
+    The whole cluster is restored, so the other databases of the cluster(e.g. the postgres database and
+    a study history database) are also reverted to the time of the snapshot.
+    The least recently used snapshots of the cluster are deleted when they exceed backup_disk_budget_gb.
+    """
+    name = 'snapshot'
+
+    def __init__(self, workload, snapshot_method='auto'):
+        super().__init__(workload)
+        self.params = PostgresParameter(self.postgres_server_config)
+        self.pgdata = os.path.normpath(self.postgres_server_config.pgdata)
+        # the snapshot of each cluster(port) and each loaded data
+        snapshot_dir = os.path.join(self.postgres_server_config.snapshot_dir, str(self.postgres_server_config.port))
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_path = os.path.join(snapshot_dir, workload._get_backup_database_name())
+        self.preserved_file_dir = os.path.join(snapshot_dir, 'preserved_files')
+        self.zfs_dataset = None
+        self.snapshot_method = self._select_snapshot_method(snapshot_method)
+
+    def exists(self):
+        if self.snapshot_method == 'zfs':
+            command = 'zfs list -H -t snapshot {}'.format(
+                shlex.quote('{}@{}'.format(self.zfs_dataset, os.path.basename(self.snapshot_path))))
+        else:
+            command = 'test -f {}'.format(shlex.quote(os.path.join(self.snapshot_path, 'PG_VERSION')))
+        return self._exec(command)[0] == 0
+
+    def save(self):
+        logger.debug('Save PGDATA as the snapshot. method : {}, snapshot : {}'.format(self.snapshot_method,
+                                                                                      self.snapshot_path))
+        self.phase_seconds = {}
+        self.server_restarted = True
+        with self.measure_phase('stop'):
+            self.params.stop_database()
+        try:
+            with self.measure_phase('snapshot'):
+                self._exec_check(get_save_snapshot_command(self.snapshot_method, self.pgdata, self.snapshot_path,
+                                                           zfs_dataset=self.zfs_dataset))
+        finally:
+            with self.measure_phase('start'):
+                self.params.start_database()
+        with self.measure_phase('evict'):
+            self._touch_snapshot()
+            self._evict()
+
+    def restore(self):
+        logger.debug('Restore PGDATA from the snapshot. method : {}, snapshot : {}'.format(self.snapshot_method,
+                                                                                           self.snapshot_path))
+        preserved_file_dir = shlex.quote(self.preserved_file_dir)
+        preserved_files = ' '.join(shlex.quote(os.path.join(self.pgdata, file_name)) for file_name in PRESERVED_FILES)
+        self.phase_seconds = {}
+        self.server_restarted = True
+        with self.measure_phase('stop'):
+            self.params.stop_database()
+        try:
+            with self.measure_phase('restore_snapshot'):
+                self._exec_check('mkdir -p {0} && cp -p {1} {0}/'.format(preserved_file_dir, preserved_files))
+                self._exec_check(get_restore_snapshot_command(self.snapshot_method, self.pgdata, self.snapshot_path,
+                                                              zfs_dataset=self.zfs_dataset,
+                                                              zfs_latest=self._is_latest_zfs_snapshot()))
+                self._exec_check('cp -p {}/* {}/'.format(preserved_file_dir, shlex.quote(self.pgdata)))
+            self.statistics_restored = True
+        finally:
+            with self.measure_phase('start'):
+                self.params.start_database()
+        with self.measure_phase('evict'):
+            self._touch_snapshot()
+            self._evict()
+
+    def _is_latest_zfs_snapshot(self):
+        if self.snapshot_method != 'zfs':
+            return True
+        zfs_list_output = self._exec_check('zfs list -H -t snapshot -o name -s creation -d 1 {}'.format(
+            shlex.quote(self.zfs_dataset)))
+        return is_latest_zfs_snapshot(zfs_list_output, self.zfs_dataset, os.path.basename(self.snapshot_path))
+
+    def _touch_snapshot(self):
+        # the last used time of the snapshot
+        last_used_dir = shlex.quote(os.path.join(self.snapshot_dir, LAST_USED_DIR))
+        self._exec_check('mkdir -p {0} && touch {0}/{1}'.format(
+            last_used_dir, shlex.quote(os.path.basename(self.snapshot_path))))
+
+    def _evict(self):
+        """
+        delete the least recently used snapshots(except the snapshot of this workload)
+        until the snapshots of the cluster fit within the disk budget
+        """
+        disk_budget_bytes = self.postgres_server_config.backup_disk_budget_bytes
+        if disk_budget_bytes is None:
+            return []
+        snapshots = parse_snapshot_list(self._exec_check(get_list_snapshots_command(
+            self.snapshot_method, self.snapshot_dir, zfs_dataset=self.zfs_dataset)))
+        deleted_snapshots = []
+        for snapshot_name in select_evicted_backups(snapshots, disk_budget_bytes,
+                                                    keep_backup_database=os.path.basename(self.snapshot_path)):
+            delete_command = '{} && rm -f {}'.format(
+                get_delete_snapshot_command(self.snapshot_method, os.path.join(self.snapshot_dir, snapshot_name),
+                                            zfs_dataset=self.zfs_dataset),
+                shlex.quote(os.path.join(self.snapshot_dir, LAST_USED_DIR, snapshot_name)))
+            retval, output = self._exec(delete_command)
+            if retval != 0:
+                logger.warning('The snapshot {} could not be deleted. {}'.format(snapshot_name, output))
+                continue
+            deleted_snapshots.append(snapshot_name)
+            logger.info('The least recently used snapshot is deleted. Snapshot : {}'.format(snapshot_name))
+        return deleted_snapshots
+
+    def _select_snapshot_method(self, snapshot_method):
+        """
+        Returns the snapshot method available for PGDATA(None : no method is available)
+        """
+        if snapshot_method not in ('auto',) + SNAPSHOT_METHODS:
+            raise NotImplementedError('The specified snapshot method {} is not supported.'.format(snapshot_method))
+        pgdata = shlex.quote(self.pgdata)
+        # WAL and tablespaces outside of PGDATA would not be restored together with PGDATA
+        if self._exec('test -L {0}/pg_wal || test -n "$(ls -A {0}/pg_tblspc)"'.format(pgdata))[0] == 0:
+            logger.warning('PGDATA has the WAL directory or tablespaces outside of it, so it cannot be snapshotted.')
+            return None
+        _, file_system_type = self._exec('stat -f -c %T {}'.format(pgdata))
+        if snapshot_method in ('auto', 'zfs') and file_system_type.strip() == 'zfs':
+            _, zfs_list_output = self._exec('zfs list -H -o name,mountpoint {}'.format(pgdata))
+            self.zfs_dataset = parse_zfs_dataset(zfs_list_output, self.pgdata)
+            if self.zfs_dataset is not None:
+                return 'zfs'
+        if snapshot_method in ('auto', 'btrfs') and file_system_type.strip() == 'btrfs' and \
+                self._exec('test "$(stat -c %i {})" = {}'.format(pgdata, BTRFS_SUBVOLUME_INODE))[0] == 0:
+            return 'btrfs'
+        if snapshot_method in ('auto', 'reflink'):
+            # the snapshot directory must be on the file system of PGDATA
+            test_path = shlex.quote(os.path.join(os.path.dirname(self.snapshot_path), '.reflink_test'))
+            if self._exec('mkdir -p $(dirname {1}) && cp --reflink=always {0}/PG_VERSION {1} && rm -f {1}'
+                          .format(pgdata, test_path))[0] == 0:
+                return 'reflink'
+        if snapshot_method in ('auto', 'rsync') and self._exec('command -v rsync')[0] == 0:
+            return 'rsync'
+        if snapshot_method != 'auto':
+            logger.warning('The snapshot method {} is not available for {}.'.format(snapshot_method, self.pgdata))
+        return None
+
+    def _exec_check(self, command):
+        retval, output = self._exec(command)
+        if retval != 0:
+            raise ValueError('The command to reset the database failed.\n'
+                             'Command : {}\n'
+                             'Output : {}'.format(command, output))
+        return output
+
+    def _exec(self, command):
+        """
+        run the command as root on the PostgreSQL server
+        Returns (return code, stdout and stderr)
+        """
+        command = 'sudo sh -c {}'.format(shlex.quote(command))
+        # localhost PostgreSQL
+        if self.postgres_server_config.host == '127.0.0.1' or self.postgres_server_config.host == 'localhost':
+            res = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            return res.returncode, res.stdout.decode('utf8')
+        # remote PostgreSQL
+        ssh = SSHCommandExecutor(user=self.postgres_server_config.os_user,
+                                 password=self.postgres_server_config.ssh_password,
+                                 hostname=self.postgres_server_config.host,
+                                 port=self.postgres_server_config.ssh_port)
+        ret = ssh.exec(command, only_retval=False)
+        return ret['retval'], ''.join(ret['stdout'] + ret['stderr'])
@@ -0,0 +1,41 @@
+from logging import getLogger
+from pgopttune.reset.reset_engine import ResetEngine
+from pgopttune.workload.backup_catalog import BackupCatalog
+
+logger = getLogger(__name__)
+
+
+class TemplateReset(ResetEngine):
+    """
+    Keep a backup database and recreate the workload database using it as a template(CREATE DATABASE ... TEMPLATE).
+    """
+    name = 'template'
+
+    def exists(self):
+        return self.workload.check_exist_backup_database()
+
+    def save(self):
+        self.phase_seconds = {}
+        with self.measure_phase('create_backup_database'):
+            self.workload.create_backup_database()
+        with self.measure_phase('evict'):
+            backup_catalog = BackupCatalog(self.postgres_server_config)
+            backup_catalog.register(self.workload._get_backup_database_name(), self.workload._get_backup_key(),
+                                    self.workload.get_data_definition(), self.workload._get_server_version_num())
+            self._evict(backup_catalog)
+
+    def restore(self):
+        self.phase_seconds = {}
+        with self.measure_phase('drop_database'):
+            self.workload.drop_database()
+        with self.measure_phase('create_database'):
+            self.workload.create_database_use_backup_database()
+        self.statistics_restored = True
+        with self.measure_phase('evict'):
+            backup_catalog = BackupCatalog(self.postgres_server_config)
+            backup_catalog.touch(self.workload._get_backup_database_name())
+            self._evict(backup_catalog)
+
+    def _evict(self, backup_catalog):
+        # drop the least recently used backups(except the backup of this workload) if they exceed the disk budget
+        backup_catalog.evict(keep_backup_database=self.workload._get_backup_database_name())
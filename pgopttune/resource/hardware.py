@@ -1,3 +1,4 @@
+import copy
 import psutil
 from logging import getLogger
 
@@ -23,6 +24,24 @@ class HardwareResource:
             self.memory_size = self._get_remote_memory_size()
             self.swap_size = self._get_remote_swap_size()
 
+    def split(self, number_of_slices):
+        """
+        split cpus and memory into equal slices(cpu_set is the cpu list to pin each slice to)
+        """
+        cpu_count_per_slice = self.cpu_count // number_of_slices
+        if cpu_count_per_slice == 0:
+            raise ValueError('The number of slices exceeds the number of cpus.\n'
+                             'cpu count : {}, number of slices : {}'.format(self.cpu_count, number_of_slices))
+        hardware_slices = []
+        for index in range(number_of_slices):
+            hardware_slice = copy.copy(self)
+            hardware_slice.cpu_count = cpu_count_per_slice
+            hardware_slice.memory_size = self.memory_size // number_of_slices
+            hardware_slice.cpu_set = '{}-{}'.format(index * cpu_count_per_slice,
+                                                    (index + 1) * cpu_count_per_slice - 1)
+            hardware_slices.append(hardware_slice)
+        return hardware_slices
+
     def _get_remote_cpu_count(self):
         cpu_count_cmd = 'cat /proc/cpuinfo | grep processor | wc -l'
         ssh_client = self._get_ssh_client()
@@ -0,0 +1,161 @@
+import re
+import threading
+from logging import getLogger
+from pgopttune.utils.remote_command import SSHCommandExecutor
+
+logger = getLogger(__name__)
+
+PROC_FILES = {'uptime': '/proc/uptime', 'stat': '/proc/stat', 'meminfo': '/proc/meminfo',
+              'diskstats': '/proc/diskstats'}
+SECTOR_SIZE = 512  # the sectors of /proc/diskstats are always 512 bytes
+# devices that are not counted in the disk throughput(device-mapper devices are counted by their disks)
+IGNORE_DEVICE_PATTERN = re.compile(r'^(loop|ram|dm-|sr|zram)')
+PARTITION_SUFFIX_PATTERN = re.compile(r'^p?[0-9]+$')  # sda -> sda1, nvme0n1 -> nvme0n1p1
+MEMINFO_FIELDS = ('MemFree', 'Cached', 'Dirty', 'Writeback')
+# separator of the files in a sample of the remote host
+SAMPLE_SEPARATOR = '#pgopttune-proc'
+
+
+def parse_proc_stat(text):
+    """
+    Returns the cpu times(clock ticks) of all cpus {'user': .., 'system': .., 'idle': .., 'iowait': .., ...}
+    """
+    for line in text.splitlines():
+        fields = line.split()
+        if fields and fields[0] == 'cpu':
+            names = ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal']
+            return dict(zip(names, (int(value) for value in fields[1:len(names) + 1])))
+    raise ValueError('The cpu line is not found in /proc/stat.')
+
+
+def parse_meminfo(text):
+    """
+    Returns the memory usage(kB) {'MemFree': .., 'Cached': .., 'Dirty': .., 'Writeback': ..}
+    """
+    meminfo = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) >= 2 and fields[0].rstrip(':') in MEMINFO_FIELDS:
+            meminfo[fields[0].rstrip(':')] = int(fields[1])
+    return meminfo
+
+
+def parse_diskstats(text):
+    """
+    Returns the total read and written bytes of the disks {'read_bytes': .., 'write_bytes': ..}
+    (partitions are not counted when their disk is listed)
+    """
+    sectors = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 10 or IGNORE_DEVICE_PATTERN.match(fields[2]):
+            continue
+        sectors[fields[2]] = (int(fields[5]), int(fields[9]))
+    disks = [name for name in sectors
+             if not any(name != other and name.startswith(other)
+                        and PARTITION_SUFFIX_PATTERN.match(name[len(other):]) for other in sectors)]
+    return {'read_bytes': sum(sectors[name][0] for name in disks) * SECTOR_SIZE,
+            'write_bytes': sum(sectors[name][1] for name in disks) * SECTOR_SIZE}
+
+
+def get_os_metrics(previous_sample, sample):
+    """
+    Returns the OS metrics of the interval between two samples(parsed /proc files)
+    cpu : usage of each cpu time(%), memory : kB, disk : bytes per second
+    None if the samples were taken at the same time(the remote host has not printed a new sample yet)
+    """
+    interval_second = sample['uptime'] - previous_sample['uptime']
+    if interval_second <= 0:
+        return None
+    cpu_times = {name: sample['stat'][name] - previous_sample['stat'][name] for name in sample['stat']}
+    total_cpu_time = sum(cpu_times.values())
+    cpu = {name: round(cpu_time / total_cpu_time * 100, 2) if total_cpu_time > 0 else 0.0
+           for name, cpu_time in cpu_times.items() if name in ('user', 'system', 'idle', 'iowait')}
+    disk = {name + '_per_second': round((sample['diskstats'][name] - previous_sample['diskstats'][name])
+                                        / interval_second)
+            for name in ('read_bytes', 'write_bytes')}
+    return {'cpu': cpu, 'memory': sample['meminfo'], 'disk': disk}
+
+
+def parse_proc_files(texts):
+    """
+    texts : {'uptime': text of /proc/uptime, 'stat': text of /proc/stat, 'meminfo': .., 'diskstats': ..}
+    """
+    return {'uptime': float(texts['uptime'].split()[0]),  # seconds since boot(time of the sample)
+            'stat': parse_proc_stat(texts['stat']),
+            'meminfo': parse_meminfo(texts['meminfo']),
+            'diskstats': parse_diskstats(texts['diskstats'])}
+
+
+def split_remote_sample(text):
+    """
+    split a sample of the remote host(output of get_remote_sampling_command) into the texts of the files
+    """
+    texts = {}
+    for part in text.split(SAMPLE_SEPARATOR + ' ')[1:]:
+        name, _, file_text = part.partition('\n')
+        texts[name.strip()] = file_text
+    return texts
+
+
+def get_remote_sampling_command(interval_second):
+    """
+    command that prints the /proc files every interval_second until its stdout is closed
+    (each sample ends with a line of SAMPLE_SEPARATOR)
+    """
+    cat_commands = '; '.join("echo '{} {}'; cat {}".format(SAMPLE_SEPARATOR, name, path)
+                             for name, path in PROC_FILES.items())
+    # the loop ends when the separator cannot be written(the SSH channel has been closed)
+    return "while {}; echo '{}'; do sleep {}; done".format(cat_commands, SAMPLE_SEPARATOR, interval_second)
+
+
+class LocalProcReader:
+    """
+    Read the /proc files of localhost.
+    """
+
+    def read(self):
+        texts = {}
+        for name, path in PROC_FILES.items():
+            with open(path) as f:
+                texts[name] = f.read()
+        return parse_proc_files(texts)
+
+    def close(self):
+        pass
+
+
+class RemoteProcReader:
+    """
+    Read the /proc files of the remote host over one SSH channel that stays open while the metrics are collected.
+    The remote host prints the files at a fixed interval, and read() returns the latest sample.
+    """
+
+    def __init__(self, ssh: SSHCommandExecutor, interval_second=1):
+        self.ssh = ssh
+        self._latest_sample = None
+        self._sample_event = threading.Event()
+        self._stdout = ssh.open_stdout(get_remote_sampling_command(interval_second))
+        self._thread = threading.Thread(target=self._read_stdout, daemon=True)
+        self._thread.start()
+
+    def _read_stdout(self):
+        lines = []
+        try:
+            for line in self._stdout:
+                if line.rstrip('\n') == SAMPLE_SEPARATOR:
+                    self._latest_sample = parse_proc_files(split_remote_sample(''.join(lines)))
+                    self._sample_event.set()
+                    lines = []
+                else:
+                    lines.append(line)
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug('Reading the /proc files of the remote host stopped. {}'.format(e))
+
+    def read(self, timeout_second=10):
+        if self._latest_sample is None and not self._sample_event.wait(timeout_second):
+            raise ValueError('The /proc files of the remote host could not be read.')
+        return self._latest_sample
+
+    def close(self):
+        self._stdout.channel.close()  # the remote loop is terminated with the channel
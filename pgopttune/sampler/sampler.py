@@ -4,11 +4,20 @@ from logging import getLogger
 logger = getLogger(__name__)
 
 
-def get_sampler(sampling_mode):
+# samplers that support multi-objective studies
+MULTI_OBJECTIVE_SAMPLING_MODES = ('NSGAIISampler', 'RandomSampler')
+
+
+def get_sampler(sampling_mode, multi_objective=False):
+    if multi_objective and sampling_mode not in MULTI_OBJECTIVE_SAMPLING_MODES:
+        raise ValueError('The sampling mode {} does not support multiple objectives. Use one of {}.'
+                         .format(sampling_mode, MULTI_OBJECTIVE_SAMPLING_MODES))
     if sampling_mode == 'TPE':
         sampler = optuna.samplers.TPESampler()
     elif sampling_mode == 'RandomSampler':
         sampler = optuna.samplers.RandomSampler()
+    elif sampling_mode == 'NSGAIISampler':
+        sampler = optuna.samplers.NSGAIISampler()
     elif sampling_mode == 'SkoptSampler':
         sampler = optuna.integration.SkoptSampler()
     elif sampling_mode == 'CmaEsSampler':
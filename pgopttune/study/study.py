@@ -1,3 +1,5 @@
+import os
+import csv
 import optuna
 from logging import getLogger
 
@@ -5,24 +7,49 @@ logger = getLogger(__name__)
 
 
 def create_study(study_name, sampler, save_study_history=False, load_study_history=False, direction='minimize',
-                 history_database_url='postgresql://postgres@localhost:5432/study_history'):
+                 history_database_url='postgresql://postgres@localhost:5432/study_history', pruner=None,
+                 directions=None):
     """
     create study.
     If a study with the same name already exists, Load past history.
+    directions : directions of the objectives of a multi-objective study(direction is not used)
     """
+    if directions is not None and len(directions) == 1:
+        direction, directions = directions[0], None
     db_storage = None
     if save_study_history:  # save history in database
         db_storage = optuna.storages.RDBStorage(history_database_url)
 
     try:
-        study = optuna.create_study(study_name=study_name, sampler=sampler, direction=direction,
-                                    storage=db_storage)
+        study = optuna.create_study(study_name=study_name, sampler=sampler,
+                                    direction=direction if directions is None else None, directions=directions,
+                                    storage=db_storage, pruner=pruner)
     except optuna.exceptions.OptunaError:
         # If a study with the same name already exists, Load past history.
         if load_study_history:
-            study = optuna.study.load_study(study_name=study_name, sampler=sampler, storage=db_storage)
+            study = optuna.study.load_study(study_name=study_name, sampler=sampler, storage=db_storage,
+                                            pruner=pruner)
         else:
             raise ValueError(
                 'Another study with name {} already exists. Please specify a different name.\
                 or set load_study_history = True in postgres_opttune.conf'.format(study_name))
     return study
+
+
+def save_pareto_front(study, objectives, save_dir='./trial_conf/'):
+    """
+    log the trials on the Pareto front of the multi-objective study and save them as csv.
+    Returns the save file path.
+    """
+    save_file_path = os.path.join(save_dir, '{}_pareto_front.csv'.format(study.study_name))
+    best_trials = sorted(study.best_trials, key=lambda best_trial: best_trial.values)
+    os.makedirs(save_dir, exist_ok=True)
+    with open(save_file_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['trial_number'] + objectives + ['trial_conf_path'])
+        for best_trial in best_trials:
+            trial_conf_path = best_trial.user_attrs.get('trial_conf_path')
+            writer.writerow([best_trial.number] + best_trial.values + [trial_conf_path])
+            logger.info('pareto front trial : #{} values : {} conf : {}'.format(
+                best_trial.number, dict(zip(objectives, best_trial.values)), trial_conf_path))
+    return save_file_path
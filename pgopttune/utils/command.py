@@ -1,6 +1,7 @@
 import subprocess
 import os
 import sys
+import signal
 from logging import getLogger
 import traceback
 import shlex
@@ -29,6 +30,24 @@ def run_command(cmd_str, stdin=None, stdout_devnull=False):
     return res
 
 
+def start_command(cmd_str, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL):
+    """
+    start command in the background
+    (in a new session so that the command can be terminated together with its child processes)
+    """
+    cmd = shlex.split(cmd_str)
+    return subprocess.Popen(cmd, stdout=stdout, stderr=stderr, start_new_session=True)
+
+
+def terminate_command(process):
+    """
+    terminate command started by start_command
+    """
+    if process.poll() is None:
+        os.killpg(process.pid, signal.SIGTERM)
+    process.wait()
+
+
 if __name__ == "__main__":
     from logging import basicConfig, DEBUG
 
@@ -0,0 +1,102 @@
+import math
+
+# Log-linear latency histogram(similar to HdrHistogram)
+#
+# Values(microseconds) below 2 ** SUB_BUCKET_BITS are counted exactly.
+# Each larger power of two [2 ** k, 2 ** (k + 1)) is divided into 2 ** (SUB_BUCKET_BITS - 1) linear sub-buckets,
+# so the relative error of a recorded value is less than 1 / 2 ** (SUB_BUCKET_BITS - 1)(about 1.6 %).
+# The number of buckets is fixed, so the memory does not depend on the number of recorded values.
+SUB_BUCKET_BITS = 7
+SUB_BUCKET_COUNT = 2 ** SUB_BUCKET_BITS
+SUB_BUCKET_HALF_COUNT = SUB_BUCKET_COUNT // 2
+MAX_VALUE_BITS = 36  # about 19 hours
+BUCKET_COUNT = SUB_BUCKET_COUNT + (MAX_VALUE_BITS - SUB_BUCKET_BITS) * SUB_BUCKET_HALF_COUNT
+
+
+def get_bucket_index(value):
+    """
+    Returns the bucket index of the value(microseconds, larger values are counted in the last bucket)
+    """
+    value = max(int(value), 0)
+    if value < SUB_BUCKET_COUNT:
+        return value
+    exponent = value.bit_length() - 1
+    if exponent >= MAX_VALUE_BITS:
+        return BUCKET_COUNT - 1
+    shift = exponent - SUB_BUCKET_BITS + 1
+    return SUB_BUCKET_COUNT + (exponent - SUB_BUCKET_BITS) * SUB_BUCKET_HALF_COUNT + \
+        (value >> shift) - SUB_BUCKET_HALF_COUNT
+
+
+def get_bucket_value(index):
+    """
+    Returns the middle value of the bucket(microseconds)
+    """
+    if index < SUB_BUCKET_COUNT:
+        return index
+    exponent, sub_bucket = divmod(index - SUB_BUCKET_COUNT, SUB_BUCKET_HALF_COUNT)
+    shift = exponent + 1
+    lowest_value = (sub_bucket + SUB_BUCKET_HALF_COUNT) << shift
+    return lowest_value + ((1 << shift) - 1) / 2
+
+
+class LatencyHistogram:
+    """
+    Mergeable latency histogram with a fixed number of buckets.
+    The counts may be weighted(e.g. the sessions of a reduced workload).
+    """
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum = 0.0  # microseconds
+        self.min = math.inf
+        self.max = 0.0
+
+    def record(self, latency_second, count=1):
+        value = latency_second * 1000000
+        self.counts[get_bucket_index(value)] += count
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        """
+        mean latency(milliseconds)
+        """
+        return self.sum / self.count / 1000 if self.count > 0 else 0.0
+
+    def percentile(self, percent):
+        """
+        Returns the latency(milliseconds) below which percent % of the recorded latencies fall
+        """
+        if self.count == 0:
+            return 0.0
+        threshold = self.count * percent / 100
+        cumulative_count = 0
+        for index, count in enumerate(self.counts):
+            cumulative_count += count
+            if count and cumulative_count >= threshold:
+                # the bucket value is limited to the recorded range
+                return min(max(get_bucket_value(index), self.min), self.max) / 1000
+        return self.max / 1000
+
+    def get_summary(self):
+        return {'count': self.count,
+                'mean_ms': round(self.mean, 3),
+                'p50_ms': round(self.percentile(50), 3),
+                'p95_ms': round(self.percentile(95), 3),
+                'p99_ms': round(self.percentile(99), 3),
+                'max_ms': round(self.max / 1000, 3)}
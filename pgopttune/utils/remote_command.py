@@ -40,6 +40,13 @@ class SSHCommandExecutor:
                     'stderr': stderr.readlines(),
                     'retval': stdout.channel.recv_exit_status()}
 
+    def open_stdout(self, command):
+        """
+        execute the command and return its stdout as a file object that can be read while the command is running
+        """
+        _, stdout, _ = self.client.exec_command(command)
+        return stdout
+
     def get(self, remote_path=None, local_path=None):
         with scp.SCPClient(self.client.get_transport()) as scpc:
             scpc.get(remote_path, local_path)
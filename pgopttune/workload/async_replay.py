@@ -0,0 +1,53 @@
+import time
+import asyncio
+import multiprocessing
+from logging import getLogger
+from pgopttune.workload.replay_scheduler import DispatchLag, ReplayScheduler
+from pgopttune.workload.replay_statistics import ReplayStatistics
+
+logger = getLogger(__name__)
+
+
+def run_transactions_async(dsn, transactions, process_num=1, max_lag_second=None, use_prepared_statements=False):
+    """
+    Replay the sampled transactions as coroutines.
+    The transactions are divided among process_num processes, each running one event loop.
+    Returns the elapsed time of each transaction, the dispatch lag of the statements
+    and the replay statistics(latency histograms per template, end time).
+    """
+    start_time = time.perf_counter()  # replay start time shared by all processes(monotonic clock)
+    if process_num <= 1:
+        return _run_transactions_in_event_loop(dsn, transactions, start_time, max_lag_second, use_prepared_statements)
+    transaction_chunks = [transactions[index::process_num] for index in range(process_num)]
+    with multiprocessing.Pool(process_num) as p:
+        results = p.starmap(_run_transactions_in_event_loop,
+                            [(dsn, transaction_chunk, start_time, max_lag_second, use_prepared_statements)
+                             for transaction_chunk in transaction_chunks])
+    elapsed_times = [0] * len(transactions)  # in the order of the transactions
+    dispatch_lag = DispatchLag()
+    statistics = ReplayStatistics()
+    for index, (chunk_elapsed_times, chunk_dispatch_lag, chunk_statistics) in enumerate(results):
+        elapsed_times[index::process_num] = chunk_elapsed_times
+        dispatch_lag.merge(chunk_dispatch_lag)
+        statistics.merge(chunk_statistics)
+    return elapsed_times, dispatch_lag, statistics
+
+
+def _run_transactions_in_event_loop(dsn, transactions, start_time, max_lag_second=None,
+                                    use_prepared_statements=False):
+    logger.debug("Number of session(this process) : {} ".format(len(transactions)))
+    return asyncio.run(_run_transactions(dsn, transactions, start_time, max_lag_second, use_prepared_statements))
+
+
+async def _run_transactions(dsn, transactions, start_time, max_lag_second=None, use_prepared_statements=False):
+    dispatch_lag = DispatchLag(max_lag_second=max_lag_second)
+    statistics = ReplayStatistics()  # shared by all coroutines of this process
+    scheduler = ReplayScheduler(start_time, dispatch_lag)
+    dispatcher = asyncio.ensure_future(scheduler.dispatch())
+    try:
+        elapsed_times = await asyncio.gather(*[transaction.run_async(dsn, scheduler, use_prepared_statements,
+                                                                     statistics=statistics)
+                                               for transaction in transactions])
+    finally:
+        dispatcher.cancel()
+    return list(elapsed_times), dispatch_lag, statistics
@@ -0,0 +1,146 @@
+import json
+import hashlib
+from logging import getLogger
+import psycopg2
+from psycopg2.extras import DictCursor
+from pgopttune.utils.pg_connect import get_pg_connection, get_pg_dsn
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+
+logger = getLogger(__name__)
+
+# the catalog is saved in the maintenance database because the workload database is dropped when it is reset
+CATALOG_DATABASE = 'postgres'
+CATALOG_TABLE = 'postgres_opttune_backup_catalog'
+# backup databases created by the workloads(the backups that are not in the catalog are registered as legacy)
+BACKUP_DATABASE_PATTERN = '^(postgres_opttune|my_workload|pgbench)_backup_'
+BACKUP_KEY_LENGTH = 32  # the backup database name must be 63 bytes or less
+
+CREATE_CATALOG_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {} (
+     backup_database name PRIMARY KEY,
+     backup_key text, -- NULL : backup created before the catalog(legacy)
+     source_database name NOT NULL,
+     data_definition text,
+     server_version_num integer,
+     size_bytes bigint NOT NULL DEFAULT 0,
+     created_at timestamptz NOT NULL DEFAULT now(),
+     last_used_at timestamptz NOT NULL DEFAULT now()
+)
+""".format(CATALOG_TABLE)
+
+
+def get_backup_key(data_definition, database, server_version_num):
+    """
+    Returns the hash of the values that define the loaded data
+    (the backup is shared by the trials and the studies that load the same data)
+    """
+    key_source = json.dumps([data_definition, database, int(server_version_num)], sort_keys=True)
+    return hashlib.sha1(key_source.encode('utf-8')).hexdigest()[:BACKUP_KEY_LENGTH]
+
+
+def select_evicted_backups(backups, disk_budget_bytes, keep_backup_database=None):
+    """
+    backups : [(backup database, size(bytes), last used time), ...]
+    Returns the backup databases to drop(least recently used first) to fit the backups within the disk budget
+    """
+    total_size = sum(size for _, size, _ in backups)
+    evicted_backups = []
+    for backup_database, size, _ in sorted(backups, key=lambda backup: backup[2]):
+        if total_size <= disk_budget_bytes:
+            break
+        if backup_database == keep_backup_database:
+            continue
+        evicted_backups.append(backup_database)
+        total_size -= size
+    return evicted_backups
+
+
+class BackupCatalog:
+    """
+    Catalog of the backup databases(size and last use) and the LRU eviction under the disk budget.
+    """
+
+    def __init__(self, postgres_server_config: PostgresServerConfig):
+        self.postgres_server_config = postgres_server_config
+        self.disk_budget_bytes = postgres_server_config.backup_disk_budget_bytes  # None : no limit
+        self.dsn = get_pg_dsn(pghost=postgres_server_config.host,
+                              pgport=postgres_server_config.port,
+                              pguser=postgres_server_config.user,
+                              pgpassword=postgres_server_config.password,
+                              pgdatabase=CATALOG_DATABASE)
+        with get_pg_connection(dsn=self.dsn) as conn:
+            conn.set_session(autocommit=True)
+            with conn.cursor() as cur:
+                cur.execute(CREATE_CATALOG_TABLE_SQL)
+        self.register_legacy_backups()
+
+    def register(self, backup_database, backup_key, data_definition, server_version_num):
+        register_sql = "INSERT INTO {} (backup_database, backup_key, source_database, data_definition, " \
+                       "server_version_num, size_bytes) " \
+                       "VALUES (%s, %s, %s, %s, %s, pg_database_size(%s)) " \
+                       "ON CONFLICT (backup_database) DO UPDATE SET " \
+                       "backup_key = EXCLUDED.backup_key, size_bytes = EXCLUDED.size_bytes, " \
+                       "last_used_at = now()".format(CATALOG_TABLE)
+        with get_pg_connection(dsn=self.dsn) as conn:
+            conn.set_session(autocommit=True)
+            with conn.cursor() as cur:
+                cur.execute(register_sql, (backup_database, backup_key, self.postgres_server_config.database,
+                                           json.dumps(data_definition, sort_keys=True), server_version_num,
+                                           backup_database))
+        logger.debug('The backup database is registered in the catalog. Database : {}'.format(backup_database))
+
+    def touch(self, backup_database):
+        touch_sql = "UPDATE {} SET last_used_at = now() WHERE backup_database = %s".format(CATALOG_TABLE)
+        with get_pg_connection(dsn=self.dsn) as conn:
+            conn.set_session(autocommit=True)
+            with conn.cursor() as cur:
+                cur.execute(touch_sql, (backup_database,))
+
+    def register_legacy_backups(self):
+        """
+        register the backup databases that are not in the catalog(they are evicted before the other backups)
+        and remove the catalog entries of the dropped databases
+        """
+        register_legacy_sql = "INSERT INTO {} (backup_database, source_database, size_bytes, created_at, " \
+                              "last_used_at) " \
+                              "SELECT datname, '', pg_database_size(oid), 'epoch', 'epoch' " \
+                              "FROM pg_database WHERE datname ~ %s " \
+                              "ON CONFLICT (backup_database) DO NOTHING".format(CATALOG_TABLE)
+        remove_dropped_sql = "DELETE FROM {} c WHERE NOT EXISTS " \
+                             "(SELECT 1 FROM pg_database d WHERE d.datname = c.backup_database)".format(CATALOG_TABLE)
+        with get_pg_connection(dsn=self.dsn) as conn:
+            conn.set_session(autocommit=True)
+            with conn.cursor() as cur:
+                cur.execute(register_legacy_sql, (BACKUP_DATABASE_PATTERN,))
+                if cur.rowcount > 0:
+                    logger.info('{} backup databases created before the catalog are registered.'
+                                .format(cur.rowcount))
+                cur.execute(remove_dropped_sql)
+
+    def evict(self, keep_backup_database=None):
+        """
+        drop the least recently used backup databases until the backups fit within the disk budget
+        """
+        if self.disk_budget_bytes is None:
+            return []
+        get_backups_sql = "SELECT backup_database, size_bytes, last_used_at FROM {}".format(CATALOG_TABLE)
+        delete_sql = "DELETE FROM {} WHERE backup_database = %s".format(CATALOG_TABLE)
+        dropped_backups = []
+        with get_pg_connection(dsn=self.dsn) as conn:
+            conn.set_session(autocommit=True)
+            with conn.cursor(cursor_factory=DictCursor) as cur:
+                cur.execute(get_backups_sql)
+                backups = [(row['backup_database'], row['size_bytes'], row['last_used_at']) for row in cur]
+                for backup_database in select_evicted_backups(backups, self.disk_budget_bytes,
+                                                              keep_backup_database=keep_backup_database):
+                    try:
+                        cur.execute('DROP DATABASE IF EXISTS "{}"'.format(backup_database))
+                    except psycopg2.Error as e:
+                        # e.g. another session is connected to the backup database
+                        logger.warning('The backup database {} could not be dropped. {}'.format(backup_database, e))
+                        continue
+                    cur.execute(delete_sql, (backup_database,))
+                    dropped_backups.append(backup_database)
+                    logger.info('The least recently used backup database is dropped. Database : {}'
+                                .format(backup_database))
+        return dropped_backups
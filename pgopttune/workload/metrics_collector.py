@@ -0,0 +1,120 @@
+import os
+import gzip
+import json
+import time
+import threading
+from logging import getLogger
+import paramiko
+import psycopg2
+from pgopttune.utils.pg_connect import get_pg_connection
+from pgopttune.utils.remote_command import SSHCommandExecutor
+from pgopttune.resource.os_metrics import LocalProcReader, RemoteProcReader, get_os_metrics
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+
+logger = getLogger(__name__)
+
+# the columns that do not change during a trial are not saved
+EXCLUDE_COLUMNS = {'datid', 'datname', 'stats_reset'}
+WAIT_EVENTS_SQL = """
+SELECT
+     wait_event_type || ':' || wait_event,
+     count(*)
+FROM
+     pg_stat_activity
+WHERE
+     wait_event IS NOT NULL AND
+     backend_type = 'client backend' AND
+     pid <> pg_backend_pid()
+GROUP BY
+     1
+"""
+
+
+class MetricsCollector(threading.Thread):
+    """
+    Sample the database statistics(pg_stat_database, pg_stat_bgwriter, pg_stat_wal and the wait events of
+    pg_stat_activity) and the OS metrics(cpu, memory, disk throughput) at a fixed interval while the workload
+    is running, and write them to a gzip compressed JSON lines file(one sample per line).
+    The database statistics are cumulative counters, the OS metrics are the values of each interval.
+    """
+
+    def __init__(self, postgres_server_config: PostgresServerConfig, save_file_path, interval_second=1):
+        super().__init__(daemon=True)
+        self.postgres_server_config = postgres_server_config
+        self.save_file_path = save_file_path
+        self.interval_second = interval_second
+        self.sample_num = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        os.makedirs(os.path.dirname(self.save_file_path) or '.', exist_ok=True)
+        try:
+            proc_reader = self._get_proc_reader()
+        except (OSError, ValueError, paramiko.SSHException) as e:
+            logger.warning('The OS metrics are not collected. {}'.format(e))
+            proc_reader = None
+        try:
+            with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn, \
+                    gzip.open(self.save_file_path, 'wt', encoding='utf-8') as f:
+                conn.set_session(autocommit=True)  # take a new statistics snapshot for each sample
+                with conn.cursor() as cur:
+                    cur.execute('SHOW server_version_num')
+                    server_version_num = int(cur.fetchone()[0])
+                    start_time = time.time()
+                    previous_os_sample = proc_reader.read() if proc_reader is not None else None
+                    while True:
+                        sample = {'elapsed_second': round(time.time() - start_time, 3)}
+                        sample.update(self._get_database_metrics(cur, server_version_num))
+                        if proc_reader is not None:
+                            os_sample = proc_reader.read()
+                            sample['os'] = get_os_metrics(previous_os_sample, os_sample)
+                            previous_os_sample = os_sample
+                        f.write(json.dumps(sample, default=str) + '\n')
+                        self.sample_num += 1
+                        if self._stop_event.wait(self.interval_second):
+                            break
+        except (psycopg2.Error, OSError, ValueError) as e:
+            logger.warning('Collecting the metrics stopped. {}'.format(e))
+        finally:
+            if proc_reader is not None:
+                proc_reader.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        logger.debug('metrics saved : {}(samples : {})'.format(self.save_file_path, self.sample_num))
+
+    def _get_proc_reader(self):
+        if self.postgres_server_config.host == '127.0.0.1' or self.postgres_server_config.host == 'localhost':
+            return LocalProcReader()
+        # one SSH channel is kept open while the metrics are collected
+        ssh = SSHCommandExecutor(user=self.postgres_server_config.os_user,
+                                 password=self.postgres_server_config.ssh_password,
+                                 hostname=self.postgres_server_config.host,
+                                 port=self.postgres_server_config.ssh_port)
+        return RemoteProcReader(ssh, interval_second=self.interval_second)
+
+    def _get_database_metrics(self, cur, server_version_num):
+        cur.execute('SELECT row_to_json(d) FROM pg_stat_database d WHERE datname = %s',
+                    (self.postgres_server_config.database,))
+        metrics = {'database': self._exclude_columns(cur.fetchone()[0])}
+        cur.execute('SELECT row_to_json(b) FROM pg_stat_bgwriter b')
+        metrics['bgwriter'] = self._exclude_columns(cur.fetchone()[0])
+        if server_version_num >= 140000:  # pg_stat_wal is available in PostgreSQL 14 or later
+            cur.execute('SELECT row_to_json(w) FROM pg_stat_wal w')
+            metrics['wal'] = self._exclude_columns(cur.fetchone()[0])
+        cur.execute(WAIT_EVENTS_SQL)
+        metrics['wait_events'] = dict(cur.fetchall())
+        return metrics
+
+    @staticmethod
+    def _exclude_columns(row):
+        return {column: value for column, value in row.items() if column not in EXCLUDE_COLUMNS}
+
+
+def load_metrics(metrics_file_path):
+    """
+    Returns the samples saved by MetricsCollector
+    """
+    with gzip.open(metrics_file_path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
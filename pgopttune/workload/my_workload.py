@@ -1,8 +1,15 @@
 import os
+import sys
 import time
+import tempfile
+import subprocess
 from logging import getLogger
+from distutils.util import strtobool
+import optuna
 from .workload import Workload
-from pgopttune.utils.command import run_command
+from pgopttune.workload.throughput_monitor import ThroughputMonitor
+from pgopttune.workload.steady_state import SteadyStateDetector
+from pgopttune.utils.command import run_command, start_command, terminate_command
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 from pgopttune.config.my_workload_config import MyWorkloadConfig
 
@@ -15,6 +22,7 @@ class MyWorkLoad(Workload):
         self.my_workload_config = my_workload_config
         self.backup_database_prefix = 'my_workload_backup_'
         self.workload_elapsed_time = 0
+        self.steady_state_detector = None  # detector of the last run(None : steady-state detection is not used)
         os.environ['PGHOST'] = postgres_server_config.host
         os.environ['PGPORT'] = postgres_server_config.port
         os.environ['PGDATABASE'] = postgres_server_config.database
@@ -30,6 +38,10 @@ class MyWorkLoad(Workload):
         if self.my_workload_config.work_directory != "current_directory":
             os.chdir(cwd)
 
+    def get_data_definition(self):
+        return {'work_directory': self.my_workload_config.work_directory,
+                'data_load_command': self.my_workload_config.data_load_command}
+
     def warm_up(self):
         cwd = os.getcwd()
         self._change_work_directory()
@@ -39,33 +51,103 @@ class MyWorkLoad(Workload):
         if self.my_workload_config.work_directory != "current_directory":
             os.chdir(cwd)
 
-    def run(self, measurement_time_second: int = None):
+    def run(self, measurement_time_second: int = None, trial=None):
         cwd = os.getcwd()
         self._change_work_directory()
         run_workload_command = self.my_workload_config.run_workload_command
         start_number_of_xact_commit = self.get_number_of_xact_commit()
         workload_start_time = time.time()  # start measurement time
         self.workload_elapsed_time = 0
+        self.steady_state_detector = None
+        if strtobool(self.my_workload_config.steady_state_detection):
+            self.steady_state_detector = SteadyStateDetector(
+                warm_up_second=self.my_workload_config.steady_state_warm_up_second,
+                tolerance=self.my_workload_config.steady_state_tolerance,
+                max_measurement_second=self.my_workload_config.max_measurement_second)
 
-        if measurement_time_second is not None:
-            workload_load_count = 0
-            while measurement_time_second > self.workload_elapsed_time:
+        try:
+            if measurement_time_second is not None:
+                workload_load_count = 0
+                while measurement_time_second > self.workload_elapsed_time:
+                    run_command(run_workload_command)  # run workload
+                    self.workload_elapsed_time = time.time() - workload_start_time
+                    workload_load_count += 1
+                    logger.debug("workload_load_count: {}, workload_elapsed_time : {}s, ".
+                                 format(workload_load_count, round(self.workload_elapsed_time, 2)))
+            elif trial is not None or self.steady_state_detector is not None:
+                # run workload and report intermediate TPS to the trial for pruning
+                # and/or stop it when the throughput is steady
+                steady_state_tps = self._run_workload_command_with_report(run_workload_command, trial)
+                self.workload_elapsed_time = time.time() - workload_start_time
+                if steady_state_tps is not None:
+                    return steady_state_tps
+            else:
                 run_command(run_workload_command)  # run workload
                 self.workload_elapsed_time = time.time() - workload_start_time
-                workload_load_count += 1
-                logger.debug("workload_load_count: {}, workload_elapsed_time : {}s, ".
-                             format(workload_load_count, round(self.workload_elapsed_time, 2)))
-        else:
-            run_command(run_workload_command)  # run workload
-            self.workload_elapsed_time = time.time() - workload_start_time
-        if self.my_workload_config.work_directory != "current_directory":
-            os.chdir(cwd)
+        finally:
+            if self.my_workload_config.work_directory != "current_directory":
+                os.chdir(cwd)
         time.sleep(1)  # default PGSTAT_STAT_INTERVAL(500ms)
         workload_number_of_xact_commit = self.get_number_of_xact_commit() - start_number_of_xact_commit
         # logger.info(workload_number_of_xact_commit)
         tps = self.calculate_transaction_per_second(workload_number_of_xact_commit, self.workload_elapsed_time)
         return tps
 
+    def _run_workload_command_with_report(self, run_workload_command, trial=None):
+        """
+        Returns the TPS after the warm-up when the steady-state detection is used(None if it is not measured)
+        """
+        report_interval_second = self.my_workload_config.report_interval_second
+        throughput_monitor = ThroughputMonitor(self.postgres_server_config, interval_second=report_interval_second)
+        throughput_monitor.start()
+        with tempfile.TemporaryFile() as stderr:
+            workload_process = start_command(run_workload_command, stderr=stderr)
+            stopped = False
+            try:
+                step = 0
+                while True:
+                    try:
+                        workload_process.wait(timeout=report_interval_second)
+                        break
+                    except subprocess.TimeoutExpired:
+                        step += 1
+                    if self.steady_state_detector is not None and \
+                            self.steady_state_detector.check(throughput_monitor.get_intervals()):
+                        logger.debug('Stop the workload at {}s. steady : {}'.format(
+                            step * report_interval_second, self.steady_state_detector.steady))
+                        stopped = True
+                        break
+                    intermediate_tps = throughput_monitor.get_tps()
+                    if trial is None or intermediate_tps is None:
+                        continue
+                    trial.report(intermediate_tps, step)
+                    if trial.should_prune():
+                        logger.info('trail#{} pruned at step {}. intermediate TPS : {}'
+                                    .format(trial.number, step, intermediate_tps))
+                        raise optuna.TrialPruned()
+            finally:
+                terminate_command(workload_process)
+                throughput_monitor.stop()
+            # the return code of the terminated command is not checked
+            if not stopped and workload_process.returncode != 0:
+                stderr.seek(0)
+                logger.critical('Command: {} '.format(run_workload_command))
+                logger.info('Stderr: {}'.format(stderr.read().decode("utf8")))
+                sys.exit(1)
+        if self.steady_state_detector is None:
+            return None
+        # the intervals sampled after the command ended are also used
+        self.steady_state_detector.check(throughput_monitor.get_intervals())
+        return self.steady_state_detector.tps
+
+    def get_trial_user_attrs(self):
+        if self.steady_state_detector is None:
+            return {}
+        relative_half_width = self.steady_state_detector.relative_half_width
+        return {'steady_state': self.steady_state_detector.steady,
+                'measurement_second': round(self.workload_elapsed_time, 3),
+                'tps_relative_half_width': round(relative_half_width, 6) if relative_half_width is not None else None}
+
     def _change_work_directory(self):
         if self.my_workload_config.work_directory != "current_directory":
             os.chdir(self.my_workload_config.work_directory)
@@ -0,0 +1,186 @@
+import os
+import sys
+import shlex
+import tempfile
+import statistics
+import subprocess
+from logging import getLogger
+import optuna
+from .workload import Workload
+from pgopttune.utils.command import run_command, start_command, terminate_command
+from pgopttune.utils.histogram import LatencyHistogram
+from pgopttune.workload.pgbench_log import parse_progress_line, parse_summary_tps, parse_transaction_log_line, \
+    parse_aggregate_log_line, get_log_file_paths
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+from pgopttune.config.pgbench_config import PgbenchConfig
+
+logger = getLogger(__name__)
+
+BUILTIN_SCRIPTS = ('tpcb-like', 'simple-update', 'select-only')
+LATENCY_LOGS = ('transaction', 'aggregate', 'none')
+
+
+class Pgbench(Workload):
+    """
+    Run pgbench and use the TPS reported by pgbench.
+    The progress report(-P) is read while pgbench is running(intermediate TPS for pruning),
+    and the latency of the transactions is read from the transaction logs(--log) after the run.
+    """
+
+    def __init__(self, postgres_server_config: PostgresServerConfig, pgbench_config: PgbenchConfig):
+        super().__init__(postgres_server_config)
+        if pgbench_config.latency_log not in LATENCY_LOGS:
+            raise NotImplementedError('The specified latency_log {} is not supported.'
+                                      .format(pgbench_config.latency_log))
+        self.pgbench_config = pgbench_config
+        self.backup_database_prefix = 'pgbench_backup_'
+        self.pgbench_path = os.path.join(postgres_server_config.pgbin, 'pgbench')
+        self.tps = None
+        self.progress = []  # [(elapsed time(s), TPS, mean latency(ms)), ...] of the last run
+        self.intervals = []  # values of each aggregate interval of the last run(latency_log = aggregate)
+        self.latency_histogram = LatencyHistogram()  # latency of the transactions of the last run
+        os.environ['PGHOST'] = postgres_server_config.host
+        os.environ['PGPORT'] = postgres_server_config.port
+        os.environ['PGDATABASE'] = postgres_server_config.database
+        os.environ['PGUSER'] = postgres_server_config.user
+        os.environ['PGPASSWORD'] = postgres_server_config.password
+
+    def data_load(self):
+        data_load_cmd = '{} -i -q -s {} {}'.format(self.pgbench_path, self.pgbench_config.scale_factor,
+                                                   self.postgres_server_config.database)
+        logger.debug('Run data load : {}'.format(data_load_cmd))
+        run_command(data_load_cmd)
+
+    def get_data_definition(self):
+        return {'scale_factor': self.pgbench_config.scale_factor}
+
+    def warm_up(self):
+        if self.pgbench_config.warm_up_time_second <= 0:
+            return
+        warm_up_cmd = self._get_pgbench_command(self.pgbench_config.warm_up_time_second)
+        logger.debug('Run warm up : {}'.format(warm_up_cmd))
+        run_command(warm_up_cmd)
+
+    def run(self, measurement_time_second: int = None, trial=None):
+        evaluation_time_second = measurement_time_second or self.pgbench_config.evaluation_time_second
+        self.progress = []
+        self.intervals = []
+        self.latency_histogram = LatencyHistogram()
+        with tempfile.TemporaryDirectory() as log_dir, tempfile.TemporaryFile() as stdout:
+            log_prefix = os.path.join(log_dir, 'pgbench_log')
+            run_cmd = self._get_pgbench_command(evaluation_time_second, log_prefix=log_prefix)
+            logger.debug('Run pgbench : {}'.format(run_cmd))
+            workload_process = start_command(run_cmd, stdout=stdout, stderr=subprocess.PIPE)
+            try:
+                stderr_lines = self._read_progress(workload_process, trial)
+            finally:
+                terminate_command(workload_process)
+                workload_process.stderr.close()
+            if workload_process.returncode != 0:
+                logger.critical('Command: {} '.format(run_cmd))
+                logger.info('Stderr: {}'.format(''.join(stderr_lines)))
+                sys.exit(1)
+            stdout.seek(0)
+            self.tps = parse_summary_tps(stdout.read().decode('utf8'))
+            self._read_latency_logs(log_prefix)
+        if self.tps is None:
+            # the summary of the old versions of pgbench is not parsed
+            logger.warning('The TPS of the pgbench summary is not found. The mean TPS of the progress is used.')
+            self.tps = round(statistics.mean(tps for _, tps, _ in self.progress), 6) if self.progress else 0.0
+        return self.tps
+
+    def _get_pgbench_command(self, evaluation_time_second, log_prefix=None):
+        options = ['-c', self.pgbench_config.clients, '-j', self.pgbench_config.jobs, '-T', evaluation_time_second]
+        if os.path.isfile(self.pgbench_config.script):
+            options += ['-f', shlex.quote(self.pgbench_config.script)]
+        elif self.pgbench_config.script in BUILTIN_SCRIPTS:
+            options += ['-b', self.pgbench_config.script]
+        else:
+            raise ValueError('{} is neither a built-in script nor a script file.'.format(self.pgbench_config.script))
+        if log_prefix is not None:
+            options += ['-P', self.pgbench_config.progress_interval_second]
+            if self.pgbench_config.latency_log == 'transaction':
+                options += ['--log', '--log-prefix', shlex.quote(log_prefix)]
+                if self.pgbench_config.log_sampling_rate < 1:
+                    options += ['--sampling-rate', self.pgbench_config.log_sampling_rate]
+            elif self.pgbench_config.latency_log == 'aggregate':
+                options += ['--log', '--log-prefix', shlex.quote(log_prefix),
+                            '--aggregate-interval', self.pgbench_config.progress_interval_second]
+        if self.pgbench_config.extra_options:
+            options.append(self.pgbench_config.extra_options)
+        return '{} {} {}'.format(self.pgbench_path, ' '.join(str(option) for option in options),
+                                 self.postgres_server_config.database)
+
+    def _read_progress(self, workload_process, trial=None):
+        """
+        read the progress report from stderr until pgbench ends, and report the TPS to the trial for pruning
+        Returns the lines of stderr that are not the progress report
+        """
+        stderr_lines = []
+        for line in workload_process.stderr:
+            line = line.decode('utf8', errors='replace')
+            progress = parse_progress_line(line)
+            if progress is None:
+                stderr_lines.append(line)
+                continue
+            self.progress.append(progress)
+            if trial is None:
+                continue
+            step = len(self.progress)
+            intermediate_tps = round(statistics.mean(tps for _, tps, _ in self.progress), 6)
+            trial.report(intermediate_tps, step)
+            if trial.should_prune():
+                logger.info('trail#{} pruned at step {}. intermediate TPS : {}'
+                            .format(trial.number, step, intermediate_tps))
+                raise optuna.TrialPruned()
+        return stderr_lines
+
+    def _read_latency_logs(self, log_prefix):
+        intervals = {}
+        for log_file_path in get_log_file_paths(log_prefix):
+            with open(log_file_path) as f:
+                for line in f:
+                    if self.pgbench_config.latency_log == 'transaction':
+                        latency_second = parse_transaction_log_line(line)
+                        if latency_second is not None:
+                            self.latency_histogram.record(latency_second)
+                        continue
+                    # the logs of the threads are merged for each interval
+                    values = parse_aggregate_log_line(line)
+                    interval = intervals.get(values['interval_start'])
+                    if interval is None:
+                        intervals[values['interval_start']] = values
+                        continue
+                    interval['num_transactions'] += values['num_transactions']
+                    interval['sum_latency_second'] += values['sum_latency_second']
+                    interval['min_latency_second'] = min(interval['min_latency_second'],
+                                                         values['min_latency_second'])
+                    interval['max_latency_second'] = max(interval['max_latency_second'],
+                                                         values['max_latency_second'])
+        self.intervals = [intervals[interval_start] for interval_start in sorted(intervals)]
+
+    def is_latency_measured(self):
+        return self.pgbench_config.latency_log == 'transaction'
+
+    def get_latency_percentile(self, percent):
+        if self.latency_histogram.count == 0:
+            raise ValueError('The latency of the transactions is not recorded. Set latency_log = transaction.')
+        return self.latency_histogram.percentile(percent)
+
+    def get_trial_user_attrs(self):
+        user_attrs = {'pgbench_tps': self.tps}
+        interval_tps = [tps for _, tps, _ in self.progress]
+        if interval_tps:
+            user_attrs['min_interval_tps'] = min(interval_tps)
+            user_attrs['max_interval_tps'] = max(interval_tps)
+        if self.latency_histogram.count > 0:
+            user_attrs['latency'] = self.latency_histogram.get_summary()
+        elif self.intervals:
+            num_transactions = sum(interval['num_transactions'] for interval in self.intervals)
+            sum_latency_second = sum(interval['sum_latency_second'] for interval in self.intervals)
+            max_latency_second = max(interval['max_latency_second'] for interval in self.intervals)
+            user_attrs['latency'] = {
+                'count': num_transactions,
+                'mean_ms': round(sum_latency_second / num_transactions * 1000, 3) if num_transactions else 0.0,
+                'max_ms': round(max_latency_second * 1000, 3)}
+        return user_attrs
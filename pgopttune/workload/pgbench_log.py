@@ -0,0 +1,68 @@
+import re
+import glob
+
+# progress report of pgbench -P(stderr)
+# e.g. progress: 5.0 s, 1530.8 tps, lat 6.523 ms stddev 2.052[, lag 0.123 ms][, 0 failed]
+PROGRESS_PATTERN = re.compile(r'^progress: (?P<elapsed>[0-9.]+) s, (?P<tps>[0-9.]+) tps, '
+                              r'lat (?P<latency>[^ ,]+) ms')
+# summary of pgbench(stdout)
+# tps = 1523.180193 (without initial connection time)   : PostgreSQL 14 or later
+# tps = 1523.180193 (excluding connections establishing) : PostgreSQL 13 or earlier
+SUMMARY_TPS_PATTERN = re.compile(r'^tps = (?P<tps>[0-9.]+) '
+                                 r'\((without initial connection time|excluding connections establishing)\)')
+
+
+def parse_progress_line(line):
+    """
+    Returns (elapsed time(s), TPS, mean latency(ms)) of a progress line(None if it is not a progress line)
+    The latency is nan if no transaction ended in the interval.
+    """
+    match = PROGRESS_PATTERN.match(line.strip())
+    if match is None:
+        return None
+    return float(match.group('elapsed')), float(match.group('tps')), float(match.group('latency'))
+
+
+def parse_summary_tps(text):
+    """
+    Returns the TPS of the pgbench summary(None if it is not found)
+    """
+    for line in text.splitlines():
+        match = SUMMARY_TPS_PATTERN.match(line.strip())
+        if match is not None:
+            return float(match.group('tps'))
+    return None
+
+
+def parse_transaction_log_line(line):
+    """
+    Returns the latency(s) of a line of the per-transaction log(--log)
+    client_id transaction_no time script_no time_epoch time_us [schedule_lag]
+    (None if the transaction was skipped or failed)
+    """
+    fields = line.split()
+    if len(fields) < 6 or not fields[2].isdigit():
+        return None
+    return int(fields[2]) / 1000000
+
+
+def parse_aggregate_log_line(line):
+    """
+    Returns the values of a line of the aggregated log(--log --aggregate-interval)
+    interval_start num_transactions sum_latency sum_latency_2 min_latency max_latency ...(latency : microseconds)
+    """
+    fields = line.split()
+    if len(fields) < 6:
+        raise ValueError('Invalid aggregated log line : {}'.format(line))
+    return {'interval_start': int(fields[0]),
+            'num_transactions': int(fields[1]),
+            'sum_latency_second': int(fields[2]) / 1000000,
+            'min_latency_second': int(fields[4]) / 1000000,
+            'max_latency_second': int(fields[5]) / 1000000}
+
+
+def get_log_file_paths(log_prefix):
+    """
+    log files written by pgbench --log-prefix=log_prefix(<log_prefix>.<pid>[.<thread>])
+    """
+    return sorted(glob.glob(glob.escape(log_prefix) + '.*'))
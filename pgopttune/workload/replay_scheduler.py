@@ -0,0 +1,113 @@
+import time
+import heapq
+import asyncio
+import itertools
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# The last SPIN_SECOND before the scheduled time is busy-waited,
+# because time.sleep() and the event loop timer may wake up more than 1 ms late.
+SPIN_SECOND = 0.002
+
+
+class ReplayLagError(Exception):
+    """
+    The dispatch lag of a replayed statement exceeded the allowed bound.
+    """
+    pass
+
+
+class DispatchLag:
+    """
+    Dispatch lag(delay from the scheduled start time of a statement to the actual start) statistics.
+    """
+
+    def __init__(self, max_lag_second=None):
+        self.max_lag_second = max_lag_second  # None : no limit
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, lag_second):
+        self.count += 1
+        self.sum += lag_second
+        self.max = max(self.max, lag_second)
+        if self.max_lag_second is not None and lag_second > self.max_lag_second:
+            raise ReplayLagError('The dispatch lag of a statement exceeded the bound. '
+                                 'lag : {:.3f} ms, bound : {:.3f} ms'.format(lag_second * 1000,
+                                                                           self.max_lag_second * 1000))
+
+    def merge(self, other):
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count > 0 else 0.0
+
+
+def sleep_until(deadline):
+    """
+    block until time.perf_counter() reaches the deadline and return the lag(seconds)
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return -remaining
+        if remaining > SPIN_SECOND:
+            time.sleep(remaining - SPIN_SECOND)
+
+
+class ReplayScheduler:
+    """
+    Heap-based scheduler for the asyncio replay engine.
+    Coroutines wait in a heap ordered by the scheduled time, and a single dispatcher task wakes them up.
+    """
+
+    def __init__(self, start_time, dispatch_lag: DispatchLag):
+        self.start_time = start_time  # time.perf_counter() of the replay start
+        self.dispatch_lag = dispatch_lag
+        self._heap = []
+        self._counter = itertools.count()  # tie-breaker for the same scheduled time
+        self._new_entry = asyncio.Event()
+
+    async def wait_until(self, offset_second, record_lag=True):
+        """
+        wait until start_time + offset_second and record the dispatch lag(if record_lag is True)
+        """
+        scheduled_time = self.start_time + offset_second
+        if scheduled_time - time.perf_counter() > 0:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._heap, (scheduled_time, next(self._counter), future))
+            self._new_entry.set()
+            await future
+        if record_lag:
+            self.dispatch_lag.add(max(time.perf_counter() - scheduled_time, 0.0))
+
+    async def dispatch(self):
+        """
+        wake up the waiting coroutines at their scheduled time(run as a task until cancelled)
+        """
+        while True:
+            if not self._heap:
+                self._new_entry.clear()
+                await self._new_entry.wait()
+                continue
+            scheduled_time, _, future = self._heap[0]
+            remaining = scheduled_time - time.perf_counter()
+            if remaining > SPIN_SECOND:
+                # sleep until just before the scheduled time or until an earlier entry is added
+                self._new_entry.clear()
+                try:
+                    await asyncio.wait_for(self._new_entry.wait(), remaining - SPIN_SECOND)
+                except asyncio.TimeoutError:
+                    pass
+            elif remaining > 0:
+                await asyncio.sleep(0)  # spin, but let the event loop process I/O
+            else:
+                heapq.heappop(self._heap)
+                if not future.cancelled():
+                    future.set_result(None)
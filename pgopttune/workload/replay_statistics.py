@@ -0,0 +1,80 @@
+import re
+from logging import getLogger
+from pgopttune.utils.histogram import LatencyHistogram
+
+logger = getLogger(__name__)
+
+# objectives of the sampled workload(all of them are minimized)
+OBJECTIVES = ('total_time', 'makespan', 'p95', 'p99')
+# number of templates whose latency summary is saved as a trial user attribute(in descending order of total time)
+SUMMARY_TEMPLATE_NUM = 20
+SUMMARY_TEMPLATE_LENGTH = 200
+
+
+class ReplayStatistics:
+    """
+    Latency histogram of the replayed statements per template and the end time of the replay.
+    Each replay worker records into its own statistics, and they are merged after the replay.
+    """
+
+    def __init__(self):
+        self.latencies = {}  # template -> LatencyHistogram
+        self.end_second = 0.0  # time from the replay start to the end of the last statement
+
+    def record(self, template, latency_second, count=1):
+        histogram = self.latencies.get(template)
+        if histogram is None:
+            histogram = self.latencies[template] = LatencyHistogram()
+        histogram.record(latency_second, count=count)
+
+    def record_end(self, end_second):
+        self.end_second = max(self.end_second, end_second)
+
+    def merge(self, other):
+        for template, histogram in other.latencies.items():
+            if template in self.latencies:
+                self.latencies[template].merge(histogram)
+            else:
+                self.latencies[template] = histogram
+        self.end_second = max(self.end_second, other.end_second)
+        return self
+
+    def get_histogram(self, template_pattern=None):
+        """
+        Returns the merged histogram of the templates matching the pattern(regular expression, None : all)
+        """
+        histogram = LatencyHistogram()
+        for template, template_histogram in self.latencies.items():
+            if template_pattern is None or re.search(template_pattern, template):
+                histogram.merge(template_histogram)
+        return histogram
+
+    def get_objective_value(self, objective, total_time, template_pattern=None):
+        """
+        total_time : sum of the elapsed time of the statements(seconds)
+        Returns the objective value(total_time, makespan : seconds, p95, p99 : milliseconds)
+        """
+        if objective == 'total_time':
+            return total_time
+        elif objective == 'makespan':
+            return self.end_second
+        elif objective in ('p95', 'p99'):
+            histogram = self.get_histogram(template_pattern)
+            if histogram.count == 0:
+                raise ValueError('No statements match the template pattern {}.'.format(template_pattern))
+            return histogram.percentile(int(objective[1:]))
+        raise NotImplementedError('The specified objective {} is not supported.'.format(objective))
+
+    def get_summary(self):
+        """
+        latency summary of all statements and of the templates that took the longest(trial user attributes)
+        """
+        templates = sorted(self.latencies.items(), key=lambda item: item[1].sum, reverse=True)
+        template_summaries = []
+        for template, histogram in templates[:SUMMARY_TEMPLATE_NUM]:
+            template_summary = {'template': template[:SUMMARY_TEMPLATE_LENGTH]}
+            template_summary.update(histogram.get_summary())
+            template_summaries.append(template_summary)
+        return {'latency': self.get_histogram().get_summary(),
+                'makespan_second': round(self.end_second, 3),
+                'template_latencies': template_summaries}
@@ -1,41 +1,188 @@
 import time
 from logging import getLogger
+import asyncpg
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from pgopttune.utils.pg_connect import get_pg_connection
 from pgopttune.config.postgres_server_config import PostgresServerConfig
+from pgopttune.workload.replay_scheduler import DispatchLag, ReplayScheduler, sleep_until
+from pgopttune.workload.replay_statistics import ReplayStatistics
+from pgopttune.workload.statement_normalizer import normalize_statement, render_statement, get_parameter_types, \
+    get_prepare_statement, get_execute_statement
 
 logger = getLogger(__name__)
 
+# the connection is established this long before the first statement(the dispatch lag of the first statement
+# includes the connection time exceeding it)
+CONNECT_LEAD_SECOND = 0.1
+
+
+def get_session_weights(transactions):
+    """
+    weight of each session(the columnar reader returns them without loading the sessions)
+    """
+    weights = getattr(transactions, 'weights', None)
+    if weights is None:
+        weights = [transaction.weight for transaction in transactions]
+    return weights
+
 
 class SampledTransaction:
-    def __init__(self, session_id: str, query_start_time: list, statement: list):
+    # literal parameters of each statement(None : the statements are not normalized)
+    # the class attribute is the default value for transactions pickled before the statements were normalized
+    parameters = None
+    # number of the original sessions represented by this session(reduced workload)
+    weight = 1.0
+    _templates = None  # templates of the statements(computed on the first replay with statistics)
+
+    def __init__(self, session_id: str, query_start_time: list, statement: list, parameters: list = None,
+                 weight=1.0):
         self.session_id = session_id
         self.query_start_time = query_start_time
-        self.statement = statement
+        self.statement = statement  # statement or template(if parameters is not None)
+        self.parameters = parameters
+        self.weight = weight
+
+    def get_parameters(self, index):
+        return self.parameters[index] if self.parameters is not None else []
+
+    def get_statement(self, index):
+        """
+        statement with the literal parameters rendered into the template
+        """
+        return render_statement(self.statement[index], self.get_parameters(index))
 
-    def run(self, postgres_server_config: PostgresServerConfig):
-        start_time = time.time()
+    def get_templates(self):
+        """
+        templates of the statements(the latencies are recorded per template)
+        """
+        if self.parameters is not None:
+            return self.statement
+        if self._templates is None:
+            self._templates = [normalize_statement(statement)[0] for statement in self.statement]
+        return self._templates
+
+    def run(self, postgres_server_config: PostgresServerConfig, start_time=None, max_lag_second=None,
+            use_prepared_statements=False, statistics: ReplayStatistics = None):
+        """
+        start_time is the replay start time(time.perf_counter()) shared by all transactions
+        statistics : the latency of each statement and the end time are recorded if it is specified
+        Returns the elapsed time of the statements and the dispatch lag of the statements.
+        """
+        if start_time is None:
+            start_time = time.perf_counter()
         elapsed_times = 0
+        dispatch_lag = DispatchLag(max_lag_second=max_lag_second)
+        prepared_statements = {}  # (template, parameter types) -> prepared statement name(None : not prepared)
+        templates = self.get_templates() if statistics is not None else None  # normalized before the replay
 
-        # sleep until first statement start
-        self._sleep_until_statement_start_time(start_time, self.query_start_time[0])
+        # sleep until just before the first statement start and establish the connection
+        sleep_until(start_time + self.query_start_time[0].total_seconds() - CONNECT_LEAD_SECOND)
 
         with get_pg_connection(dsn=postgres_server_config.dsn) as conn:
             conn.autocommit = True
             with conn.cursor() as cur:
                 for index in range(len(self.query_start_time)):
-                    self._sleep_until_statement_start_time(start_time, self.query_start_time[index])
-                    query_start_time = time.time()
-                    cur.execute(self.statement[index])
+                    parameters = self.get_parameters(index)
+                    dispatch_lag.add(sleep_until(start_time + self.query_start_time[index].total_seconds()))
+                    query_start_time = time.perf_counter()
+                    if use_prepared_statements and parameters:
+                        self._execute_prepared(conn, cur, self.statement[index], parameters, prepared_statements)
+                    else:
+                        cur.execute(render_statement(self.statement[index], parameters))
                     # logger.info("Execute Statement : {}".format(self.statement[index]))
-                    elapsed_times += (time.time() - query_start_time)
+                    elapsed_time = time.perf_counter() - query_start_time
+                    elapsed_times += elapsed_time
+                    if statistics is not None:
+                        statistics.record(templates[index], elapsed_time, count=self.weight)
+        if statistics is not None:
+            statistics.record_end(time.perf_counter() - start_time)
+        return elapsed_times, dispatch_lag
+
+    async def run_async(self, dsn, scheduler: ReplayScheduler, use_prepared_statements=False,
+                        statistics: ReplayStatistics = None):
+        """
+        run as a coroutine(used by the asyncio replay engine)
+        statistics : the latency of each statement and the end time are recorded if it is specified
+        """
+        elapsed_times = 0
+        prepared_statements = {}  # (template, parameter types) -> prepared statement name(None : not prepared)
+        templates = self.get_templates() if statistics is not None else None  # normalized before the replay
+
+        # wait until just before the first statement start and establish the connection
+        await scheduler.wait_until(self.query_start_time[0].total_seconds() - CONNECT_LEAD_SECOND, record_lag=False)
+        conn = await asyncpg.connect(dsn)
+        try:
+            for index in range(len(self.query_start_time)):
+                parameters = self.get_parameters(index)
+                await scheduler.wait_until(self.query_start_time[index].total_seconds())
+                query_start_time = time.perf_counter()
+                if use_prepared_statements and parameters:
+                    await self._execute_prepared_async(conn, self.statement[index], parameters, prepared_statements)
+                else:
+                    await conn.execute(render_statement(self.statement[index], parameters))
+                elapsed_time = time.perf_counter() - query_start_time
+                elapsed_times += elapsed_time
+                if statistics is not None:
+                    statistics.record(templates[index], elapsed_time, count=self.weight)
+        finally:
+            await conn.close()
+        if statistics is not None:
+            statistics.record_end(time.perf_counter() - scheduler.start_time)
         return elapsed_times
 
     @staticmethod
-    def _sleep_until_statement_start_time(start_time, query_start_time):
-        while (time.time() - start_time) < query_start_time.total_seconds():
-            sleep_time = query_start_time.total_seconds() - (time.time() - start_time)
-            # logger.debug("sleep: {0:.4f}".format(sleep_time))
-            if sleep_time > 1:
-                time.sleep(sleep_time)
-            else:
-                time.sleep(0.1)  # FIXME
+    def _execute_prepared(conn, cur, template, parameters, prepared_statements):
+        """
+        execute the template as a server-side prepared statement(PREPARE on the first execution)
+        """
+        key = (template, get_parameter_types(parameters))
+        if key not in prepared_statements:
+            name = 'pgopttune_{}'.format(len(prepared_statements) + 1)
+            # a failed PREPARE must not abort the replayed transaction
+            in_transaction = conn.get_transaction_status() != TRANSACTION_STATUS_IDLE
+            try:
+                if in_transaction:
+                    cur.execute('SAVEPOINT pgopttune_prepare')
+                cur.execute(get_prepare_statement(name, template, key[1]))
+                if in_transaction:
+                    cur.execute('RELEASE SAVEPOINT pgopttune_prepare')
+            except psycopg2.Error as e:
+                logger.debug('The statement could not be prepared, it is executed as text. {}'.format(e))
+                if in_transaction:
+                    cur.execute('ROLLBACK TO SAVEPOINT pgopttune_prepare')
+                    cur.execute('RELEASE SAVEPOINT pgopttune_prepare')
+                name = None
+            prepared_statements[key] = name
+        if prepared_statements[key] is None:
+            cur.execute(render_statement(template, parameters))
+        else:
+            cur.execute(get_execute_statement(prepared_statements[key], parameters))
+
+    @staticmethod
+    async def _execute_prepared_async(conn, template, parameters, prepared_statements):
+        """
+        execute the template as a server-side prepared statement(PREPARE on the first execution)
+        """
+        key = (template, get_parameter_types(parameters))
+        if key not in prepared_statements:
+            name = 'pgopttune_{}'.format(len(prepared_statements) + 1)
+            # a failed PREPARE must not abort the replayed transaction
+            in_transaction = conn.is_in_transaction()
+            try:
+                if in_transaction:
+                    await conn.execute('SAVEPOINT pgopttune_prepare')
+                await conn.execute(get_prepare_statement(name, template, key[1]))
+                if in_transaction:
+                    await conn.execute('RELEASE SAVEPOINT pgopttune_prepare')
+            except asyncpg.PostgresError as e:
+                logger.debug('The statement could not be prepared, it is executed as text. {}'.format(e))
+                if in_transaction:
+                    await conn.execute('ROLLBACK TO SAVEPOINT pgopttune_prepare')
+                    await conn.execute('RELEASE SAVEPOINT pgopttune_prepare')
+                name = None
+            prepared_statements[key] = name
+        if prepared_statements[key] is None:
+            await conn.execute(render_statement(template, parameters))
+        else:
+            await conn.execute(get_execute_statement(prepared_statements[key], parameters))
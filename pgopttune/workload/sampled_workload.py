@@ -1,14 +1,24 @@
 import os
+import time
 from logging import getLogger
 import datetime
 import pickle
 import multiprocessing
+from distutils.util import strtobool
 from psycopg2.extras import DictCursor
 from pgopttune.workload.workload import Workload
+from pgopttune.log.pg_csv_log import PostgresCsvLog
+from pgopttune.log.csv_log_parser import read_csv_log_statements, parse_parameters_detail
 from pgopttune.utils.pg_connect import get_pg_connection
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 from pgopttune.config.workload_sampling_config import WorkloadSamplingConfig
-from pgopttune.workload.sampled_transaction import SampledTransaction
+from pgopttune.workload.sampled_transaction import SampledTransaction, get_session_weights
+from pgopttune.workload.scaled_transactions import ScaledUpTransactions
+from pgopttune.workload.async_replay import run_transactions_async
+from pgopttune.workload.replay_scheduler import DispatchLag
+from pgopttune.workload.replay_statistics import ReplayStatistics, OBJECTIVES
+from pgopttune.workload.statement_normalizer import normalize_statement, has_placeholders
+from pgopttune.workload.sampled_workload_file import SampledWorkloadWriter, SampledWorkloadReader, FILE_EXTENSION
 
 logger = getLogger(__name__)
 
@@ -22,75 +32,184 @@ class SampledWorkload(Workload):
         self.workload_sampling_config = workload_sampling_config
         self.start_unix_time = start_unix_time
         self.end_unix_time = end_unix_time
+        self.replay_engine = 'multiprocessing'  # 'multiprocessing' or 'asyncio'
+        self.replay_process_num = 1  # number of client processes(asyncio replay engine)
+        self.max_dispatch_lag_second = None  # fail the replay if a statement starts later than this(None : no limit)
+        self.dispatch_lag = None  # dispatch lag of the last replay
+        self.use_prepared_statements = False  # execute the normalized statements as prepared statements
+        self.sample_rate = 1.0  # fraction of the transactions captured(capture_mode = sampled)
+        self.scale_up_sampled_sessions = False  # replay the sessions about 1 / sample_rate times
+        self.objective = 'total_time'  # value returned by run()('total_time', 'makespan', 'p95' or 'p99')
+        self.objective_template_pattern = None  # templates of the latency percentile objectives(None : all)
+        self.statistics = None  # latency histograms and end time of the last replay
+        self._replay_transactions = None  # transactions replayed by run()
         if my_transactions is None:
             self.my_transactions = []
             self.extract_workload()
         else:
             self.my_transactions = my_transactions
 
-    def extract_workload(self):
+    def iter_transactions(self, csv_log: PostgresCsvLog = None):
+        """
+        stream the sampled statements and yield them as transactions(one per session)
+        csv_log : the statements are read from the csv log file on this host(csv_log_parser = local)
+                  if it is not specified, they are read from the csv_log table(csv_log_parser = database)
+        """
+        normalize = strtobool(self.workload_sampling_config.normalize_statements)
+        if csv_log is not None:
+            with csv_log.open_csv_log() as csv_log_file:
+                workload_rows = read_csv_log_statements(csv_log_file,
+                                                        self.postgres_server_config.database,
+                                                        self.start_unix_time, self.end_unix_time,
+                                                        log_timezone=csv_log.log_timezone,
+                                                        chunksize=self.workload_sampling_config.extract_fetch_size)
+                yield from self._group_transactions(workload_rows, normalize=normalize)
+            return
         extract_workload_sql = '''
         SELECT
              -- log_time,
              -- query_stat_time = log_time - duration - start_unix_time
-             (log_time::timestamp(3) with time zone - substring(message from '(?<=duration: ).*ms')::interval 
+             (log_time::timestamp(3) with time zone - substring(message from '(?<=duration: )[0-9.]+ ms')::interval
              - to_timestamp(%s)) AS query_stat_time,
              -- database_name,
              session_id,
              -- substring(message from '(?<=duration: ).*(?= ms)') AS duration,
-             substring(message from '(?<=statement: ).*') AS statement
+             -- simple query protocol : "statement: <query>"
+             -- extended query protocol : "execute <statement name>: <query>"(the parameters are in detail)
+             substring(message from '^duration: [0-9.]+ ms  (?:statement|execute [^: ]+): (.*)$') AS statement,
+             detail
         FROM
              csv_log
         WHERE
              log_time > to_timestamp(%s) AND
              log_time <=  to_timestamp(%s) AND
              database_name = %s AND
-             message LIKE '%%duration%%'
+             message ~ '^duration: [0-9.]+ ms  (?:statement|execute [^: ]+): '
         ORDER BY session_id,
                  session_line_num;
                  -- log_time;
         '''
         with get_pg_connection(dsn=self.workload_sampling_config.dsn) as conn:
-            with conn.cursor(cursor_factory=DictCursor) as cur:
+            # named(server-side) cursor : the rows are fetched extract_fetch_size rows at a time
+            with conn.cursor(name='extract_workload', cursor_factory=DictCursor) as cur:
+                cur.itersize = self.workload_sampling_config.extract_fetch_size
                 cur.execute(extract_workload_sql, (self.start_unix_time, self.start_unix_time, self.end_unix_time,
                                                    self.postgres_server_config.database))
-                workload_rows = cur.fetchall()
-        # logger.debug("workload_rows : {}".format(workload_rows))
-        self._create_transactions(workload_rows)
-
-    def _create_transactions(self, workload_rows):
-        query_stat_time = []
-        session_id = ''
-        statement = []
-        for index, row in enumerate(workload_rows):
-            if session_id == row[1] or index == 0:  # same session statement
-                query_stat_time.append(row[0])
+                yield from self._group_transactions(cur, normalize=normalize)
+
+    def extract_workload(self, csv_log: PostgresCsvLog = None):
+        self.my_transactions.extend(self.iter_transactions(csv_log=csv_log))
+
+    @staticmethod
+    def _group_transactions(workload_rows, normalize=False):
+        """
+        group the rows(ordered by session) into transactions and yield each transaction when its session ends
+        row : (query_stat_time, session_id, statement[, detail])
+        the statements executed with the extended query protocol have their parameters in detail
+        """
+        session_id = None
+        query_stat_time, statement, parameters = [], [], []
+        skipped_statement_num = 0
+        for row in workload_rows:
+            if row[1] != session_id:  # next session
+                if session_id is not None:
+                    yield SampledTransaction(session_id, query_stat_time, statement,
+                                             parameters=parameters if any(parameters) or normalize else None)
                 session_id = row[1]
-                statement.append(row[2])
+                query_stat_time, statement, parameters = [], [], []
+            # template and literal parameters of the statement
+            row_parameters = parse_parameters_detail(row[3]) if len(row) > 3 else []
+            if row_parameters:
+                row_statement = row[2]  # parameterized by the client
+            elif has_placeholders(row[2]):
+                skipped_statement_num += 1  # the parameters are not logged(e.g. log_parameter_max_length = 0)
+                continue
+            elif normalize:
+                row_statement, row_parameters = normalize_statement(row[2])
             else:
-                my_transaction = SampledTransaction(session_id, query_stat_time, statement)
-                self.my_transactions.append(my_transaction)
-                query_stat_time = [row[0]]
-                session_id = row[1]
-                statement = [row[2]]
+                row_statement = row[2]
+            query_stat_time.append(row[0])
+            statement.append(row_statement)
+            parameters.append(row_parameters)
+        if session_id is not None:  # last session
+            yield SampledTransaction(session_id, query_stat_time, statement,
+                                     parameters=parameters if any(parameters) or normalize else None)
+        if skipped_statement_num > 0:
+            logger.warning("{} statements are not sampled because their parameters are not logged."
+                           .format(skipped_statement_num))
 
-    def save_sampled_workload(self):
-        save_file_name = datetime.datetime.fromtimestamp(self.start_unix_time).strftime("%Y-%m-%d_%H%M%S.%f") + \
-                         "-" \
-                         + datetime.datetime.fromtimestamp(self.end_unix_time).strftime("%Y-%m-%d_%H%M%S.%f") + ".pkl"
-        save_file_path = os.path.join("workload_data", save_file_name)
-        with open(save_file_path, 'wb') as f:
-            pickle.dump(self, f)
+    @classmethod
+    def extract_and_save_sampled_workload(cls, postgres_server_config: PostgresServerConfig,
+                                          workload_sampling_config: WorkloadSamplingConfig,
+                                          start_unix_time, end_unix_time, save_format='pickle', compression='none',
+                                          csv_log: PostgresCsvLog = None, sample_rate=1.0):
+        """
+        extract the sampled workload and save it
+        (with the columnar format, the transactions are written to the file as they are extracted)
+        """
+        workload = cls(postgres_server_config, workload_sampling_config, start_unix_time, end_unix_time,
+                       my_transactions=[])
+        workload.sample_rate = sample_rate
+        if save_format == 'columnar':
+            return workload.save_sampled_workload(save_format=save_format, compression=compression,
+                                                  transactions=workload.iter_transactions(csv_log=csv_log))
+        workload.extract_workload(csv_log=csv_log)
+        return workload.save_sampled_workload(save_format=save_format, compression=compression)
+
+    def save_sampled_workload(self, save_format='pickle', compression='none', transactions=None):
+        """
+        transactions : transactions to save in the columnar format(default : self.my_transactions)
+        """
+        save_file_path = self.get_save_file_path(self.start_unix_time, self.end_unix_time, save_format=save_format)
+        if save_format == 'columnar':
+            with SampledWorkloadWriter(save_file_path, compression=compression) as writer:
+                for my_transaction in self.my_transactions if transactions is None else transactions:
+                    writer.add_transaction(my_transaction)
+                writer.close(self.start_unix_time, self.end_unix_time, database=self.postgres_server_config.database,
+                             sample_rate=self.sample_rate)
+        elif save_format == 'pickle':
+            with open(save_file_path, 'wb') as f:
+                pickle.dump(self, f)
+        else:
+            raise NotImplementedError('The specified save format {} is not supported.'.format(save_format))
         return save_file_path
 
-    def run(self):
-        session_num = len(self.my_transactions)  # number of session
+    @staticmethod
+    def get_save_file_path(start_unix_time, end_unix_time, save_format='pickle'):
+        save_file_name = datetime.datetime.fromtimestamp(start_unix_time).strftime("%Y-%m-%d_%H%M%S.%f") + \
+                         "-" \
+                         + datetime.datetime.fromtimestamp(end_unix_time).strftime("%Y-%m-%d_%H%M%S.%f")
+        return os.path.join("workload_data", save_file_name + (FILE_EXTENSION if save_format == 'columnar' else ".pkl"))
+
+    def run(self, measurement_time_second: int = None, trial=None):
+        self._replay_transactions = self._get_replay_transactions()
+        session_num = len(self._replay_transactions)  # number of session
         logger.debug("Number of session : {} ".format(session_num))
-        with multiprocessing.Pool(session_num) as p:
-            args = range(session_num)
-            elapsed_times = p.map(self._run_transaction, args)
+        if self.replay_engine == 'asyncio':
+            # run all sessions as coroutines in replay_process_num processes
+            elapsed_times, self.dispatch_lag, self.statistics = run_transactions_async(
+                self.postgres_server_config.dsn, self._replay_transactions, process_num=self.replay_process_num,
+                max_lag_second=self.max_dispatch_lag_second, use_prepared_statements=self.use_prepared_statements)
+        elif self.replay_engine == 'multiprocessing':
+            # run each session in its own process
+            self.replay_start_time = time.perf_counter()  # replay start time shared by all sessions
+            with multiprocessing.Pool(session_num) as p:
+                args = range(session_num)
+                results = p.map(self._run_transaction, args)
+            elapsed_times = [elapsed_time for elapsed_time, _, _ in results]
+            self.dispatch_lag = DispatchLag()
+            self.statistics = ReplayStatistics()
+            for _, dispatch_lag, statistics in results:
+                self.dispatch_lag.merge(dispatch_lag)
+                self.statistics.merge(statistics)
+        else:
+            raise NotImplementedError('The specified replay engine {} is not supported.'.format(self.replay_engine))
         logger.debug("Transactions elapsed times : {} ".format(elapsed_times))
-        elapsed_time = sum(elapsed_times)
+        logger.debug("Dispatch lag of statements : mean {:.3f} ms, max {:.3f} ms".format(
+            self.dispatch_lag.mean * 1000, self.dispatch_lag.max * 1000))
+        # each session of a reduced workload represents weight sessions of the original workload
+        elapsed_time = sum(weight * transaction_elapsed_time for weight, transaction_elapsed_time
+                           in zip(get_session_weights(self._replay_transactions), elapsed_times))
         #  single process execute #
         # for index, my_transaction in enumerate(self.my_transactions):
         #     logger.debug("Transaction's statement : {}".format(my_transaction.statement))
@@ -99,16 +218,62 @@ class SampledWorkload(Workload):
         #     elapsed_time += transaction_elapsed_time
         # logger.debug("Transactions elapsed time(sum) : {0:.4f} s".format(elapsed_time))
         logger.debug("Transactions elapsed time(sum) : {0:.4f} s".format(elapsed_time))
-        return elapsed_time
+        objective_value = self.statistics.get_objective_value(self.objective, elapsed_time,
+                                                              template_pattern=self.objective_template_pattern)
+        logger.debug("Objective({}) : {:.4f}".format(self.objective, objective_value))
+        return objective_value
+
+    def _get_replay_transactions(self):
+        if self.scale_up_sampled_sessions and self.sample_rate < 1:
+            # scale the sampled sessions back up to the original rate
+            logger.debug("Replay the sampled sessions about {:.1f} times(sample rate : {})".format(
+                1 / self.sample_rate, self.sample_rate))
+            return ScaledUpTransactions(self.my_transactions, self.sample_rate)
+        return self.my_transactions
 
     @classmethod
-    def load_sampled_workload(cls, load_file_path, postgres_server_config: PostgresServerConfig = None):
-        with open(load_file_path, 'rb') as f:
-            workload = pickle.load(f)
+    def load_sampled_workload(cls, load_file_path, postgres_server_config: PostgresServerConfig = None,
+                              replay_engine='multiprocessing', replay_process_num=1, max_dispatch_lag_second=None,
+                              use_prepared_statements=False, scale_up_sampled_sessions=False,
+                              objective='total_time', objective_template_pattern=None):
+        if objective not in OBJECTIVES:
+            raise NotImplementedError('The specified objective {} is not supported.'.format(objective))
+        if os.path.isdir(load_file_path):
+            # columnar format(each session is loaded when it is replayed)
+            reader = SampledWorkloadReader(load_file_path)
+            workload = cls(postgres_server_config, workload_sampling_config=None,
+                           start_unix_time=reader.meta['start_unix_time'], end_unix_time=reader.meta['end_unix_time'],
+                           my_transactions=reader)
+            workload.sample_rate = reader.meta.get('sample_rate', 1.0)
+        else:
+            with open(load_file_path, 'rb') as f:
+                workload = pickle.load(f)
+            workload.sample_rate = getattr(workload, 'sample_rate', 1.0)  # saved before the sample rate was added
         if postgres_server_config is not None:
             workload.postgres_server_config = postgres_server_config
+        workload.replay_engine = replay_engine
+        workload.replay_process_num = replay_process_num
+        workload.max_dispatch_lag_second = max_dispatch_lag_second
+        workload.use_prepared_statements = use_prepared_statements
+        workload.scale_up_sampled_sessions = scale_up_sampled_sessions
+        workload.objective = objective
+        workload.objective_template_pattern = objective_template_pattern
         return workload
 
+    def get_trial_user_attrs(self):
+        if self.dispatch_lag is None:
+            return {}
+        user_attrs = {'mean_dispatch_lag_ms': round(self.dispatch_lag.mean * 1000, 3),
+                      'max_dispatch_lag_ms': round(self.dispatch_lag.max * 1000, 3)}
+        user_attrs.update(self.statistics.get_summary())
+        return user_attrs
+
+    def is_latency_measured(self):
+        return True
+
+    def get_latency_percentile(self, percent):
+        return self.statistics.get_histogram().percentile(percent)
+
     def data_load(self):
         # TODO:
         logger.warning("At the moment, in the sampled workload, The data reload function is not implemented.")
@@ -119,9 +284,13 @@ class SampledWorkload(Workload):
 
     def _run_transaction(self, transaction_index=0):
         # logger.debug("Transaction's statement : {}".format(self.my_transactions[transaction_index].statement))
-        transaction_elapsed_time = self.my_transactions[transaction_index].run(self.postgres_server_config)
-        # logger.debug("elapsed time : {0:.4f} s".format(transaction_elapsed_time))
-        return transaction_elapsed_time
+        statistics = ReplayStatistics()
+        elapsed_time, dispatch_lag = self._replay_transactions[transaction_index].run(
+            self.postgres_server_config, start_time=self.replay_start_time,
+            max_lag_second=self.max_dispatch_lag_second, use_prepared_statements=self.use_prepared_statements,
+            statistics=statistics)
+        # logger.debug("elapsed time : {0:.4f} s".format(elapsed_time))
+        return elapsed_time, dispatch_lag, statistics
 
 
 if __name__ == "__main__":
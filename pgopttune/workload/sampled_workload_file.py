@@ -0,0 +1,236 @@
+import os
+import json
+import datetime
+from logging import getLogger
+import numpy as np
+import zstandard
+from pgopttune.workload.sampled_transaction import SampledTransaction
+
+logger = getLogger(__name__)
+
+# Columnar sampled workload format
+#
+# <name>.sampled/
+#   meta.json              : format version, sampling time, sample rate, number of sessions and statements, compression
+#   session_ids.bin        : int32  string id of the session id of each session
+#   session_offsets.bin    : int64  index of the first statement of each session
+#   query_start_times.bin  : int64  start time of each statement(microseconds from the sampling start time)
+#   statements.bin         : int32  string id of each statement(template if the statements are normalized)
+#   parameter_offsets.bin  : int64  index of the first literal parameter of each statement(version 2 or later)
+#   parameters.bin         : int32  string id of each literal parameter(version 2 or later)
+#   session_weights.bin    : float64  number of original sessions represented by each session(version 3 or later)
+#   strings.bin(.zst)      : deduplicated strings(utf-8, optionally zstd compressed)
+#   string_offsets.bin     : int64  start position of each string in strings.bin
+#
+# The integer columns are little-endian raw arrays, memory-mapped when reading.
+# Statements of a session are stored contiguously, so each session is loaded only when it is accessed.
+# Version 1 files(without literal parameters) and version 2 files(without session weights) can still be read.
+FORMAT_VERSION = 3
+FILE_EXTENSION = '.sampled'
+SESSION_ID_DTYPE = np.dtype('<i4')
+OFFSET_DTYPE = np.dtype('<i8')
+QUERY_START_TIME_DTYPE = np.dtype('<i8')
+STATEMENT_DTYPE = np.dtype('<i4')
+PARAMETER_DTYPE = np.dtype('<i4')
+SESSION_WEIGHT_DTYPE = np.dtype('<f8')
+
+
+class SampledWorkloadWriter:
+    """
+    Write sampled transactions to the columnar sampled workload format one by one.
+    """
+
+    def __init__(self, path, compression='none'):
+        if compression not in ('none', 'zstd'):
+            raise ValueError('The specified compression {} is not supported.'.format(compression))
+        self.path = path
+        self.compression = compression
+        self.session_num = 0
+        self.statement_num = 0
+        self.parameter_num = 0
+        self.normalized = False  # whether the transactions have literal parameters
+        self.weighted = False  # whether the transactions represent other sessions(reduced workload)
+        self._string_ids = {}  # string -> string id
+        self._string_position = 0
+        os.makedirs(path)
+        self._files = {name: open(os.path.join(path, name), 'wb')
+                       for name in ['session_ids.bin', 'session_offsets.bin', 'query_start_times.bin',
+                                    'statements.bin', 'parameter_offsets.bin', 'parameters.bin',
+                                    'session_weights.bin', 'strings.bin', 'string_offsets.bin']}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for f in self._files.values():
+            f.close()
+
+    def add_transaction(self, transaction: SampledTransaction):
+        self._write('session_ids.bin', [self._get_string_id(transaction.session_id)], SESSION_ID_DTYPE)
+        self._write('session_offsets.bin', [self.statement_num], OFFSET_DTYPE)
+        self._write('session_weights.bin', [transaction.weight], SESSION_WEIGHT_DTYPE)
+        self._write('query_start_times.bin',
+                    [query_start_time // datetime.timedelta(microseconds=1)
+                     for query_start_time in transaction.query_start_time], QUERY_START_TIME_DTYPE)
+        self._write('statements.bin', [self._get_string_id(statement) for statement in transaction.statement],
+                    STATEMENT_DTYPE)
+        for index in range(len(transaction.statement)):
+            parameters = transaction.get_parameters(index)
+            self._write('parameter_offsets.bin', [self.parameter_num], OFFSET_DTYPE)
+            self._write('parameters.bin', [self._get_string_id(parameter) for parameter in parameters],
+                        PARAMETER_DTYPE)
+            self.parameter_num += len(parameters)
+        if transaction.parameters is not None:
+            self.normalized = True
+        if transaction.weight != 1:
+            self.weighted = True
+        self.session_num += 1
+        self.statement_num += len(transaction.statement)
+
+    def close(self, start_unix_time, end_unix_time, database=None, sample_rate=1.0, reduction=None):
+        """
+        reduction : information of the workload reduction(source file, number of source sessions, ...)
+        """
+        for f in self._files.values():
+            f.close()
+        if self.compression == 'zstd':
+            strings_path = os.path.join(self.path, 'strings.bin')
+            with open(strings_path, 'rb') as f_in, open(strings_path + '.zst', 'wb') as f_out:
+                zstandard.ZstdCompressor().copy_stream(f_in, f_out)
+            os.remove(strings_path)
+        meta = {'format_version': FORMAT_VERSION,
+                'start_unix_time': start_unix_time,
+                'end_unix_time': end_unix_time,
+                'database': database,
+                'sample_rate': sample_rate,
+                'session_num': self.session_num,
+                'statement_num': self.statement_num,
+                'parameter_num': self.parameter_num,
+                'normalized': self.normalized,
+                'weighted': self.weighted,
+                'string_num': len(self._string_ids),
+                'compression': self.compression}
+        if reduction is not None:
+            meta['reduction'] = reduction
+        with open(os.path.join(self.path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        logger.debug("The sampled workload has been saved. Sessions : {}, Statements : {}, Strings : {}"
+                     .format(self.session_num, self.statement_num, len(self._string_ids)))
+
+    def _get_string_id(self, string):
+        string_id = self._string_ids.get(string)
+        if string_id is None:
+            string_id = len(self._string_ids)
+            self._string_ids[string] = string_id
+            encoded_string = string.encode('utf-8')
+            self._write('string_offsets.bin', [self._string_position], OFFSET_DTYPE)
+            self._files['strings.bin'].write(encoded_string)
+            self._string_position += len(encoded_string)
+        return string_id
+
+    def _write(self, name, values, dtype):
+        self._files[name].write(np.asarray(values, dtype=dtype).tobytes())
+
+
+class SampledWorkloadReader:
+    """
+    Read the columnar sampled workload format.
+    Behaves as a sequence of SampledTransaction, each session is created when it is accessed.
+    """
+
+    def __init__(self, path, session_indexes=None):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta['format_version'] > FORMAT_VERSION:
+            raise ValueError('The sampled workload format version {} is not supported. path : {}'
+                             .format(self.meta['format_version'], path))
+        self.session_indexes = range(self.meta['session_num']) if session_indexes is None else session_indexes
+        self._open()
+
+    def _open(self):
+        self._session_ids = self._memmap('session_ids.bin', SESSION_ID_DTYPE)
+        self._session_offsets = self._memmap('session_offsets.bin', OFFSET_DTYPE)
+        self._query_start_times = self._memmap('query_start_times.bin', QUERY_START_TIME_DTYPE)
+        self._statements = self._memmap('statements.bin', STATEMENT_DTYPE)
+        self._string_offsets = self._memmap('string_offsets.bin', OFFSET_DTYPE)
+        if self.meta.get('normalized', False):
+            self._parameter_offsets = self._memmap('parameter_offsets.bin', OFFSET_DTYPE)
+            self._parameters = self._memmap('parameters.bin', PARAMETER_DTYPE)
+        if self.meta.get('weighted', False):
+            self._session_weights = self._memmap('session_weights.bin', SESSION_WEIGHT_DTYPE)
+        self._strings = None  # loaded when it is first accessed
+
+    def __getstate__(self):
+        # only the path and the session indexes are pickled(e.g. when passed to the replay processes)
+        return {'path': self.path, 'meta': self.meta, 'session_indexes': self.session_indexes}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return len(self.session_indexes)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return SampledWorkloadReader(self.path, session_indexes=self.session_indexes[index])
+        return self._get_transaction(self.session_indexes[index])
+
+    @property
+    def weights(self):
+        """
+        weight of each session(without loading the sessions)
+        """
+        if not self.meta.get('weighted', False):
+            return [1.0] * len(self)
+        return [float(self._session_weights[session_index]) for session_index in self.session_indexes]
+
+    def _get_transaction(self, session_index):
+        statement_range = self._get_range(self._session_offsets, session_index, self.meta['statement_num'])
+        start, end = statement_range.start, statement_range.stop
+        query_start_time = [datetime.timedelta(microseconds=int(microseconds))
+                            for microseconds in self._query_start_times[start:end]]
+        statement = [self._get_string(string_id) for string_id in self._statements[start:end]]
+        parameters = None
+        if self.meta.get('normalized', False):
+            parameters = []
+            for statement_index in range(start, end):
+                parameter_range = self._get_range(self._parameter_offsets, statement_index, self.meta['parameter_num'])
+                parameters.append([self._get_string(string_id) for string_id in self._parameters[parameter_range]])
+        weight = float(self._session_weights[session_index]) if self.meta.get('weighted', False) else 1.0
+        return SampledTransaction(self._get_string(self._session_ids[session_index]), query_start_time, statement,
+                                  parameters=parameters, weight=weight)
+
+    @staticmethod
+    def _get_range(offsets, index, total_num):
+        start = int(offsets[index])
+        end = int(offsets[index + 1]) if index + 1 < len(offsets) else total_num
+        return slice(start, end)
+
+    def _get_string(self, string_id):
+        if self._strings is None:
+            self._strings = self._load_strings()
+        string_id = int(string_id)
+        start = int(self._string_offsets[string_id])
+        if string_id + 1 < self.meta['string_num']:
+            end = int(self._string_offsets[string_id + 1])
+        else:
+            end = len(self._strings)
+        return bytes(self._strings[start:end]).decode('utf-8')
+
+    def _load_strings(self):
+        if self.meta['compression'] == 'zstd':
+            with open(os.path.join(self.path, 'strings.bin.zst'), 'rb') as f:
+                return zstandard.ZstdDecompressor().stream_reader(f).read()
+        return self._memmap('strings.bin', np.dtype('u1'))
+
+    def _memmap(self, name, dtype):
+        file_path = os.path.join(self.path, name)
+        if os.path.getsize(file_path) == 0:
+            return np.empty(0, dtype=dtype)  # an empty file cannot be memory-mapped
+        return np.memmap(file_path, dtype=dtype, mode='r')
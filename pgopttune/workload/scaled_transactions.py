@@ -0,0 +1,55 @@
+import random
+import datetime
+from logging import getLogger
+from pgopttune.workload.sampled_transaction import SampledTransaction, get_session_weights
+
+logger = getLogger(__name__)
+
+# the copies of a session are shifted by up to this time, so they do not run the same statement at the same time
+SCALE_UP_JITTER_SECOND = 0.1
+
+
+class ScaledUpTransactions:
+    """
+    Sequence of the sampled transactions, each repeated about 1 / sample_rate times,
+    to scale the transactions captured with a sample rate back up to the original rate.
+    """
+
+    def __init__(self, transactions, sample_rate, seed=0, copies=None):
+        self.transactions = transactions
+        if copies is None:
+            # (transaction index, start time shift(seconds)) of each copy
+            # the number of copies is int(1 / sample_rate) or one more, so that the mean is 1 / sample_rate
+            rng = random.Random(seed)
+            scale = 1 / sample_rate
+            copies = []
+            for index in range(len(transactions)):
+                copy_num = int(scale) + (1 if rng.random() < scale - int(scale) else 0)
+                for copy_index in range(copy_num):
+                    copies.append((index, 0.0 if copy_index == 0 else rng.uniform(0, SCALE_UP_JITTER_SECOND)))
+        self.copies = copies
+
+    def __len__(self):
+        return len(self.copies)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ScaledUpTransactions(self.transactions, None, copies=self.copies[index])
+        transaction_index, shift_second = self.copies[index]
+        transaction = self.transactions[transaction_index]
+        if shift_second == 0:
+            return transaction
+        shift = datetime.timedelta(seconds=shift_second)
+        return SampledTransaction(transaction.session_id,
+                                  [query_start_time + shift for query_start_time in transaction.query_start_time],
+                                  transaction.statement, parameters=transaction.parameters, weight=transaction.weight)
+
+    @property
+    def weights(self):
+        weights = get_session_weights(self.transactions)
+        return [weights[transaction_index] for transaction_index, _ in self.copies]
+
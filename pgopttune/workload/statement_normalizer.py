@@ -0,0 +1,163 @@
+import re
+from functools import lru_cache
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# Normalize a statement into a template and its literal parameters.
+#   SELECT * FROM t WHERE id = 10 AND name = 'abc'
+#   -> template   : SELECT * FROM t WHERE id = $1 AND name = $2
+#      parameters : ['10', "'abc'"]
+# The parameters are kept as SQL literal text, so the original statement can be rendered again
+# and the parameters can be passed to EXECUTE as they are.
+TOKEN_PATTERN = re.compile(r'''
+      (?P<space>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*')
+    | (?P<other_string>(?:[bBxXnN]|[uU]&)'(?:[^']|'')*')
+    | (?P<dollar_string>(?P<dollar_tag>\$[A-Za-z_][A-Za-z_0-9]*\$|\$\$).*?(?P=dollar_tag))
+    | (?P<placeholder>\$[0-9]+)
+    | (?P<quoted_identifier>"(?:[^"]|"")*")
+    | (?P<number>(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)
+    | (?P<word>[A-Za-z_\u0080-\uffff][A-Za-z_0-9$\u0080-\uffff]*)
+    | (?P<operator>::|[^\sA-Za-z_0-9'"$])
+''', re.VERBOSE | re.DOTALL)
+
+# statements that are normalized
+NORMALIZE_COMMANDS = {'select', 'insert', 'update', 'delete', 'with', 'values'}
+
+# keywords that can be followed by a literal
+# (a literal after any other word is a typed literal such as date '2020-01-01' and is not replaced)
+LITERAL_CONTEXT_KEYWORDS = {'select', 'where', 'and', 'or', 'not', 'in', 'like', 'ilike', 'similar', 'to',
+                            'then', 'else', 'when', 'case', 'is', 'between', 'values', 'set', 'escape', 'distinct',
+                            'all', 'any', 'some', 'on', 'having', 'limit', 'offset', 'fetch', 'first', 'next',
+                            'return', 'returning', 'using', 'from', 'into', 'as', 'by'}
+
+# keywords that end an ORDER BY / GROUP BY clause
+CLAUSE_KEYWORDS = {'limit', 'offset', 'fetch', 'having', 'window', 'union', 'intersect', 'except', 'for',
+                   'returning', 'select', 'from', 'where'}
+
+INT4_MAX = 2 ** 31 - 1
+INT8_MAX = 2 ** 63 - 1
+
+
+@lru_cache(maxsize=4096)
+def tokenize(statement):
+    """
+    split the statement into (kind, text) tokens
+    """
+    position = 0
+    tokens = []
+    while position < len(statement):
+        match = TOKEN_PATTERN.match(statement, position)
+        if match is None:
+            raise ValueError('The statement cannot be tokenized. position : {}'.format(position))
+        tokens.append((match.lastgroup, match.group()))
+        position = match.end()
+    return tuple(tokens)
+
+
+def normalize_statement(statement):
+    """
+    Returns the template and the literal parameters of the statement.
+    The statement is returned as it is(with no parameters) if it is not a single DML statement
+    or it already contains parameters.
+    """
+    try:
+        tokens = tokenize(statement)
+    except ValueError:
+        return statement, []
+    significant_tokens = [(kind, text) for kind, text in tokens if kind not in ('space', 'comment')]
+    if not significant_tokens or significant_tokens[0][0] != 'word' \
+            or significant_tokens[0][1].lower() not in NORMALIZE_COMMANDS:
+        return statement, []
+    if any(kind == 'placeholder' for kind, _ in significant_tokens):
+        return statement, []
+    # multiple statements
+    semicolon_indexes = [index for index, (kind, text) in enumerate(significant_tokens) if text == ';']
+    if semicolon_indexes and semicolon_indexes[0] != len(significant_tokens) - 1:
+        return statement, []
+
+    template = []
+    parameters = []
+    previous_kind, previous_text, before_previous_text = None, None, None
+    in_position_clause = False  # in ORDER BY / GROUP BY(a number is a column position)
+    in_type_modifier = False  # in the type modifier of a cast such as ::numeric(10, 2)
+    for kind, text in tokens:
+        if kind in ('space', 'comment'):
+            template.append(text)
+            continue
+        lower_text = text.lower()
+        replace = False
+        if kind == 'string':
+            replace = not (previous_kind == 'word' and previous_text.lower() not in LITERAL_CONTEXT_KEYWORDS)
+        elif kind == 'number':
+            replace = not (in_position_clause or in_type_modifier)
+        if replace:
+            parameters.append(text)
+            template.append('${}'.format(len(parameters)))
+        else:
+            template.append(text)
+        # ORDER BY / GROUP BY
+        if kind == 'word' and lower_text == 'by' and previous_text is not None \
+                and previous_text.lower() in ('order', 'group'):
+            in_position_clause = True
+        elif (kind == 'word' and lower_text in CLAUSE_KEYWORDS) or text in (')', ';'):
+            in_position_clause = False
+        if text == '(' and previous_kind == 'word' and before_previous_text is not None \
+                and before_previous_text.lower() in ('::', 'as'):
+            in_type_modifier = True
+        elif text == ')':
+            in_type_modifier = False
+        previous_kind, previous_text, before_previous_text = kind, text, previous_text
+    return ''.join(template), parameters
+
+
+def has_placeholders(statement):
+    """
+    whether the statement has parameters($1, $2, ...)
+    """
+    if '$' not in statement:
+        return False
+    try:
+        return any(kind == 'placeholder' for kind, _ in tokenize(statement))
+    except ValueError:
+        return False
+
+
+def render_statement(template, parameters):
+    """
+    Returns the statement with the parameters of the template replaced by the literal parameters.
+    """
+    if not parameters:
+        return template
+    return ''.join(parameters[int(text[1:]) - 1] if kind == 'placeholder' else text
+                   for kind, text in tokenize(template))
+
+
+def get_parameter_type(parameter):
+    """
+    Returns the type that PostgreSQL assigns to the literal.
+    A string literal is 'unknown', which is resolved from the context like a literal in the statement.
+    """
+    if not re.match(r'^[0-9.]', parameter):
+        return 'unknown'
+    if re.match(r'^[0-9]+$', parameter):
+        value = int(parameter)
+        if value <= INT4_MAX:
+            return 'integer'
+        if value <= INT8_MAX:
+            return 'bigint'
+    return 'numeric'
+
+
+def get_parameter_types(parameters):
+    return tuple(get_parameter_type(parameter) for parameter in parameters)
+
+
+def get_prepare_statement(name, template, parameter_types):
+    return 'PREPARE {} ({}) AS {}'.format(name, ', '.join(parameter_types), template.rstrip().rstrip(';'))
+
+
+def get_execute_statement(name, parameters):
+    return 'EXECUTE {} ({})'.format(name, ', '.join(parameters))
@@ -0,0 +1,68 @@
+import math
+import statistics
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# two-sided 95 % critical values of Student's t distribution(degrees of freedom -> t)
+T_TABLE_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262, 10: 2.228,
+    11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110, 18: 2.101, 19: 2.093, 20: 2.086,
+    21: 2.080, 22: 2.074, 23: 2.069, 24: 2.064, 25: 2.060, 26: 2.056, 27: 2.052, 28: 2.048, 29: 2.045, 30: 2.042,
+    40: 2.021, 60: 2.000, 120: 1.980,
+}
+
+
+def get_t_value(degrees_of_freedom):
+    """
+    Returns the two-sided 95 % critical value of the t distribution
+    (the value of the nearest smaller tabulated degrees of freedom, which is conservative)
+    """
+    if degrees_of_freedom < 1:
+        raise ValueError('The degrees of freedom must be 1 or more.')
+    return T_TABLE_95[max(df for df in T_TABLE_95 if df <= degrees_of_freedom)]
+
+
+class SteadyStateDetector:
+    """
+    Decide when the throughput measurement can be stopped.
+    The intervals that end within warm_up_second are discarded, and the remaining intervals are divided into
+    batch_num batches. The measurement is steady when the 95 % confidence interval of the mean throughput
+    (batch means method) is narrower than tolerance(relative half width) of the mean.
+    The measurement is also stopped when it reaches max_measurement_second(None : no limit).
+    """
+
+    def __init__(self, warm_up_second=60, tolerance=0.02, max_measurement_second=None, batch_num=10):
+        if batch_num < 2:
+            raise ValueError('The number of batches must be 2 or more.')
+        self.warm_up_second = warm_up_second
+        self.tolerance = tolerance
+        self.max_measurement_second = max_measurement_second
+        self.batch_num = batch_num
+        self.steady = False
+        self.tps = None  # mean throughput after the warm-up(None : no interval after the warm-up)
+        self.relative_half_width = None  # half width of the confidence interval / mean
+
+    def check(self, intervals):
+        """
+        intervals : [(end time of the interval(seconds from the start), TPS of the interval), ...]
+        Returns True if the measurement can be stopped
+        """
+        measured = [tps for end_second, tps in intervals if end_second > self.warm_up_second]
+        if measured:
+            self.tps = statistics.mean(measured)
+        batch_size = len(measured) // self.batch_num
+        if batch_size > 0:
+            # the oldest intervals(nearest to the warm-up) are left out of the batches
+            measured = measured[len(measured) - batch_size * self.batch_num:]
+            batch_means = [statistics.mean(measured[index:index + batch_size])
+                           for index in range(0, len(measured), batch_size)]
+            mean = statistics.mean(batch_means)
+            half_width = get_t_value(self.batch_num - 1) * statistics.stdev(batch_means) / math.sqrt(self.batch_num)
+            self.relative_half_width = half_width / mean if mean > 0 else math.inf
+            self.steady = self.relative_half_width <= self.tolerance
+            if self.steady:
+                logger.debug('The throughput is steady. TPS : {:.3f} ± {:.3f}'.format(mean, half_width))
+                return True
+        elapsed_second = intervals[-1][0] if intervals else 0
+        return self.max_measurement_second is not None and elapsed_second >= self.max_measurement_second
@@ -0,0 +1,56 @@
+import time
+import threading
+from logging import getLogger
+from pgopttune.utils.pg_connect import get_pg_connection
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+
+logger = getLogger(__name__)
+
+
+class ThroughputMonitor(threading.Thread):
+    """
+    Sample the number of committed transactions(pg_stat_database.xact_commit)
+    at a fixed interval while the workload is running.
+    """
+
+    def __init__(self, postgres_server_config: PostgresServerConfig, interval_second=10):
+        super().__init__(daemon=True)
+        self.postgres_server_config = postgres_server_config
+        self.interval_second = interval_second
+        self.samples = []  # [(elapsed time(s), xact_commit), ...]
+        self._stop_event = threading.Event()
+
+    def run(self):
+        get_number_of_xact_commit_sql = "SELECT xact_commit FROM pg_stat_database WHERE datname = %s"
+        with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
+            conn.set_session(autocommit=True)  # take a new statistics snapshot for each sample
+            with conn.cursor() as cur:
+                start_time = time.time()
+                while True:
+                    cur.execute(get_number_of_xact_commit_sql, (self.postgres_server_config.database,))
+                    self.samples.append((time.time() - start_time, cur.fetchone()[0]))
+                    if self._stop_event.wait(self.interval_second):
+                        break
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def get_tps(self):
+        """
+        TPS from the start of the monitoring to the latest sample(None if there are not enough samples)
+        """
+        samples = list(self.samples)
+        if len(samples) < 2:
+            return None
+        (start_elapsed_time, start_xact_commit), (elapsed_time, xact_commit) = samples[0], samples[-1]
+        return round((xact_commit - start_xact_commit) / (elapsed_time - start_elapsed_time), 6)
+
+    def get_intervals(self):
+        """
+        end time(s) and TPS of each sampling interval [(elapsed time(s), TPS), ...]
+        """
+        samples = list(self.samples)
+        return [(elapsed_time, (xact_commit - previous_xact_commit) / (elapsed_time - previous_elapsed_time))
+                for (previous_elapsed_time, previous_xact_commit), (elapsed_time, xact_commit)
+                in zip(samples, samples[1:])]
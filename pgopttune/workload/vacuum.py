@@ -0,0 +1,65 @@
+import queue
+from logging import getLogger
+from concurrent.futures import ThreadPoolExecutor
+from pgopttune.utils.pg_connect import get_pg_connection
+
+logger = getLogger(__name__)
+
+
+def get_vacuum_target_tables_sql(server_version_num):
+    """
+    SQL that returns the tables modified after the last vacuum or analyze(largest first)
+    """
+    conditions = ['n_mod_since_analyze > 0', 'n_dead_tup > 0']
+    if server_version_num >= 130000:  # n_ins_since_vacuum is available in PostgreSQL 13 or later
+        conditions.append('n_ins_since_vacuum > 0')  # set the visibility map of the inserted rows
+    return "SELECT quote_ident(schemaname) || '.' || quote_ident(relname) FROM pg_stat_user_tables " \
+           "WHERE {} ORDER BY pg_total_relation_size(relid) DESC".format(' OR '.join(conditions))
+
+
+def get_vacuum_sql(table, server_version_num, parallel_workers=0):
+    """
+    parallel_workers : number of parallel workers that vacuum the indexes(0 : decided by PostgreSQL)
+    """
+    if parallel_workers > 0 and server_version_num >= 130000:  # PARALLEL option of PostgreSQL 13 or later
+        return 'VACUUM (ANALYZE, PARALLEL {}) {}'.format(parallel_workers, table)
+    return 'VACUUM ANALYZE {}'.format(table)
+
+
+def vacuum_modified_tables(dsn, server_version_num, jobs=1, parallel_workers=0):
+    """
+    run vacuum analyze on the tables modified after the last vacuum using jobs connections(like vacuumdb -j)
+    Returns the vacuumed tables
+    """
+    with get_pg_connection(dsn=dsn) as conn:
+        conn.set_session(autocommit=True)
+        with conn.cursor() as cur:
+            cur.execute(get_vacuum_target_tables_sql(server_version_num))
+            tables = [row[0] for row in cur.fetchall()]
+    if not tables:
+        logger.debug('No table was modified after the last vacuum.')
+        return tables
+    logger.debug('Run VACUUM ANALYZE. tables : {}, jobs : {}'.format(len(tables), jobs))
+    table_queue = queue.Queue()
+    for table in tables:
+        table_queue.put(table)
+    jobs = min(jobs, len(tables))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_vacuum_tables, dsn, table_queue, server_version_num, parallel_workers)
+                   for _ in range(jobs)]
+        for future in futures:
+            future.result()  # raise the error of the vacuum
+    return tables
+
+
+def _vacuum_tables(dsn, table_queue, server_version_num, parallel_workers):
+    # each job vacuums the tables in the queue one by one on its own connection
+    with get_pg_connection(dsn=dsn) as conn:
+        conn.set_session(autocommit=True)  # VACUUM cannot run inside a transaction block
+        with conn.cursor() as cur:
+            while True:
+                try:
+                    table = table_queue.get_nowait()
+                except queue.Empty:
+                    return
+                cur.execute(get_vacuum_sql(table, server_version_num, parallel_workers=parallel_workers))
@@ -1,8 +1,11 @@
+import time
 from logging import getLogger
 from retrying import retry
 from psycopg2.extras import DictCursor
-from pgopttune.utils.file_hash import get_file_hash
 from pgopttune.utils.pg_connect import get_pg_connection
+from pgopttune.workload.backup_catalog import get_backup_key
+from pgopttune.workload.vacuum import vacuum_modified_tables
+from pgopttune.reset.reset_engine_factory import get_reset_engine
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 
 logger = getLogger(__name__)
@@ -12,16 +15,35 @@ class Workload:
     def __init__(self, postgres_server_config: PostgresServerConfig):
         self.postgres_server_config = postgres_server_config
         self.backup_database_prefix = 'postgres_opttune_backup_'
-        self.config_hash = get_file_hash(postgres_server_config.conf_path)
+        self._server_version_num = None
+        self.reset_engine = None  # selected when the database is prepared for the first time
+        self.reset_phase_seconds = None  # elapsed time of each phase of the last reset
+        self.statistics_restored = False  # the last reset restored the vacuumed and analyzed data
 
     def prepare_workload_database(self):
-        if self.check_exist_backup_database():
-            # Recreate the database using the backed up database as a template
-            self.drop_database()
-            self.create_database_use_backup_database()
+        if self.reset_engine is None:
+            self.reset_engine = get_reset_engine(self)
+        start_time = time.time()
+        if self.reset_engine.exists():
+            # Restore the database saved after the data load
+            self.reset_engine.restore()
+            self.statistics_restored = self.reset_engine.statistics_restored
         else:
             self.data_load()  # data load
-            self.create_backup_database()  # backup database
+            # vacuum the whole database before the backup, so the restored database does not need it
+            # (the statistics of the loaded tables may not be reported yet, so they are not used here)
+            self.vacuum_analyze_database()
+            self.reset_engine.save()  # backup database
+            self.statistics_restored = True
+        self.reset_phase_seconds = dict(self.reset_engine.phase_seconds, total=round(time.time() - start_time, 3))
+        logger.debug('The workload database is prepared. reset method : {}, elapsed time : {:.1f}s'
+                     .format(self.reset_engine.name, time.time() - start_time))
+
+    def get_data_definition(self):
+        """
+        values that define the loaded data(the backup database is shared by the workloads with the same values)
+        """
+        return {}
 
     def data_load(self):
         raise NotImplementedError("subclasses of Workload must provide a data_load() method.")
@@ -29,12 +51,30 @@ class Workload:
     def warm_up(self):
         raise NotImplementedError("subclasses of Workload must provide a warm_up() method.")
 
-    def run(self, measurement_time_second: int = None):
+    def run(self, measurement_time_second: int = None, trial=None):
         raise NotImplementedError("subclasses of Workload must provide a run() method.")
 
-    def vacuum_database(self):
+    def get_trial_user_attrs(self):
+        """
+        metrics of the last run recorded in the trial's user attributes
+        """
+        return {}
+
+    def is_latency_measured(self):
+        """
+        Returns True if the latency of the statements is measured(p95_latency and p99_latency objectives)
+        """
+        return False
+
+    def get_latency_percentile(self, percent):
+        """
+        latency(milliseconds) of the statements of the last run at the percentile
+        """
+        raise NotImplementedError("The latency of the statements is not measured by this workload.")
+
+    def vacuum_analyze_database(self):
         """
-        run vacuum analyze
+        run vacuum analyze on all tables of the database
         """
         logger.debug("Run VACUUM ANALYZE.")
         vacuum_analyze_sql = "VACUUM ANALYZE"
@@ -43,6 +83,19 @@ class Workload:
             with conn.cursor() as cur:
                 cur.execute(vacuum_analyze_sql)
 
+    def vacuum_database(self):
+        """
+        run vacuum analyze on the tables modified after the last vacuum(between the trials)
+        (skipped just after the database was restored with the statistics of the backup)
+        """
+        if self.statistics_restored:
+            self.statistics_restored = False
+            logger.debug("VACUUM ANALYZE is skipped. The database was restored with its statistics.")
+            return
+        vacuum_modified_tables(self.postgres_server_config.dsn, self._get_server_version_num(),
+                               jobs=self.postgres_server_config.vacuum_jobs,
+                               parallel_workers=self.postgres_server_config.vacuum_parallel_workers)
+
     def execute_sql_file(self, sql_filepath):
         logger.debug("start execute {}".format(sql_filepath))
         with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
@@ -90,7 +143,20 @@ class Workload:
             "The backup is complete. Database : {} ".format(self._get_backup_database_name()))
 
     def _get_backup_database_name(self):
-        return self.backup_database_prefix + self.config_hash
+        return self.backup_database_prefix + self._get_backup_key()
+
+    def _get_backup_key(self):
+        # the backup does not depend on the tuning settings of the conf file
+        return get_backup_key(self.get_data_definition(), self.postgres_server_config.database,
+                              self._get_server_version_num())
+
+    def _get_server_version_num(self):
+        if self._server_version_num is None:
+            with get_pg_connection(dsn=self.postgres_server_config.dsn) as conn:
+                with conn.cursor() as cur:
+                    cur.execute('SHOW server_version_num')
+                    self._server_version_num = int(cur.fetchone()[0])
+        return self._server_version_num
 
     @retry(stop_max_attempt_number=5, wait_fixed=10000)
     def drop_database(self):
@@ -0,0 +1,164 @@
+import math
+import datetime
+from logging import getLogger
+import numpy as np
+from scipy import sparse
+from sklearn.cluster import KMeans
+from pgopttune.workload.sampled_transaction import SampledTransaction, get_session_weights
+from pgopttune.workload.sampled_workload_file import SampledWorkloadWriter
+from pgopttune.workload.statement_normalizer import normalize_statement
+
+logger = getLogger(__name__)
+
+# the sampling time is divided into this number of bins to compare the time distribution of the templates
+TIME_BIN_NUM = 10
+# the number of representative sessions is multiplied by this until the error is within max_error
+CLUSTER_NUM_GROWTH = 1.5
+
+
+class WorkloadReducer:
+    """
+    Reduce the sampled workload to a weighted subset of representative sessions.
+    The sessions are clustered by their statement template mix, duration and start time, and the session
+    nearest to the center of each cluster represents all the sessions of the cluster(its weight).
+    The number of clusters starts at reduction_ratio of the sessions and is increased until the template time
+    distribution(share of the statements of each template in each time bin) of the reduced workload is within
+    max_error(total variation distance) of the original one.
+    """
+
+    def __init__(self, transactions, reduction_ratio=0.1, max_error=0.05, seed=0):
+        if not 0 < reduction_ratio <= 1:
+            raise ValueError('The reduction ratio must be greater than 0 and less than or equal to 1.')
+        self.transactions = transactions
+        self.reduction_ratio = reduction_ratio
+        self.max_error = max_error
+        self.seed = seed
+        self.weights = np.asarray(get_session_weights(transactions), dtype=float)
+        self.representatives = None  # [(session index, weight), ...] of the reduced workload
+        self.error = None  # template time distribution error of the reduced workload
+        self._template_ids = {}  # template -> template id
+        self._features = None  # clustering features of each session
+        self._distributions = None  # statements of each session per (template, time bin)
+
+    def reduce(self):
+        """
+        Returns the representative sessions [(session index, weight), ...]
+        """
+        session_num = len(self.transactions)
+        if session_num == 0:
+            raise ValueError('The sampled workload has no sessions.')
+        self._analyze()
+        cluster_num = max(1, math.ceil(session_num * self.reduction_ratio))
+        while True:
+            if cluster_num >= session_num:
+                # the reduced workload is the original workload
+                representatives = [(index, weight) for index, weight in enumerate(self.weights)]
+            else:
+                representatives = self._get_representatives(cluster_num)
+            error = self._get_error(representatives)
+            logger.debug("Representative sessions : {}, template time distribution error : {:.4f}"
+                         .format(len(representatives), error))
+            if error <= self.max_error or cluster_num >= session_num:
+                break
+            cluster_num = min(session_num, math.ceil(cluster_num * CLUSTER_NUM_GROWTH))
+        self.representatives, self.error = representatives, error
+        logger.info("The workload has been reduced from {} to {} sessions. "
+                    "Template time distribution error : {:.4f}".format(session_num, len(representatives), error))
+        return representatives
+
+    def save(self, save_file_path, start_unix_time, end_unix_time, database=None, sample_rate=1.0,
+             compression='none', time_scale=None, source=None):
+        """
+        save the representative sessions as a weighted sampled workload(columnar format)
+        time_scale : the session start times are multiplied by this so that the reduced workload is replayed
+                     in a shorter time(default : ratio of the number of sessions, which keeps the session rate)
+        """
+        if self.representatives is None:
+            self.reduce()
+        if time_scale is None:
+            time_scale = len(self.representatives) / len(self.transactions)
+        with SampledWorkloadWriter(save_file_path, compression=compression) as writer:
+            for session_index, weight in sorted(self.representatives):
+                writer.add_transaction(self._rescale(self.transactions[session_index], weight, time_scale))
+            reduction = {'source': source,
+                         'source_session_num': len(self.transactions),
+                         'reduction_ratio': self.reduction_ratio,
+                         'max_error': self.max_error,
+                         'error': self.error,
+                         'time_scale': time_scale}
+            writer.close(start_unix_time, start_unix_time + (end_unix_time - start_unix_time) * time_scale,
+                         database=database, sample_rate=sample_rate, reduction=reduction)
+        return save_file_path
+
+    @staticmethod
+    def _rescale(transaction, weight, time_scale):
+        # the session start time is scaled, the intervals of the statements in the session are kept
+        shift = transaction.query_start_time[0] * time_scale - transaction.query_start_time[0]
+        return SampledTransaction(transaction.session_id,
+                                  [query_start_time + shift for query_start_time in transaction.query_start_time],
+                                  transaction.statement, parameters=transaction.parameters, weight=weight)
+
+    def _analyze(self):
+        """
+        read the sessions once and make the clustering features and the template time distributions
+        """
+        session_templates, session_times = [], []
+        for transaction in self.transactions:
+            session_templates.append(np.array([self._get_template_id(transaction, index)
+                                               for index in range(len(transaction.statement))], dtype=np.int64))
+            session_times.append(np.array([query_start_time / datetime.timedelta(seconds=1)
+                                           for query_start_time in transaction.query_start_time]))
+        template_num = len(self._template_ids)
+        all_times = np.concatenate(session_times)
+        first_time, last_time = all_times.min(), all_times.max()
+        time_range = max(last_time - first_time, 1e-6)
+        rows, template_columns, distribution_columns = [], [], []
+        for index, (templates, times) in enumerate(zip(session_templates, session_times)):
+            time_bins = np.minimum(((times - first_time) / time_range * TIME_BIN_NUM).astype(np.int64),
+                                   TIME_BIN_NUM - 1)
+            rows.append(np.full(len(templates), index))
+            template_columns.append(templates)
+            distribution_columns.append(templates * TIME_BIN_NUM + time_bins)
+        rows = np.concatenate(rows)
+        session_num = len(session_templates)
+        statement_num = np.array([len(templates) for templates in session_templates], dtype=float)
+        # template mix(share of each template in the session)
+        template_mix = sparse.csr_matrix((1 / statement_num[rows], (rows, np.concatenate(template_columns))),
+                                         shape=(session_num, template_num))
+        # duration(log scale) and start time of the session, scaled to [0, 1]
+        durations = np.log1p([times[-1] - times[0] for times in session_times])
+        start_times = np.array([(times[0] - first_time) / time_range for times in session_times])
+        durations = durations / durations.max() if durations.max() > 0 else durations
+        self._features = sparse.hstack([template_mix, sparse.csr_matrix(np.column_stack([durations, start_times]))],
+                                       format='csr')
+        self._distributions = sparse.csr_matrix((np.ones(len(rows)), (rows, np.concatenate(distribution_columns))),
+                                                shape=(session_num, template_num * TIME_BIN_NUM))
+        logger.debug("Sessions : {}, Templates : {}".format(session_num, template_num))
+
+    def _get_template_id(self, transaction, index):
+        statement = transaction.statement[index]
+        # the statements of a normalized workload are already templates
+        template = statement if transaction.parameters is not None else normalize_statement(statement)[0]
+        return self._template_ids.setdefault(template, len(self._template_ids))
+
+    def _get_representatives(self, cluster_num):
+        kmeans = KMeans(n_clusters=cluster_num, n_init=1, random_state=self.seed)
+        labels = kmeans.fit_predict(self._features, sample_weight=self.weights)
+        representatives = []
+        sorted_indexes = np.argsort(labels, kind='stable')
+        cluster_starts = np.flatnonzero(np.diff(labels[sorted_indexes], prepend=-1))
+        for members in np.split(sorted_indexes, cluster_starts[1:]):
+            # the member nearest to the cluster center
+            center = kmeans.cluster_centers_[labels[members[0]]]
+            distances = np.asarray(np.square(self._features[members].toarray() - center).sum(axis=1)).ravel()
+            representatives.append((int(members[np.argmin(distances)]), float(self.weights[members].sum())))
+        return representatives
+
+    def _get_error(self, representatives):
+        """
+        total variation distance between the template time distributions of the original and reduced workload
+        """
+        original = self._distributions.T.dot(self.weights)
+        indexes = [index for index, _ in representatives]
+        reduced = self._distributions[indexes].T.dot(np.array([weight for _, weight in representatives]))
+        return float(np.abs(original / original.sum() - reduced / reduced.sum()).sum() / 2)
@@ -1,7 +1,9 @@
 import time
 import datetime
 from logging import getLogger
+from distutils.util import strtobool
 from pgopttune.log.pg_csv_log import PostgresCsvLog
+from pgopttune.log.pg_wire_proxy import PostgresWireProxy
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 from pgopttune.config.workload_sampling_config import WorkloadSamplingConfig
 from pgopttune.workload.sampled_workload import SampledWorkload
@@ -15,11 +17,32 @@ class WorkloadSampler:
                  workload_sampling_config: WorkloadSamplingConfig):
         self.postgres_server_config = postgres_server_config
         self.workload_sampling_config = workload_sampling_config
-        self.csv_log = PostgresCsvLog(postgres_server_config)
+        self.csv_log = None
+        if workload_sampling_config.capture_backend == 'proxy':
+            # the statements are recorded by the proxy(the PostgreSQL log settings are not changed)
+            self.sample_rate = 1.0
+        elif workload_sampling_config.capture_backend != 'csvlog':
+            raise NotImplementedError('The specified capture backend {} is not supported.'
+                                      .format(workload_sampling_config.capture_backend))
+        elif workload_sampling_config.capture_mode == 'full':
+            self.sample_rate = 1.0  # fraction of the captured transactions
+            self.csv_log = PostgresCsvLog(postgres_server_config)
+        elif workload_sampling_config.capture_mode == 'sampled':
+            self.sample_rate = workload_sampling_config.transaction_sample_rate
+            if not 0 < self.sample_rate <= 1:
+                raise ValueError('transaction_sample_rate must be greater than 0 and less than or equal to 1. '
+                                 'transaction_sample_rate = {}'.format(self.sample_rate))
+            self.csv_log = PostgresCsvLog(postgres_server_config, transaction_sample_rate=self.sample_rate)
+        else:
+            raise NotImplementedError('The specified capture mode {} is not supported.'
+                                      .format(workload_sampling_config.capture_mode))
 
     def save(self):
+        if self.csv_log is None:
+            return self._save_with_proxy()
         logger.info("Start recording the executed SQL in the log file.")
         logger.info("Sampling time : {} s".format(self.workload_sampling_config.workload_sampling_time_second))
+        logger.info("Sample rate of transactions : {}".format(self.sample_rate))
         self.csv_log.enable()  # enable csv log
         csv_log_start_time = time.time()
         logger.info("Sampling start time : {}".format(datetime.datetime.fromtimestamp(csv_log_start_time)))
@@ -28,13 +51,49 @@ class WorkloadSampler:
         logger.info("Sampling Stop time : {}".format(datetime.datetime.fromtimestamp(csv_log_end_time)))
         logger.info("Stop recording the executed SQL in the log file.")
         self.csv_log.disable()  # end csv log
-        logger.debug("Start importing the CSV file(saved executed SQL) into the table.")
-        self.csv_log.load_csv_to_database(copy_dir=self.workload_sampling_config.my_workload_save_dir,
-                                          dsn=self.workload_sampling_config.dsn)
-        workload = SampledWorkload(start_unix_time=csv_log_start_time, end_unix_time=csv_log_end_time,
-                                      postgres_server_config=self.postgres_server_config,
-                                      workload_sampling_config=self.workload_sampling_config)
-        save_file = workload.save_sampled_workload()
+        if self.workload_sampling_config.csv_log_parser == 'local':
+            # parse the csv log file on localhost(no staging database)
+            if self.workload_sampling_config.csv_log_transfer == 'copy':
+                logger.debug("Start copying the CSV file(saved executed SQL) to localhost.")
+                self.csv_log.copy_csv_log_to_local(copy_dir=self.workload_sampling_config.my_workload_save_dir)
+            elif self.workload_sampling_config.csv_log_transfer != 'stream':
+                raise NotImplementedError('The specified csv log transfer {} is not supported.'
+                                          .format(self.workload_sampling_config.csv_log_transfer))
+            csv_log = self.csv_log
+        elif self.workload_sampling_config.csv_log_parser == 'database':
+            logger.debug("Start importing the CSV file(saved executed SQL) into the table.")
+            self.csv_log.load_csv_to_database(copy_dir=self.workload_sampling_config.my_workload_save_dir,
+                                              dsn=self.workload_sampling_config.dsn)
+            csv_log = None
+        else:
+            raise NotImplementedError('The specified csv log parser {} is not supported.'
+                                      .format(self.workload_sampling_config.csv_log_parser))
+        save_file = SampledWorkload.extract_and_save_sampled_workload(
+            self.postgres_server_config, self.workload_sampling_config,
+            start_unix_time=csv_log_start_time, end_unix_time=csv_log_end_time,
+            save_format=self.workload_sampling_config.save_format,
+            compression=self.workload_sampling_config.compression, csv_log=csv_log, sample_rate=self.sample_rate)
+        logger.info("The workload has been recorded in '{}'".format(save_file))
+        return save_file
+
+    def _save_with_proxy(self):
+        if self.workload_sampling_config.save_format != 'columnar':
+            raise ValueError('The recording proxy saves the workload in the columnar format. '
+                             'Please set save_format = columnar in postgres_opttune.conf')
+        sampling_time_second = self.workload_sampling_config.workload_sampling_time_second
+        start_time = time.time()
+        save_file = SampledWorkload.get_save_file_path(start_time, start_time + sampling_time_second,
+                                                       save_format='columnar')
+        proxy = PostgresWireProxy(self.workload_sampling_config.proxy_listen_host,
+                                  self.workload_sampling_config.proxy_listen_port,
+                                  self.postgres_server_config.host, int(self.postgres_server_config.port),
+                                  save_file, database=self.postgres_server_config.database,
+                                  normalize=strtobool(self.workload_sampling_config.normalize_statements),
+                                  compression=self.workload_sampling_config.compression)
+        logger.info("Start recording the executed SQL through the proxy. Connect the clients to {}:{}".format(
+            self.workload_sampling_config.proxy_listen_host, self.workload_sampling_config.proxy_listen_port))
+        logger.info("Sampling time : {} s".format(sampling_time_second))
+        proxy.record(sampling_time_second)
         logger.info("The workload has been recorded in '{}'".format(save_file))
         return save_file
 
@@ -0,0 +1,73 @@
+import os
+import logging
+from logging import config
+from distutils.util import strtobool
+from pgopttune.utils.logger import logging_dict
+from pgopttune.config.postgres_server_config import PostgresServerConfig
+from pgopttune.config.tune_config import TuneConfig
+from pgopttune.config.workload_sampling_config import WorkloadSamplingConfig
+from pgopttune.workload.sampled_workload import SampledWorkload
+from pgopttune.workload.sampled_workload_file import FILE_EXTENSION
+from pgopttune.workload.workload_reducer import WorkloadReducer
+
+
+def main(
+        load_file_path,
+        save_file_path=None,
+        reduction_ratio=0.1,
+        max_error=0.05,
+        time_scale=None,
+        seed=0,
+        conf_path='./conf/postgres_opttune.conf'
+):
+    # read setting parameters
+    postgres_server_config = PostgresServerConfig(conf_path)  # PostgreSQL Server config
+    tune_config = TuneConfig(conf_path)  # Tuning config(only use debug parameter)
+    workload_sampling_config = WorkloadSamplingConfig(conf_path)  # Workload Sampling Config(only use compression)
+
+    # logging
+    logging.config.dictConfig(logging_dict(debug=strtobool(tune_config.debug)))
+    logger = logging.getLogger(__name__)
+
+    # workload reduction
+    workload = SampledWorkload.load_sampled_workload(load_file_path, postgres_server_config=postgres_server_config)
+    if save_file_path is None:
+        save_file_path = os.path.splitext(load_file_path.rstrip(os.sep))[0] + "-reduced" + FILE_EXTENSION
+    workload_reducer = WorkloadReducer(workload.my_transactions, reduction_ratio=reduction_ratio,
+                                       max_error=max_error, seed=seed)
+    workload_reducer.reduce()
+    workload_reducer.save(save_file_path, workload.start_unix_time, workload.end_unix_time,
+                          database=postgres_server_config.database, sample_rate=workload.sample_rate,
+                          compression=workload_sampling_config.compression, time_scale=time_scale,
+                          source=load_file_path)
+    logger.info("Workload reduction is complete.\n"
+                "Workload save file: {}".format(save_file_path))
+    logger.info(
+        "You can automatically tune the reduced workload by setting the following in'./conf/postgres_opttune.conf'.\n"
+        "[turning]\n"
+        "benchmark = sampled_workload \n"
+        ":\n"
+        "[sampled-workload]\n"
+        "sampled_workload_save_file = {}".format(save_file_path))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reduce the sampled workload to weighted representative sessions.',
+                                     usage='%(prog)s [options] sampled_workload_save_file')
+    parser.add_argument('sampled_workload_save_file', type=str, help='sampled workload save file path')
+    parser.add_argument('-o', '--output', type=str, default=None,
+                        help='reduced workload save file path(default : <sampled_workload_save_file>-reduced.sampled)')
+    parser.add_argument('-r', '--reduction_ratio', type=float, default=0.1,
+                        help='initial ratio of the representative sessions to all sessions')
+    parser.add_argument('-e', '--max_error', type=float, default=0.05,
+                        help='max error(total variation distance) of the template time distribution')
+    parser.add_argument('-t', '--time_scale', type=float, default=None,
+                        help='scale of the session start times(default : ratio of the representative sessions)')
+    parser.add_argument('-s', '--seed', type=int, default=0, help='random seed of the clustering')
+    parser.add_argument('-f', '--config_path', type=str, default='./conf/postgres_opttune.conf',
+                        help='postgres opttune conf file path')
+    args = parser.parse_args()
+    main(args.sampled_workload_save_file, save_file_path=args.output, reduction_ratio=args.reduction_ratio,
+         max_error=args.max_error, time_scale=args.time_scale, seed=args.seed, conf_path=args.config_path)
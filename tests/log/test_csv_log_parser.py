@@ -0,0 +1,52 @@
+import os
+import datetime
+import pytest
+
+from pgopttune.log.csv_log_parser import read_csv_log_statements, parse_parameters_detail
+
+CSV_LOG = '''2020-09-13 20:22:09.100 JST,"postgres","tpcc",1234,"[local]",5f5e0a1b.1a2b,1,"SELECT",2020-09-13 20:22:00 JST,3/1,0,LOG,00000,"duration: 0.100 ms  statement: SELECT 1",,,,,,,,,"psql"
+2020-09-13 20:22:09.200 JST,"postgres","tpcc",1234,"[local]",5f5e0a1b.1a2b,2,"SELECT",2020-09-13 20:22:00 JST,3/2,0,LOG,00000,"duration: 1.5 ms  statement: SELECT 'a,""b""'
+FROM t",,,,,,,,,"psql"
+2020-09-13 20:22:09.150 JST,"postgres","other",1235,"[local]",5f5e0a1b.1a2c,1,"SELECT",2020-09-13 20:22:00 JST,3/1,0,LOG,00000,"duration: 0.100 ms  statement: SELECT 2",,,,,,,,,"psql"
+2020-09-13 20:22:09.050 JST,"postgres","tpcc",1236,"[local]",5f5e0a1a.1a2d,1,"SELECT",2020-09-13 20:22:00 JST,3/1,0,LOG,00000,"duration: 0.100 ms  parse <unnamed>: SELECT 3",,,,,,,,,"psql"
+2020-09-13 20:22:09.050 JST,"postgres","tpcc",1236,"[local]",5f5e0a1a.1a2d,2,"SELECT",2020-09-13 20:22:00 JST,3/1,0,LOG,00000,"duration: 0.100 ms  statement: SELECT 4",,,,,,,,,"psql"
+2020-09-13 20:22:09.300 JST,"postgres","tpcc",1236,"[local]",5f5e0a1a.1a2d,3,"SELECT",2020-09-13 20:22:00 JST,3/1,0,LOG,00000,"duration: 0.200 ms  execute S_1: SELECT $1, $2","parameters: $1 = '1', $2 = NULL",,,,,,,,"psql"
+2020-09-13 20:22:09.050 JST,,,1200,,5f5e0a1a.1000,1,,2020-09-13 20:22:00 JST,,0,LOG,00000,"checkpoint starting: time",,,,,,,,,""
+'''
+
+# 2020-09-13 20:22:09.000 JST
+START_UNIX_TIME = datetime.datetime(2020, 9, 13, 20, 22, 9,
+                                    tzinfo=datetime.timezone(datetime.timedelta(hours=9))).timestamp()
+
+
+@pytest.fixture()
+def csv_log_file_path(tmp_path):
+    csv_log_file_path = os.path.join(str(tmp_path), 'postgresql.csv')
+    with open(csv_log_file_path, 'w') as f:
+        f.write(CSV_LOG)
+    yield csv_log_file_path
+
+
+class TestCsvLogParser:
+    @pytest.mark.parametrize('chunksize', [1, 100000])
+    def test_read_csv_log_statements(self, csv_log_file_path, chunksize):
+        statements = list(read_csv_log_statements(csv_log_file_path, 'tpcc', START_UNIX_TIME, START_UNIX_TIME + 10,
+                                                  log_timezone='Asia/Tokyo', chunksize=chunksize))
+        # ordered by session_id, session_line_num(other databases, parse messages and other logs are excluded)
+        assert statements == [
+            (datetime.timedelta(microseconds=49900), '5f5e0a1a.1a2d', 'SELECT 4', ''),
+            (datetime.timedelta(microseconds=299800), '5f5e0a1a.1a2d', 'SELECT $1, $2', "parameters: $1 = '1', $2 = NULL"),
+            (datetime.timedelta(microseconds=99900), '5f5e0a1b.1a2b', 'SELECT 1', ''),
+            (datetime.timedelta(microseconds=198500), '5f5e0a1b.1a2b', 'SELECT \'a,"b"\'\nFROM t', '')]
+
+    def test_read_csv_log_statements_time_range(self, csv_log_file_path):
+        statements = list(read_csv_log_statements(csv_log_file_path, 'tpcc', START_UNIX_TIME + 0.1, START_UNIX_TIME + 10,
+                                                  log_timezone='Asia/Tokyo'))
+        assert [statement for _, _, statement, _ in statements] == ['SELECT $1, $2', 'SELECT \'a,"b"\'\nFROM t']
+
+    def test_parse_parameters_detail(self):
+        assert parse_parameters_detail("parameters: $1 = '1', $2 = NULL, $3 = 'a, $4 = ''b'''") == \
+            ["'1'", 'NULL', "'a, $4 = ''b'''"]
+        assert parse_parameters_detail("parameters: $2 = '2'") == ['NULL', "'2'"]
+        assert parse_parameters_detail('') == []
+        assert parse_parameters_detail('Key (id)=(1) already exists.') == []
@@ -0,0 +1,54 @@
+import struct
+import pytest
+
+from pgopttune.log.pg_protocol import MessageBuffer, ProtocolError, build_message, parse_startup_message, \
+    parse_bind, to_sql_literal, PROTOCOL_VERSION, SSL_REQUEST_CODE
+
+
+def startup_message(**parameters):
+    payload = struct.pack('!i', PROTOCOL_VERSION)
+    for name, value in parameters.items():
+        payload += name.encode() + b'\x00' + value.encode() + b'\x00'
+    return build_message(None, payload + b'\x00')
+
+
+class TestPgProtocol:
+    def test_message_buffer_split(self):
+        data = build_message(None, struct.pack('!i', SSL_REQUEST_CODE)) + startup_message(user='postgres') + \
+               build_message('Q', b'SELECT 1\x00')
+        message_buffer = MessageBuffer(startup=True)
+        messages = []
+        for index in range(len(data)):  # feed one byte at a time
+            messages.extend(message_buffer.feed(data[index:index + 1]))
+        assert [message_type for message_type, _ in messages] == [None, None, 'Q']
+        assert parse_startup_message(messages[1][1]) == (PROTOCOL_VERSION, {'user': 'postgres'})
+        assert messages[2][1] == b'SELECT 1\x00'
+
+    def test_message_buffer_skip(self):
+        data = build_message('D', b'x' * 100) + build_message('Z', b'I')
+        message_buffer = MessageBuffer(message_types={'Z'})
+        assert message_buffer.feed(data[:10]) == []
+        assert message_buffer.feed(data[10:]) == [('Z', b'I')]
+
+    def test_message_buffer_invalid_length(self):
+        with pytest.raises(ProtocolError):
+            MessageBuffer().feed(b'Q' + struct.pack('!i', 1))
+
+    def test_parse_bind(self):
+        payload = b'portal\x00stmt\x00' + struct.pack('!hh', 1, 1) + struct.pack('!h', 2) + \
+                  struct.pack('!i', 4) + struct.pack('!i', 5) + struct.pack('!i', -1) + struct.pack('!h', 0)
+        assert parse_bind(payload) == ('portal', 'stmt', [1, 1], [struct.pack('!i', 5), None])
+
+    @pytest.mark.parametrize('value, format_code, type_oid, literal', [
+        (b"it's", 0, 0, "'it''s'"),
+        (None, 0, 0, 'NULL'),
+        (struct.pack('!i', -5), 1, 23, '-5'),
+        (struct.pack('!q', 3000000000), 1, 20, '3000000000'),
+        (b'\x01', 1, 16, 'true'),
+    ])
+    def test_to_sql_literal(self, value, format_code, type_oid, literal):
+        assert to_sql_literal(value, format_code, type_oid) == literal
+
+    def test_to_sql_literal_unsupported_type(self):
+        with pytest.raises(ProtocolError):
+            to_sql_literal(b'\x00', 1, 1700)  # numeric
@@ -0,0 +1,139 @@
+import os
+import shutil
+import struct
+import asyncio
+import subprocess
+import psycopg2
+import pytest
+
+from pgopttune.log.pg_protocol import MessageBuffer, build_message, PROTOCOL_VERSION, SSL_REQUEST_CODE
+from pgopttune.log.pg_wire_proxy import PostgresWireProxy
+from pgopttune.workload.sampled_workload_file import SampledWorkloadReader
+
+READY_FOR_QUERY = build_message('Z', b'I')
+
+
+async def fake_postgres(reader, writer):
+    # answers the messages like PostgreSQL(no result rows)
+    message_buffer = MessageBuffer(startup=True)
+    while True:
+        data = await reader.read(65536)
+        if not data:
+            break
+        for message_type, payload in message_buffer.feed(data):
+            if message_type is None:
+                writer.write(build_message('R', struct.pack('!i', 0)) + READY_FOR_QUERY)
+            elif message_type == 'Q':
+                writer.write(build_message('C', b'SELECT 1\x00') + READY_FOR_QUERY)
+            elif message_type == 'D':
+                writer.write(build_message('t', struct.pack('!hi', 1, 23)) + build_message('n', b''))
+            elif message_type == 'S':
+                writer.write(READY_FOR_QUERY)
+        await writer.drain()
+    writer.close()
+
+
+async def read_until_ready(reader):
+    message_buffer = MessageBuffer()
+    while True:
+        for message_type, _ in message_buffer.feed(await reader.read(65536)):
+            if message_type == 'Z':
+                return
+
+
+async def client(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(build_message(None, struct.pack('!i', SSL_REQUEST_CODE)))
+    assert await reader.readexactly(1) == b'N'
+    writer.write(build_message(None, struct.pack('!i', PROTOCOL_VERSION) +
+                               b'user\x00postgres\x00database\x00tpcc\x00\x00'))
+    await read_until_ready(reader)
+    writer.write(build_message('Q', b'SELECT 1\x00'))
+    await read_until_ready(reader)
+    # extended query protocol(the parameter type is described by the server, the value is sent in binary)
+    writer.write(build_message('P', b'\x00SELECT * FROM test WHERE id = $1\x00' + struct.pack('!h', 0)) +
+                 build_message('D', b'S\x00') + build_message('S', b''))
+    await read_until_ready(reader)
+    writer.write(build_message('B', b'\x00\x00' + struct.pack('!hhhi', 1, 1, 1, 4) + struct.pack('!ih', 5, 0)) +
+                 build_message('E', b'\x00' + struct.pack('!i', 0)) + build_message('S', b''))
+    await read_until_ready(reader)
+    writer.write(build_message('X', b''))
+    writer.close()
+
+
+async def record(save_file_path):
+    server = await asyncio.start_server(fake_postgres, '127.0.0.1', 0)
+    server_port = server.sockets[0].getsockname()[1]
+    proxy = PostgresWireProxy('127.0.0.1', 0, '127.0.0.1', server_port, save_file_path, database='tpcc')
+    await proxy.start()
+    await client(proxy._server.sockets[0].getsockname()[1])
+    await asyncio.sleep(0.1)
+    await proxy.stop()
+    server.close()
+
+
+class TestPostgresWireProxy:
+    def test_record(self, tmp_path):
+        save_file_path = os.path.join(str(tmp_path), 'test.sampled')
+        asyncio.run(record(save_file_path))
+        transaction, = SampledWorkloadReader(save_file_path)
+        assert transaction.statement == ['SELECT 1', 'SELECT * FROM test WHERE id = $1']
+        assert transaction.parameters == [[], ['5']]
+        assert transaction.query_start_time[0] <= transaction.query_start_time[1]
+
+
+# integration test with PostgreSQL(connection settings : PGHOST, PGPORT, PGUSER, PGPASSWORD and PGDATABASE)
+SERVER_HOST = os.environ.get('PGHOST', 'localhost') if not os.environ.get('PGHOST', '').startswith('/') \
+    else 'localhost'  # the proxy connects to PostgreSQL using TCP
+SERVER_PORT = int(os.environ.get('PGPORT', 5432))
+SERVER_CONNECTION_PARAMS = {'user': os.environ.get('PGUSER', 'postgres'),
+                            'password': os.environ.get('PGPASSWORD', 'postgres'),
+                            'dbname': os.environ.get('PGDATABASE', 'postgres'),
+                            'sslmode': 'disable', 'connect_timeout': 3}
+
+
+@pytest.fixture(scope='module')
+def postgres_server():
+    try:
+        psycopg2.connect(host=SERVER_HOST, port=SERVER_PORT, **SERVER_CONNECTION_PARAMS).close()
+    except psycopg2.OperationalError as e:
+        pytest.skip('PostgreSQL is not reachable. {}'.format(e))
+
+
+def run_clients(proxy_port):
+    conn = psycopg2.connect(host='127.0.0.1', port=proxy_port, **SERVER_CONNECTION_PARAMS)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT 1')
+            cur.execute('SELECT %s::int', (5,))
+        conn.commit()
+    finally:
+        conn.close()
+    if shutil.which('psql') is not None:
+        subprocess.run(['psql', '-X', '-h', '127.0.0.1', '-p', str(proxy_port), '-U', SERVER_CONNECTION_PARAMS['user'],
+                        '-d', SERVER_CONNECTION_PARAMS['dbname'], '-c', 'SELECT 2'], check=True,
+                       stdout=subprocess.DEVNULL,
+                       env=dict(os.environ, PGPASSWORD=SERVER_CONNECTION_PARAMS['password'], PGSSLMODE='disable'))
+
+
+async def record_clients(save_file_path, client_function):
+    proxy = PostgresWireProxy('127.0.0.1', 0, SERVER_HOST, SERVER_PORT, save_file_path,
+                              database=SERVER_CONNECTION_PARAMS['dbname'])
+    await proxy.start()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, client_function,
+                                                         proxy._server.sockets[0].getsockname()[1])
+        await asyncio.sleep(0.1)
+    finally:
+        await proxy.stop()
+
+
+class TestPostgresWireProxyIntegration:
+    def test_record_postgres(self, postgres_server, tmp_path):
+        save_file_path = os.path.join(str(tmp_path), 'postgres.sampled')
+        asyncio.run(record_clients(save_file_path, run_clients))
+        transactions = list(SampledWorkloadReader(save_file_path))
+        # psycopg2 sends the parameters in the query string(simple query protocol)
+        assert transactions[0].statement == ['BEGIN', 'SELECT 1', 'SELECT 5::int', 'COMMIT']
+        if shutil.which('psql') is not None:
+            assert transactions[1].statement == ['SELECT 2']
@@ -0,0 +1,32 @@
+import os
+
+from pgopttune.reset.dump_reset import get_pg_dump_command, get_pg_restore_commands, get_drop_database_sqls, \
+    get_dump_usages
+
+
+class TestDumpReset:
+    def test_pg_dump_command(self):
+        assert get_pg_dump_command('/usr/pgsql-12/bin', './dump/tpcc', 'tpcc', jobs=4) == \
+            '/usr/pgsql-12/bin/pg_dump -Fd -j 4 -f ./dump/tpcc tpcc'
+
+    def test_pg_restore_commands(self):
+        commands = get_pg_restore_commands('/usr/pgsql-12/bin', './dump/tpcc', 'tpcc', jobs=4)
+        assert [phase for phase, _ in commands] == ['pre_data', 'data', 'post_data']
+        assert commands[0][1] == '/usr/pgsql-12/bin/pg_restore --section=pre-data -d tpcc ./dump/tpcc'
+        # the rows and the indexes are restored in parallel
+        assert commands[2][1] == '/usr/pgsql-12/bin/pg_restore --section=post-data -j 4 -d tpcc ./dump/tpcc'
+
+    def test_drop_database_sqls(self):
+        assert get_drop_database_sqls('tpcc', 130002) == ['DROP DATABASE IF EXISTS "tpcc" WITH (FORCE)']
+        sqls = get_drop_database_sqls('tpcc', 120004)
+        assert len(sqls) == 2 and 'pg_terminate_backend' in sqls[0]
+
+    def test_dump_usages(self, tmp_path):
+        for dump_name, size in (('pgbench_backup_a', 10), ('pgbench_backup_b', 20)):
+            os.makedirs(os.path.join(str(tmp_path), dump_name))
+            with open(os.path.join(str(tmp_path), dump_name, 'toc.dat'), 'wb') as f:
+                f.write(b'0' * size)
+        os.makedirs(os.path.join(str(tmp_path), 'incomplete_dump'))  # toc.dat is not written yet
+        dumps = sorted(get_dump_usages(str(tmp_path)))
+        assert [(dump_name, size) for dump_name, size, _ in dumps] == [('pgbench_backup_a', 10),
+                                                                       ('pgbench_backup_b', 20)]
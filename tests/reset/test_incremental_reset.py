@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from pgopttune.reset.incremental_reset import get_changed_tables
+
+STATS_RESET = datetime(2020, 9, 13, 20, 0, 0)
+
+
+def get_stats(tables, stats_reset=STATS_RESET):
+    return {'tables': tables, 'stats_reset': stats_reset}
+
+
+class TestIncrementalReset:
+    def test_changed_tables(self):
+        baseline_stats = get_stats({'public.a': (100, 16385), 'public.b': (0, 16386), 'public.c': (5, 16387)})
+        assert get_changed_tables(baseline_stats, get_stats({'public.a': (120, 16385), 'public.b': (0, 16386),
+                                                             'public.c': (6, 16387)})) == ['public.a', 'public.c']
+        # read only
+        assert get_changed_tables(baseline_stats, baseline_stats) == []
+
+    def test_truncated_tables(self):
+        # TRUNCATE does not count the deleted rows, but creates a new relation file
+        baseline_stats = get_stats({'public.a': (100, 16385), 'public.b': (0, 16386)})
+        assert get_changed_tables(baseline_stats, get_stats({'public.a': (100, 16390), 'public.b': (0, 16386)})) == \
+            ['public.a']
+
+    def test_unknown_changed_tables(self):
+        baseline_stats = get_stats({'public.a': (100, 16385), 'public.b': (0, 16386)})
+        assert get_changed_tables(None, baseline_stats) is None
+        assert get_changed_tables(baseline_stats, get_stats({'public.a': (100, 16385), 'public.b': (0, 16386)},
+                                                            stats_reset=datetime(2020, 9, 14))) is None
+        assert get_changed_tables(baseline_stats, get_stats({'public.a': (100, 16385)})) is None
+        assert get_changed_tables(baseline_stats, get_stats({'public.a': (10, 16385), 'public.b': (0, 16386)})) is None
@@ -0,0 +1,55 @@
+import pytest
+
+from pgopttune.reset.snapshot_reset import get_save_snapshot_command, get_restore_snapshot_command, \
+    get_delete_snapshot_command, parse_snapshot_list, parse_zfs_dataset, is_database_url_on_cluster, \
+    is_latest_zfs_snapshot
+
+PGDATA = '/var/lib/pgsql/12/data'
+SNAPSHOT_PATH = '/var/lib/pgsql/12/snapshot/5432/my_workload_backup_0123456789abcdef'
+
+
+class TestSnapshotReset:
+    def test_snapshot_command(self):
+        assert get_save_snapshot_command('zfs', PGDATA, SNAPSHOT_PATH, zfs_dataset='tank/pgdata') == \
+            'zfs snapshot tank/pgdata@my_workload_backup_0123456789abcdef'
+        assert get_restore_snapshot_command('zfs', PGDATA, SNAPSHOT_PATH, zfs_dataset='tank/pgdata') == \
+            'zfs rollback tank/pgdata@my_workload_backup_0123456789abcdef'
+        # the newer snapshots are not destroyed
+        assert get_restore_snapshot_command('zfs', PGDATA, SNAPSHOT_PATH, zfs_dataset='tank/pgdata',
+                                            zfs_latest=False) == \
+            'rsync -a --delete --exclude=/.zfs {0}/.zfs/snapshot/my_workload_backup_0123456789abcdef/ {0}/' \
+            .format(PGDATA)
+        assert get_save_snapshot_command('reflink', PGDATA, SNAPSHOT_PATH) == \
+            'mkdir -p {1} && cp -a --reflink=always {0}/. {1}/'.format(PGDATA, SNAPSHOT_PATH)
+        # the files of the snapshot are copied to PGDATA
+        assert get_restore_snapshot_command('rsync', PGDATA, SNAPSHOT_PATH) == \
+            'rsync -a --delete {1}/ {0}/'.format(PGDATA, SNAPSHOT_PATH)
+        assert "'/data dir'" in get_restore_snapshot_command('btrfs', '/data dir', SNAPSHOT_PATH)
+        with pytest.raises(NotImplementedError):
+            get_save_snapshot_command('lvm', PGDATA, SNAPSHOT_PATH)
+
+    def test_zfs_dataset(self):
+        assert parse_zfs_dataset('tank/pgdata\t/var/lib/pgsql/12/data\n', PGDATA + '/') == 'tank/pgdata'
+        # PGDATA is not the mount point of the dataset
+        assert parse_zfs_dataset('tank/var\t/var\n', PGDATA) is None
+
+    def test_delete_snapshot_command(self):
+        assert get_delete_snapshot_command('zfs', SNAPSHOT_PATH, zfs_dataset='tank/pgdata') == \
+            'zfs destroy tank/pgdata@my_workload_backup_0123456789abcdef'
+        assert get_delete_snapshot_command('rsync', SNAPSHOT_PATH) == 'rm -rf {}'.format(SNAPSHOT_PATH)
+
+    def test_snapshot_list(self):
+        output = 'pgbench_backup_a 1700000000 1024\n' \
+                 'pgbench_backup_b 1700000100 \n'  # deleted by hand(no size)
+        assert parse_snapshot_list(output) == [('pgbench_backup_a', 1024, 1700000000)]
+
+    def test_database_url_on_cluster(self):
+        assert is_database_url_on_cluster('postgresql://postgres@localhost/study_history', '127.0.0.1', '5432')
+        assert is_database_url_on_cluster('postgresql+psycopg2://postgres@db01:5433/history', 'db01', '5433')
+        assert not is_database_url_on_cluster('postgresql://postgres@localhost:5433/history', 'localhost', '5432')
+        assert not is_database_url_on_cluster('sqlite:///study-history.db', 'localhost', '5432')
+
+    def test_latest_zfs_snapshot(self):
+        output = 'tank/pgdata@pgbench_backup_a\ntank/pgdata@pgbench_backup_b\n'
+        assert is_latest_zfs_snapshot(output, 'tank/pgdata', 'pgbench_backup_b')
+        assert not is_latest_zfs_snapshot(output, 'tank/pgdata', 'pgbench_backup_a')
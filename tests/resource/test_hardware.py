@@ -39,6 +39,19 @@ class TestHardwareResource:
     def test_swap_size(self, resource, mem_info):
         assert resource.swap_size == mem_info['SwapTotal'] * 1024
 
+    def test_split(self, resource):
+        resource.cpu_count = 8
+        hardware_slices = resource.split(2)
+        assert len(hardware_slices) == 2
+        assert [hardware_slice.cpu_set for hardware_slice in hardware_slices] == ['0-3', '4-7']
+        for hardware_slice in hardware_slices:
+            assert hardware_slice.cpu_count == 4
+            assert hardware_slice.memory_size == resource.memory_size // 2
+
+    def test_split_exceeds_cpu_count(self, resource):
+        with pytest.raises(ValueError):
+            resource.split(resource.cpu_count + 1)
+
 
 class TestRemoteHardwareResource:
     def test_remote_cpu_count(self, remote_resource):
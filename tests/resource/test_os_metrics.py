@@ -0,0 +1,59 @@
+import pytest
+
+from pgopttune.resource.os_metrics import parse_proc_stat, parse_meminfo, parse_diskstats, parse_proc_files, \
+    split_remote_sample, get_os_metrics, SAMPLE_SEPARATOR
+
+PROC_STAT = '''cpu  100 0 50 800 50 0 0 0 0 0
+cpu0 50 0 25 400 25 0 0 0 0 0
+intr 12345
+'''
+MEMINFO = '''MemTotal:        8000000 kB
+MemFree:         4000000 kB
+Cached:          1000000 kB
+Dirty:               200 kB
+Writeback:             0 kB
+'''
+DISKSTATS = '''   7       0 loop0 100 0 1000 0 0 0 0 0 0 0 0
+   8       0 sda 100 0 2000 10 50 0 4000 20 0 30 30
+   8       1 sda1 100 0 2000 10 50 0 4000 20 0 30 30
+ 259       0 nvme0n1 10 0 100 1 5 0 200 2 0 3 3
+ 259       1 nvme0n1p1 10 0 100 1 5 0 200 2 0 3 3
+ 253       0 dm-0 100 0 2000 10 50 0 4000 20 0 30 30
+'''
+
+
+class TestOsMetrics:
+    def test_parse_proc_stat(self):
+        assert parse_proc_stat(PROC_STAT) == {'user': 100, 'nice': 0, 'system': 50, 'idle': 800, 'iowait': 50,
+                                              'irq': 0, 'softirq': 0, 'steal': 0}
+        with pytest.raises(ValueError):
+            parse_proc_stat('intr 12345\n')
+
+    def test_parse_meminfo(self):
+        assert parse_meminfo(MEMINFO) == {'MemFree': 4000000, 'Cached': 1000000, 'Dirty': 200, 'Writeback': 0}
+
+    def test_parse_diskstats(self):
+        # loop and device-mapper devices and partitions are not counted
+        assert parse_diskstats(DISKSTATS) == {'read_bytes': 2100 * 512, 'write_bytes': 4200 * 512}
+
+    def test_split_proc_sample(self):
+        text = ''.join('{} {}\n{}'.format(SAMPLE_SEPARATOR, name, file_text) for name, file_text in
+                       [('uptime', '1000.50 3000.00\n'), ('stat', PROC_STAT), ('meminfo', MEMINFO),
+                        ('diskstats', DISKSTATS)])
+        sample = parse_proc_files(split_remote_sample(text))
+        assert sample['uptime'] == 1000.5
+        assert sample['stat']['user'] == 100
+        assert sample['diskstats']['write_bytes'] == 4200 * 512
+
+    def test_get_os_metrics(self):
+        previous_sample = {'uptime': 1000.0, 'stat': parse_proc_stat(PROC_STAT), 'meminfo': parse_meminfo(MEMINFO),
+                           'diskstats': {'read_bytes': 0, 'write_bytes': 1000}}
+        sample = {'uptime': 1002.0, 'stat': parse_proc_stat(PROC_STAT.replace('cpu  100 0 50 800 50',
+                                                                               'cpu  150 0 60 820 70')),
+                  'meminfo': parse_meminfo(MEMINFO), 'diskstats': {'read_bytes': 2000, 'write_bytes': 5000}}
+        os_metrics = get_os_metrics(previous_sample, sample)
+        assert os_metrics['cpu'] == {'user': 50.0, 'system': 10.0, 'idle': 20.0, 'iowait': 20.0}
+        assert os_metrics['disk'] == {'read_bytes_per_second': 1000, 'write_bytes_per_second': 2000}
+        assert os_metrics['memory']['Dirty'] == 200
+        # the remote host has not printed a new sample
+        assert get_os_metrics(sample, sample) is None
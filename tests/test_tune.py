@@ -1,7 +1,13 @@
+import os
+import csv
 import optuna
 import pytest
 
 from pgopttune.sampler.sampler import get_sampler
+from pgopttune.pruner.pruner import get_pruner
+from pgopttune.study.study import create_study, save_pareto_front
+from pgopttune.objective.objective import Objective, get_objective_directions, is_pruning_supported
+from pgopttune.workload.workload import Workload
 
 
 class TestSampler:
@@ -11,6 +17,7 @@ class TestSampler:
             'RandomSampler': optuna.samplers.RandomSampler,
             'SkoptSampler': optuna.integration.SkoptSampler,
             'CmaEsSampler': optuna.integration.CmaEsSampler,
+            'NSGAIISampler': optuna.samplers.NSGAIISampler,
         }
         for n, expect in expects.items():
             result = get_sampler(n)
@@ -20,3 +27,79 @@ class TestSampler:
         not_support_values = 'test'
         with pytest.raises(NotImplementedError):
             get_sampler(not_support_values)
+
+    def test_get_sampler_multi_objective(self):
+        assert isinstance(get_sampler('NSGAIISampler', multi_objective=True), optuna.samplers.NSGAIISampler)
+        with pytest.raises(ValueError):
+            get_sampler('TPE', multi_objective=True)
+
+
+class TestPruner:
+    def test_get_pruner(self):
+        expects = {
+            'NopPruner': optuna.pruners.NopPruner,
+            'MedianPruner': optuna.pruners.MedianPruner,
+            'PercentilePruner': optuna.pruners.PercentilePruner,
+            'SuccessiveHalvingPruner': optuna.pruners.SuccessiveHalvingPruner,
+            'HyperbandPruner': optuna.pruners.HyperbandPruner,
+        }
+        for n, expect in expects.items():
+            result = get_pruner(n)
+            assert isinstance(result, expect)
+
+    def test_get_pruner_not_support_value(self):
+        not_support_values = 'test'
+        with pytest.raises(NotImplementedError):
+            get_pruner(not_support_values)
+
+    def test_get_pruner_not_supported_objectives(self):
+        assert isinstance(get_pruner('MedianPruner', pruning_supported=False), optuna.pruners.NopPruner)
+
+
+class TestObjectives:
+    def test_get_objective_directions(self):
+        assert get_objective_directions('my_workload', []) == ['maximize']
+        assert get_objective_directions('sampled_workload', ['benchmark', 'p99_latency', 'memory_footprint']) == \
+            ['minimize', 'minimize', 'minimize']
+        with pytest.raises(NotImplementedError):
+            get_objective_directions('my_workload', ['benchmark', 'test'])
+
+    def test_is_pruning_supported(self):
+        assert is_pruning_supported([])
+        assert is_pruning_supported(['benchmark'])
+        assert not is_pruning_supported(['benchmark', 'memory_footprint'])
+        assert not is_pruning_supported(['p99_latency'])
+
+    def test_check_objectives(self):
+        objective = Objective.__new__(Objective)  # the tune parameters are not read
+        objective.workload = Workload(None)  # the latency is not measured
+        objective.objectives = ['benchmark', 'memory_footprint']
+        objective.check_objectives()
+        objective.objectives = ['benchmark', 'p99_latency']
+        with pytest.raises(ValueError):
+            objective.check_objectives()
+
+
+class TestStudy:
+    def test_create_single_objective_study(self):
+        study = create_study(study_name='test_study', sampler=get_sampler('TPE'), directions=['maximize'])
+        assert study.direction == optuna.study.StudyDirection.MAXIMIZE
+
+    def test_save_pareto_front(self, tmp_path):
+        study = create_study(study_name='test_study', sampler=get_sampler('RandomSampler', multi_objective=True),
+                             directions=['maximize', 'minimize'])
+        # (TPS, memory footprint) : trial #1 is dominated by trial #0
+        trial_values = [(100, 512), (90, 1024), (120, 2048)]
+
+        def objective(trial):
+            trial.set_user_attr('trial_conf_path', 'test_study_#{}_postgresql.conf'.format(trial.number))
+            return trial_values[trial.number]
+
+        study.optimize(objective, n_trials=len(trial_values))
+        save_file_path = save_pareto_front(study, ['benchmark', 'memory_footprint'], save_dir=str(tmp_path))
+        assert save_file_path == os.path.join(str(tmp_path), 'test_study_pareto_front.csv')
+        with open(save_file_path) as f:
+            rows = list(csv.reader(f))
+        assert rows == [['trial_number', 'benchmark', 'memory_footprint', 'trial_conf_path'],
+                        ['0', '100.0', '512.0', 'test_study_#0_postgresql.conf'],
+                        ['2', '120.0', '2048.0', 'test_study_#2_postgresql.conf']]
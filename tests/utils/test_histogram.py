@@ -0,0 +1,39 @@
+import pickle
+import pytest
+
+from pgopttune.utils.histogram import LatencyHistogram, get_bucket_index, get_bucket_value, BUCKET_COUNT
+
+
+class TestLatencyHistogram:
+    @pytest.mark.parametrize('value', [0, 1, 127, 128, 129, 1000, 123456, 10 ** 9])
+    def test_bucket_value(self, value):
+        # the middle value of the bucket is within the relative error of the value
+        assert get_bucket_value(get_bucket_index(value)) == pytest.approx(value, rel=1 / 64, abs=0.5)
+
+    def test_bucket_index_range(self):
+        assert get_bucket_index(-1) == 0
+        assert get_bucket_index(2 ** 40) == BUCKET_COUNT - 1
+
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        for millisecond in range(1, 101):
+            histogram.record(millisecond / 1000)
+        assert histogram.count == 100
+        assert histogram.mean == pytest.approx(50.5)
+        assert histogram.percentile(50) == pytest.approx(50, rel=0.02)
+        assert histogram.percentile(99) == pytest.approx(99, rel=0.02)
+        assert histogram.percentile(100) == pytest.approx(100, rel=0.02)
+
+    def test_merge_and_weighted_count(self):
+        histogram = LatencyHistogram()
+        histogram.record(0.001, count=3)
+        other_histogram = pickle.loads(pickle.dumps(LatencyHistogram()))
+        other_histogram.record(0.1)
+        histogram.merge(other_histogram)
+        assert histogram.count == 4
+        assert histogram.percentile(75) == pytest.approx(1, rel=0.02)
+        assert histogram.percentile(99) == pytest.approx(100, rel=0.02)
+
+    def test_empty(self):
+        assert LatencyHistogram().percentile(99) == 0.0
+        assert LatencyHistogram().get_summary()['count'] == 0
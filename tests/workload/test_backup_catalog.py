@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from pgopttune.workload.backup_catalog import get_backup_key, select_evicted_backups, BACKUP_KEY_LENGTH
+
+
+class TestBackupCatalog:
+    def test_backup_key(self):
+        data_definition = {'data_load_command': 'pgbench -i -s 10 tpcc', 'work_directory': 'current_directory'}
+        backup_key = get_backup_key(data_definition, 'tpcc', 120004)
+        assert len(backup_key) == BACKUP_KEY_LENGTH
+        assert backup_key == get_backup_key(dict(reversed(list(data_definition.items()))), 'tpcc', '120004')
+        assert backup_key != get_backup_key(data_definition, 'tpcc', 130000)
+        assert backup_key != get_backup_key(data_definition, 'tpch', 120004)
+        assert backup_key != get_backup_key(dict(data_definition, data_load_command='pgbench -i -s 100 tpcc'),
+                                            'tpcc', 120004)
+
+    def test_select_evicted_backups(self):
+        backups = [('backup_a', 30, datetime(2020, 1, 3)),
+                   ('backup_b', 50, datetime(2020, 1, 1)),
+                   ('backup_c', 40, datetime(1970, 1, 1)),  # legacy backup
+                   ('backup_d', 20, datetime(2020, 1, 2))]
+        assert select_evicted_backups(backups, 200) == []
+        assert select_evicted_backups(backups, 100) == ['backup_c']
+        assert select_evicted_backups(backups, 60) == ['backup_c', 'backup_b']
+        # the backup in use is not dropped
+        assert select_evicted_backups(backups, 60, keep_backup_database='backup_b') == \
+            ['backup_c', 'backup_d', 'backup_a']
+        assert select_evicted_backups(backups, 0, keep_backup_database='backup_a') == \
+            ['backup_c', 'backup_b', 'backup_d']
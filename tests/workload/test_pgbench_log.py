@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+from pgopttune.workload.pgbench_log import parse_progress_line, parse_summary_tps, parse_transaction_log_line, \
+    parse_aggregate_log_line, get_log_file_paths
+
+SUMMARY = """transaction type: <builtin: TPC-B (sort of)>
+scaling factor: 10
+number of clients: 10
+latency average = 6.553 ms
+tps = 1526.010361 (including connections establishing)
+tps = 1526.371035 (excluding connections establishing)
+"""
+
+
+class TestPgbenchLog:
+    def test_progress_line(self):
+        assert parse_progress_line('progress: 5.0 s, 1530.8 tps, lat 6.523 ms stddev 2.052\n') == (5.0, 1530.8, 6.523)
+        # with the schedule lag and the failures(PostgreSQL 15 or later)
+        assert parse_progress_line('progress: 10.0 s, 998.2 tps, lat 9.987 ms stddev 3.101, lag 0.042 ms, 0 failed') \
+            == (10.0, 998.2, 9.987)
+        elapsed, tps, latency = parse_progress_line('progress: 1.0 s, 0.0 tps, lat -nan ms stddev -nan')
+        assert tps == 0.0 and math.isnan(latency)
+        assert parse_progress_line('pgbench: error: client 0 aborted') is None
+
+    def test_summary_tps(self):
+        assert parse_summary_tps(SUMMARY) == 1526.371035
+        assert parse_summary_tps('tps = 1523.180193 (without initial connection time)') == 1523.180193
+        assert parse_summary_tps('number of clients: 10') is None
+
+    def test_transaction_log_line(self):
+        assert parse_transaction_log_line('0 199 2241 0 1175850568 995598') == pytest.approx(0.002241)
+        assert parse_transaction_log_line('3 12 skipped 0 1175850569 12345 9876') is None
+
+    def test_aggregate_log_line(self):
+        values = parse_aggregate_log_line('1345828501 5601 1542744 483552416 61 2573 0')
+        assert values['interval_start'] == 1345828501
+        assert values['num_transactions'] == 5601
+        assert values['max_latency_second'] == pytest.approx(0.002573)
+        with pytest.raises(ValueError):
+            parse_aggregate_log_line('1345828501 5601')
+
+    def test_log_file_paths(self, tmp_path):
+        for name in ('pgbench_log.1234', 'pgbench_log.1234.1', 'other.1234'):
+            (tmp_path / name).write_text('')
+        log_prefix = str(tmp_path / 'pgbench_log')
+        assert get_log_file_paths(log_prefix) == [log_prefix + '.1234', log_prefix + '.1234.1']
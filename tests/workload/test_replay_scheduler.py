@@ -0,0 +1,56 @@
+import time
+import asyncio
+import pytest
+
+from pgopttune.workload.replay_scheduler import DispatchLag, ReplayLagError, ReplayScheduler, sleep_until
+
+
+class TestDispatchLag:
+    def test_add_and_merge(self):
+        dispatch_lag = DispatchLag()
+        dispatch_lag.add(0.001)
+        dispatch_lag.add(0.003)
+        other_dispatch_lag = DispatchLag()
+        other_dispatch_lag.add(0.005)
+        dispatch_lag.merge(other_dispatch_lag)
+        assert dispatch_lag.count == 3
+        assert dispatch_lag.max == 0.005
+        assert dispatch_lag.mean == pytest.approx(0.003)
+
+    def test_exceed_max_lag(self):
+        dispatch_lag = DispatchLag(max_lag_second=0.01)
+        dispatch_lag.add(0.005)
+        with pytest.raises(ReplayLagError):
+            dispatch_lag.add(0.02)
+
+
+class TestSleepUntil:
+    def test_sleep_until(self):
+        deadline = time.perf_counter() + 0.05
+        lag = sleep_until(deadline)
+        assert time.perf_counter() >= deadline
+        assert 0 <= lag < 0.005
+
+    def test_sleep_until_past_deadline(self):
+        assert sleep_until(time.perf_counter() - 0.1) >= 0.1
+
+
+class TestReplayScheduler:
+    def test_dispatch_order(self):
+        dispatch_order = []
+
+        async def session(scheduler, offset_second):
+            await scheduler.wait_until(offset_second)
+            dispatch_order.append(offset_second)
+
+        async def replay():
+            scheduler = ReplayScheduler(time.perf_counter(), DispatchLag())
+            dispatcher = asyncio.ensure_future(scheduler.dispatch())
+            await asyncio.gather(*[session(scheduler, offset_second) for offset_second in [0.03, 0.01, 0.02, 0.0]])
+            dispatcher.cancel()
+            return scheduler.dispatch_lag
+
+        dispatch_lag = asyncio.run(replay())
+        assert dispatch_order == [0.0, 0.01, 0.02, 0.03]
+        assert dispatch_lag.count == 4
+        assert dispatch_lag.max < 0.005
@@ -0,0 +1,38 @@
+import pytest
+
+from pgopttune.workload.replay_statistics import ReplayStatistics
+
+
+@pytest.fixture()
+def statistics():
+    statistics = ReplayStatistics()
+    for _ in range(99):
+        statistics.record('SELECT * FROM a WHERE id = $1', 0.001)
+    statistics.record('SELECT * FROM a WHERE id = $1', 0.5)
+    other_statistics = ReplayStatistics()
+    other_statistics.record('UPDATE b SET c = $1', 0.01, count=2)
+    other_statistics.record_end(12.5)
+    statistics.merge(other_statistics)
+    yield statistics
+
+
+class TestReplayStatistics:
+    def test_objective_value(self, statistics):
+        assert statistics.get_objective_value('total_time', 3.0) == 3.0
+        assert statistics.get_objective_value('makespan', 3.0) == 12.5
+        assert statistics.get_objective_value('p99', 3.0, template_pattern='^SELECT') == pytest.approx(1, rel=0.02)
+        assert statistics.get_objective_value('p99', 3.0, template_pattern='^UPDATE') == pytest.approx(10, rel=0.02)
+
+    def test_objective_value_error(self, statistics):
+        with pytest.raises(ValueError):
+            statistics.get_objective_value('p95', 3.0, template_pattern='^DELETE')
+        with pytest.raises(NotImplementedError):
+            statistics.get_objective_value('tps', 3.0)
+
+    def test_summary(self, statistics):
+        summary = statistics.get_summary()
+        assert summary['latency']['count'] == 102
+        assert summary['makespan_second'] == 12.5
+        # in descending order of total time
+        assert [template_summary['template'] for template_summary in summary['template_latencies']] == \
+            ['SELECT * FROM a WHERE id = $1', 'UPDATE b SET c = $1']
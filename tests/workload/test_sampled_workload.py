@@ -0,0 +1,39 @@
+import datetime
+
+from pgopttune.workload.sampled_workload import SampledWorkload
+
+
+class TestSampledWorkload:
+    def test_group_transactions(self):
+        rows = [(datetime.timedelta(seconds=1), 'session-1', 'BEGIN'),
+                (datetime.timedelta(seconds=2), 'session-1', 'SELECT * FROM test WHERE id = 1'),
+                (datetime.timedelta(seconds=3), 'session-2', 'SELECT * FROM test WHERE id = 2')]
+        transactions = list(SampledWorkload._group_transactions(iter(rows)))
+        assert [transaction.session_id for transaction in transactions] == ['session-1', 'session-2']  # last session
+        assert transactions[0].statement == ['BEGIN', 'SELECT * FROM test WHERE id = 1']
+        assert transactions[1].query_start_time == [datetime.timedelta(seconds=3)]
+        assert transactions[1].parameters is None
+
+    def test_group_transactions_normalize(self):
+        rows = [(datetime.timedelta(seconds=1), 'session-1', 'SELECT * FROM test WHERE id = 1')]
+        transaction, = SampledWorkload._group_transactions(rows, normalize=True)
+        assert transaction.statement == ['SELECT * FROM test WHERE id = $1']
+        assert transaction.parameters == [['1']]
+
+    def test_group_transactions_extended_query_protocol(self):
+        rows = [(datetime.timedelta(seconds=1), 'session-1', 'SELECT * FROM test WHERE id = $1', "parameters: $1 = '1'"),
+                (datetime.timedelta(seconds=2), 'session-1', 'SELECT * FROM test WHERE id = $1', ''),  # not logged
+                (datetime.timedelta(seconds=3), 'session-1', 'SELECT 1', '')]
+        transaction, = SampledWorkload._group_transactions(rows)
+        assert transaction.statement == ['SELECT * FROM test WHERE id = $1', 'SELECT 1']
+        assert transaction.parameters == [["'1'"], []]
+        assert transaction.get_statement(0) == "SELECT * FROM test WHERE id = '1'"
+
+    def test_group_transactions_empty(self):
+        assert list(SampledWorkload._group_transactions([])) == []
+
+    def test_transaction_templates(self):
+        rows = [(datetime.timedelta(seconds=1), 'session-1', 'SELECT * FROM test WHERE id = 1')]
+        transaction, = SampledWorkload._group_transactions(rows)
+        assert transaction.get_templates() == ['SELECT * FROM test WHERE id = $1']
+        assert transaction.get_templates() is transaction.get_templates()  # normalized only once
@@ -0,0 +1,71 @@
+import os
+import pickle
+import datetime
+import pytest
+
+from pgopttune.workload.sampled_transaction import SampledTransaction
+from pgopttune.workload.sampled_workload_file import SampledWorkloadWriter, SampledWorkloadReader
+
+
+@pytest.fixture()
+def transactions():
+    transactions = [
+        SampledTransaction('5f5e0a1b.1a2b', [datetime.timedelta(microseconds=-1500),
+                                             datetime.timedelta(seconds=1, microseconds=250)],
+                           ['SELECT 1', 'SELECT * FROM test WHERE name = \'テスト\'']),
+        SampledTransaction('5f5e0a1b.1a2c', [datetime.timedelta(seconds=2)], ['SELECT 1']),
+        SampledTransaction('5f5e0a1b.1a2d', [datetime.timedelta(seconds=3), datetime.timedelta(seconds=4)],
+                           ['BEGIN', 'COMMIT']),
+    ]
+    yield transactions
+    del transactions
+
+
+def save(path, transactions, compression):
+    with SampledWorkloadWriter(path, compression=compression) as writer:
+        for transaction in transactions:
+            writer.add_transaction(transaction)
+        writer.close(1600000000.0, 1600000030.0, database='test')
+
+
+def assert_transaction_equal(result, expect):
+    assert result.session_id == expect.session_id
+    assert result.query_start_time == expect.query_start_time
+    assert result.statement == expect.statement
+
+
+class TestSampledWorkloadFile:
+    @pytest.mark.parametrize('compression', ['none', 'zstd'])
+    def test_save_and_load(self, tmp_path, transactions, compression):
+        path = os.path.join(str(tmp_path), 'test.sampled')
+        save(path, transactions, compression)
+        reader = SampledWorkloadReader(path)
+        assert reader.meta['start_unix_time'] == 1600000000.0
+        assert reader.meta['string_num'] == 7
+        assert len(reader) == 3
+        assert reader.weights == [1.0, 1.0, 1.0]
+        for result, expect in zip(reader, transactions):
+            assert_transaction_equal(result, expect)
+
+    def test_slice_and_pickle(self, tmp_path, transactions):
+        path = os.path.join(str(tmp_path), 'test.sampled')
+        save(path, transactions, 'none')
+        reader = pickle.loads(pickle.dumps(SampledWorkloadReader(path)[1::2]))
+        assert len(reader) == 1
+        assert_transaction_equal(reader[0], transactions[1])
+
+    def test_not_supported_compression(self, tmp_path):
+        with pytest.raises(ValueError):
+            SampledWorkloadWriter(os.path.join(str(tmp_path), 'test.sampled'), compression='gzip')
+
+    def test_save_and_load_parameters(self, tmp_path):
+        transaction = SampledTransaction('5f5e0a1b.1a2b',
+                                         [datetime.timedelta(seconds=1), datetime.timedelta(seconds=2)],
+                                         ['SELECT * FROM test WHERE id = $1 AND name = $2', 'COMMIT'],
+                                         parameters=[['10', "'test'"], []])
+        path = os.path.join(str(tmp_path), 'test.sampled')
+        save(path, [transaction], 'none')
+        result = SampledWorkloadReader(path)[0]
+        assert_transaction_equal(result, transaction)
+        assert result.parameters == transaction.parameters
+        assert result.get_statement(0) == "SELECT * FROM test WHERE id = 10 AND name = 'test'"
@@ -0,0 +1,30 @@
+import datetime
+
+from pgopttune.workload.sampled_transaction import SampledTransaction
+from pgopttune.workload.scaled_transactions import ScaledUpTransactions, SCALE_UP_JITTER_SECOND
+
+
+def create_transactions(session_num):
+    return [SampledTransaction('session-{}'.format(index), [datetime.timedelta(seconds=index)], ['SELECT 1'])
+            for index in range(session_num)]
+
+
+class TestScaledUpTransactions:
+    def test_scale_up(self):
+        scaled_transactions = ScaledUpTransactions(create_transactions(2), 0.25)
+        assert len(scaled_transactions) == 8
+        assert [transaction.session_id for transaction in scaled_transactions] == ['session-0'] * 4 + ['session-1'] * 4
+        for transaction in scaled_transactions:
+            shift = transaction.query_start_time[0] - datetime.timedelta(seconds=int(transaction.session_id[-1]))
+            assert datetime.timedelta(0) <= shift <= datetime.timedelta(seconds=SCALE_UP_JITTER_SECOND)
+
+    def test_scale_up_fraction(self):
+        # 1 / 0.4 = 2.5 copies on average
+        scaled_transactions = ScaledUpTransactions(create_transactions(1000), 0.4)
+        assert 2400 < len(scaled_transactions) < 2600
+
+    def test_slice(self):
+        scaled_transactions = ScaledUpTransactions(create_transactions(3), 0.5)
+        chunks = [scaled_transactions[index::2] for index in range(2)]
+        assert sorted(transaction.session_id for chunk in chunks for transaction in chunk) == \
+               sorted(transaction.session_id for transaction in scaled_transactions)
@@ -0,0 +1,37 @@
+import pytest
+
+from pgopttune.workload.statement_normalizer import normalize_statement, render_statement, \
+    get_parameter_types, get_prepare_statement, get_execute_statement
+
+
+class TestStatementNormalizer:
+    @pytest.mark.parametrize('statement, template, parameters', [
+        ("SELECT * FROM test WHERE id = 10 AND name = 'a''b'",
+         "SELECT * FROM test WHERE id = $1 AND name = $2", ['10', "'a''b'"]),
+        ("UPDATE pgbench_accounts SET abalance = abalance + -4377 WHERE aid = 1.5e3;",
+         "UPDATE pgbench_accounts SET abalance = abalance + -$1 WHERE aid = $2;", ['4377', '1.5e3']),
+        # column positions, typed literals and type modifiers are not replaced
+        ("SELECT a, count(*) FROM test WHERE d > date '2020-01-01' GROUP BY 1 ORDER BY 2 LIMIT 5",
+         "SELECT a, count(*) FROM test WHERE d > date '2020-01-01' GROUP BY 1 ORDER BY 2 LIMIT $1", ['5']),
+        ("SELECT x::numeric(10, 2), E'\\\\' FROM test",
+         "SELECT x::numeric(10, 2), $1 FROM test", ["E'\\\\'"]),
+        # not normalized
+        ("BEGIN", "BEGIN", []),
+        ("CREATE TABLE test (id int DEFAULT 1)", "CREATE TABLE test (id int DEFAULT 1)", []),
+        ("SELECT 1; SELECT 2", "SELECT 1; SELECT 2", []),
+        ("SELECT * FROM test WHERE id = $1", "SELECT * FROM test WHERE id = $1", []),
+        ("SELECT 'unterminated", "SELECT 'unterminated", []),
+    ])
+    def test_normalize_statement(self, statement, template, parameters):
+        assert normalize_statement(statement) == (template, parameters)
+        assert render_statement(template, parameters) == statement
+
+    def test_get_parameter_types(self):
+        assert get_parameter_types(['1', '3000000000', '99999999999999999999', '1.5', "'1'"]) == \
+               ('integer', 'bigint', 'numeric', 'numeric', 'unknown')
+
+    def test_prepare_and_execute_statement(self):
+        template, parameters = normalize_statement("SELECT * FROM test WHERE id = 10 AND name = 'test';")
+        assert get_prepare_statement('s1', template, get_parameter_types(parameters)) == \
+               'PREPARE s1 (integer, unknown) AS SELECT * FROM test WHERE id = $1 AND name = $2'
+        assert get_execute_statement('s1', parameters) == "EXECUTE s1 (10, 'test')"
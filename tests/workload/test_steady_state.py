@@ -0,0 +1,34 @@
+import pytest
+
+from pgopttune.workload.steady_state import SteadyStateDetector, get_t_value
+
+
+def get_intervals(tps_list, interval_second=10):
+    return [((index + 1) * interval_second, tps) for index, tps in enumerate(tps_list)]
+
+
+class TestSteadyStateDetector:
+    def test_t_value(self):
+        assert get_t_value(9) == 2.262
+        assert get_t_value(50) == 2.021
+        with pytest.raises(ValueError):
+            get_t_value(0)
+
+    def test_steady(self):
+        detector = SteadyStateDetector(warm_up_second=60, tolerance=0.02)
+        # the warm-up intervals are not used
+        tps_list = [100, 500, 800] + [1000, 1010, 990, 1005, 995] * 4
+        assert not detector.check(get_intervals(tps_list[:10]))
+        assert detector.check(get_intervals(tps_list))
+        assert detector.steady
+        assert detector.tps == pytest.approx(1000)
+        assert detector.relative_half_width < 0.02
+
+    def test_not_steady(self):
+        detector = SteadyStateDetector(warm_up_second=0, tolerance=0.02, max_measurement_second=300)
+        tps_list = [1000, 500] * 10
+        assert not detector.check(get_intervals(tps_list[:-1]))
+        assert not detector.steady
+        # stopped at the max measurement time
+        assert detector.check(get_intervals(tps_list + [1000] * 10))
+        assert not detector.steady
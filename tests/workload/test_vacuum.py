@@ -0,0 +1,13 @@
+from pgopttune.workload.vacuum import get_vacuum_target_tables_sql, get_vacuum_sql
+
+
+class TestVacuum:
+    def test_vacuum_target_tables_sql(self):
+        assert 'n_ins_since_vacuum' in get_vacuum_target_tables_sql(130000)
+        # n_ins_since_vacuum is not available in PostgreSQL 12
+        assert 'n_ins_since_vacuum' not in get_vacuum_target_tables_sql(120004)
+
+    def test_vacuum_sql(self):
+        assert get_vacuum_sql('public.a', 130000, parallel_workers=4) == 'VACUUM (ANALYZE, PARALLEL 4) public.a'
+        assert get_vacuum_sql('public.a', 130000) == 'VACUUM ANALYZE public.a'
+        assert get_vacuum_sql('public.a', 120004, parallel_workers=4) == 'VACUUM ANALYZE public.a'
@@ -0,0 +1,60 @@
+import os
+import datetime
+import pytest
+
+from pgopttune.workload.sampled_transaction import SampledTransaction
+from pgopttune.workload.sampled_workload_file import SampledWorkloadReader
+from pgopttune.workload.workload_reducer import WorkloadReducer
+
+
+@pytest.fixture()
+def transactions():
+    # 60 short sessions of the template A and 20 long sessions of the template B
+    transactions = []
+    for index in range(80):
+        start = datetime.timedelta(seconds=index)
+        if index % 4 == 3:
+            statement = ['SELECT * FROM b WHERE id = {}'.format(index)] * 3
+            query_start_time = [start, start + datetime.timedelta(seconds=5), start + datetime.timedelta(seconds=10)]
+        else:
+            statement = ['SELECT * FROM a WHERE id = {}'.format(index)]
+            query_start_time = [start]
+        transactions.append(SampledTransaction('session-{}'.format(index), query_start_time, statement))
+    yield transactions
+    del transactions
+
+
+class TestWorkloadReducer:
+    def test_reduce(self, transactions):
+        reducer = WorkloadReducer(transactions, reduction_ratio=0.1, max_error=0.05)
+        representatives = reducer.reduce()
+        assert len(representatives) < len(transactions)
+        assert sum(weight for _, weight in representatives) == pytest.approx(len(transactions))
+        assert reducer.error <= 0.05
+
+    def test_reduce_all_sessions(self, transactions):
+        # the error cannot be reached with fewer sessions
+        reducer = WorkloadReducer(transactions, reduction_ratio=0.1, max_error=0)
+        assert reducer.reduce() == [(index, 1.0) for index in range(len(transactions))]
+        assert reducer.error == 0
+
+    def test_save(self, tmp_path, transactions):
+        path = os.path.join(str(tmp_path), 'test-reduced.sampled')
+        reducer = WorkloadReducer(transactions, reduction_ratio=0.1, max_error=0.05)
+        reducer.save(path, 1600000000.0, 1600000080.0, database='test', time_scale=0.5)
+        reader = SampledWorkloadReader(path)
+        assert reader.meta['end_unix_time'] == 1600000040.0
+        assert reader.meta['reduction']['source_session_num'] == 80
+        assert sum(reader.weights) == pytest.approx(80)
+        session_index, weight = sorted(reducer.representatives)[0]
+        transaction = reader[0]
+        assert transaction.weight == weight
+        # the session start time is scaled, the intervals of the statements are kept
+        original = transactions[session_index]
+        assert transaction.query_start_time[0] == original.query_start_time[0] * 0.5
+        assert transaction.query_start_time[-1] - transaction.query_start_time[0] == \
+            original.query_start_time[-1] - original.query_start_time[0]
+
+    def test_invalid_reduction_ratio(self, transactions):
+        with pytest.raises(ValueError):
+            WorkloadReducer(transactions, reduction_ratio=0)
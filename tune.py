@@ -6,16 +6,19 @@ from logging import config
 from distutils.util import strtobool
 from pgopttune.utils.logger import logging_dict
 from pgopttune.sampler.sampler import get_sampler
-from pgopttune.study.study import create_study
-from pgopttune.objective.objective_my_workload import ObjectiveMyWorkload
-from pgopttune.objective.objective_sampled_workload import ObjectiveSampledWorkload
+from pgopttune.pruner.pruner import get_pruner
+from pgopttune.study.study import create_study, save_pareto_front
+from pgopttune.objective.objective import get_objective_directions, is_pruning_supported
+from pgopttune.objective.objective_factory import get_objective
+from pgopttune.cluster.cluster_pool import ClusterPool
 from pgopttune.parameter.reset import reset_postgres_param
+from pgopttune.workload.replay_scheduler import ReplayLagError
 from pgopttune.parameter.pg_tune_parameter import PostgresTuneParameter
 from pgopttune.recovery.pg_recovery import Recovery
+from pgopttune.reset.snapshot_reset import is_database_url_on_cluster
 from pgopttune.config.postgres_server_config import PostgresServerConfig
 from pgopttune.config.tune_config import TuneConfig
-from pgopttune.config.my_workload_config import MyWorkloadConfig
-from pgopttune.config.sampled_workload_config import SampledWorkloadConfig
+from pgopttune.config.parallel_tune_config import ParallelTuneConfig
 
 
 def main(
@@ -24,6 +27,7 @@ def main(
     # read setting parameters
     postgres_server_config = PostgresServerConfig(conf_path)  # PostgreSQL Server config
     tune_config = TuneConfig(conf_path)  # Tuning config
+    parallel_tune_config = ParallelTuneConfig(conf_path)  # Parallel tuning config
 
     # logging
     logging.config.dictConfig(logging_dict(debug=strtobool(tune_config.debug)))
@@ -31,21 +35,19 @@ def main(
     optuna.logging.enable_propagation()  # Propagate logs to the root logger.
     optuna.logging.disable_default_handler()  # Stop showing logs in sys.stderr.
 
+    # the snapshot reset reverts all databases of the cluster
+    if postgres_server_config.reset_method == 'snapshot' and strtobool(tune_config.save_study_history) \
+            and is_database_url_on_cluster(tune_config.history_database_url, postgres_server_config.host,
+                                           postgres_server_config.port):
+        raise ValueError('The study history database is on the tuned PostgreSQL, so reset_method = snapshot '
+                         'would revert it. Please use another PostgreSQL or SQLite for history_database_url.')
+
     # set objective
-    # my workload
-    if tune_config.benchmark == 'my_workload':
-        my_workload_config = MyWorkloadConfig(conf_path)  # pgbench config
-        objective = ObjectiveMyWorkload(postgres_server_config, tune_config, my_workload_config)
-    # sampled workload (save using sampling_workload.py)
-    elif tune_config.benchmark == 'sampled_workload':
-        sampled_workload_config = SampledWorkloadConfig(conf_path)  # my workload sampled config
-        objective = ObjectiveSampledWorkload(postgres_server_config, tune_config, sampled_workload_config)
-    else:
-        raise NotImplementedError('This benchmark tool is not supported at this time.')
+    objective = get_objective(postgres_server_config, tune_config, conf_path)
 
     # Estimate the wal_max_size based on the recovery time allowed.
     if int(tune_config.required_recovery_time_second) != 0 \
-            and (tune_config.benchmark in ['my_workload']):
+            and (tune_config.benchmark in ['my_workload', 'pgbench']):
         logger.info('Start to estimate the wal_max_size and checkpoint_timeout parameter. \n'
                     'required_recovery_time_second = "{}s"'.format(tune_config.required_recovery_time_second))
         recovery = Recovery(postgres_server_config,
@@ -64,38 +66,62 @@ def main(
                                                      estimate_max_wal_size=estimate_max_wal_size_mb,
                                                      estimate_checkpoint_timeout=estimate_checkpoint_timeout_min)
 
+    # clone the clusters to run trials in parallel
+    # path : ./conf/cluster-<index>/version-<major-version>.json
+    cluster_pool = None
+    if parallel_tune_config.cluster_num > 1:
+        cluster_pool = ClusterPool(postgres_server_config, tune_config, parallel_tune_config)
+        cluster_pool.prepare_clusters(estimate_max_wal_size=estimate_max_wal_size_mb,
+                                      estimate_checkpoint_timeout=estimate_checkpoint_timeout_min)
+
     logger.info('Run benchmark : {}'.format(tune_config.benchmark))
     cwd = os.getcwd()  # save current directory
     # tuning using optuna
+    directions = get_objective_directions(tune_config.benchmark, tune_config.objectives)
+    multi_objective = len(directions) > 1
     try:
-        sampler = get_sampler(tune_config.sample_mode)  # sampler setting
-        if tune_config.benchmark == 'sampled_workload':
+        sampler = get_sampler(tune_config.sample_mode, multi_objective=multi_objective)  # sampler setting
+        pruner = get_pruner(tune_config.pruning_mode, percentile=tune_config.pruning_percentile,
+                            pruning_supported=is_pruning_supported(tune_config.objectives))  # pruner setting
+        if tune_config.objectives:
+            logger.info("The purpose of optimization is to {}".format(
+                ", ".join("{} {}".format(direction, objective)
+                          for direction, objective in zip(directions, tune_config.objectives))))
+        elif tune_config.benchmark == 'sampled_workload':
             logger.info("The purpose of optimization is to minimize the total SQL execution time")
-            study = create_study(study_name=tune_config.study_name,  # create study
-                                 sampler=sampler,
-                                 save_study_history=strtobool(tune_config.save_study_history),
-                                 load_study_history=strtobool(tune_config.load_study_history),
-                                 direction='minimize',
-                                 history_database_url=tune_config.history_database_url)
         else:
             logger.info("The purpose of optimization is to maximize TPS")
-            study = create_study(study_name=tune_config.study_name,  # create study
-                                 sampler=sampler,
-                                 save_study_history=strtobool(tune_config.save_study_history),
-                                 load_study_history=strtobool(tune_config.load_study_history),
-                                 direction='maximize',
-                                 history_database_url=tune_config.history_database_url)
+        study = create_study(study_name=tune_config.study_name,  # create study
+                             sampler=sampler,
+                             save_study_history=strtobool(tune_config.save_study_history),
+                             load_study_history=strtobool(tune_config.load_study_history),
+                             directions=directions,
+                             history_database_url=tune_config.history_database_url,
+                             pruner=pruner)
 
-        study.optimize(objective, n_trials=int(tune_config.number_trail))  # optimize
+        if cluster_pool is not None:
+            logger.info("Run trials in parallel on {} clusters".format(parallel_tune_config.cluster_num))
+            cluster_pool.optimize(study, n_trials=int(tune_config.number_trail))  # optimize
+        else:
+            study.optimize(objective, n_trials=int(tune_config.number_trail),
+                           catch=(ReplayLagError,))  # optimize
+            objective.reset_param()  # reset the parameter values left by the last trial
     except KeyboardInterrupt:
         logger.critical('Keyboard Interrupt.')
         os.chdir(cwd)
+        if cluster_pool is not None:
+            cluster_pool.join()  # each worker resets the parameters of its cluster
+            sys.exit(1)
         # Resetting parameters and restart
         reset_postgres_param(postgres_server_config)
         logger.info('Resetting PostgreSQL parameters, PostgreSQL restart completed.')
         sys.exit(1)
-    logger.info('best trial : #{} \n'
-                'best param : {}'.format(study.best_trial.number, study.best_params))
+    if multi_objective:
+        pareto_front_file_path = save_pareto_front(study, tune_config.objectives)
+        logger.info('pareto front : {}'.format(pareto_front_file_path))
+    else:
+        logger.info('best trial : #{} \n'
+                    'best param : {}'.format(study.best_trial.number, study.best_params))
 
 
 if __name__ == "__main__":